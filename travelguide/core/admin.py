@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import UserProfile, SavedLocation
+from .models import LandmarkDescription, MediaBlob, OSMLandmark, UserProfile, SavedLocation
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -38,8 +38,29 @@ class SavedLocationAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'address', 'rating', 'saved_at')
     list_filter = ('saved_at', 'rating', 'types')
     search_fields = ('name', 'address', 'user__username')
-    readonly_fields = ('saved_at',)
+    readonly_fields = ('saved_at', 'updated_at')
     date_hierarchy = 'saved_at'
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('user') 
\ No newline at end of file
+        return super().get_queryset(request).select_related('user') 
+
+@admin.register(LandmarkDescription)
+class LandmarkDescriptionAdmin(admin.ModelAdmin):
+    list_display = ('landmark_name', 'normalized_name', 'hits', 'model_name', 'updated_at')
+    search_fields = ('landmark_name', 'normalized_name', 'description')
+    readonly_fields = ('normalized_name', 'hits', 'created_at', 'updated_at')
+    ordering = ('-hits',)
+
+@admin.register(OSMLandmark)
+class OSMLandmarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'category', 'osm_type', 'osm_id', 'latitude', 'longitude', 'imported_at')
+    list_filter = ('category', 'osm_type')
+    search_fields = ('name',)
+    readonly_fields = ('imported_at',)
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'refcount', 'created_at', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'refcount', 'created_at', 'updated_at')
+    ordering = ('-refcount',)
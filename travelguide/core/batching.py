@@ -0,0 +1,231 @@
+import logging
+import math
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def percentile(values, pct):
+    """
+    Return the pct-th percentile of values using linear interpolation
+
+    Args:
+        values (list): Numeric samples
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value, or None if there are no samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[int(rank)]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class BatchMetrics:
+    """Rolling per-batch size and latency statistics for a MicroBatcher"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=window)
+        self._run_ms = deque(maxlen=window)
+        self._request_ms = deque(maxlen=window)
+        self._wait_ms = deque(maxlen=window)
+        self.total_batches = 0
+        self.total_requests = 0
+        self.failed_batches = 0
+
+    def record(self, size, run_ms, wait_ms, request_ms, failed=False):
+        """Record one executed batch"""
+        with self._lock:
+            self.total_batches += 1
+            self.total_requests += size
+            if failed:
+                self.failed_batches += 1
+            self._batch_sizes.append(size)
+            self._run_ms.append(run_ms)
+            self._wait_ms.extend(wait_ms)
+            self._request_ms.extend(request_ms)
+
+    def snapshot(self):
+        """Return the current statistics as a JSON-serialisable dict"""
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            run_ms = list(self._run_ms)
+            wait_ms = list(self._wait_ms)
+            request_ms = list(self._request_ms)
+            totals = {
+                'total_batches': self.total_batches,
+                'total_requests': self.total_requests,
+                'failed_batches': self.failed_batches,
+            }
+
+        def summary(samples):
+            return {
+                'p50': percentile(samples, 50),
+                'p95': percentile(samples, 95),
+                'p99': percentile(samples, 99),
+                'max': max(samples) if samples else None,
+            }
+
+        totals.update({
+            'avg_batch_size': (sum(sizes) / len(sizes)) if sizes else None,
+            'batch_size_histogram': dict(sorted(Counter(sizes).items())),
+            'batch_run_ms': summary(run_ms),
+            'queue_wait_ms': summary(wait_ms),
+            'request_latency_ms': summary(request_ms),
+        })
+        return totals
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into batches and run them on one worker thread
+
+    Callers block in submit() while a background thread gathers requests until
+    either max_batch_size requests are queued or max_wait_ms has passed since the
+    oldest one arrived, then hands the whole batch to batch_fn in a single call.
+
+    batch_fn receives a list of items and must return a list of results in the
+    same order. A result that is an Exception instance is raised to its caller
+    only, so one bad request does not fail the rest of the batch.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=4, max_wait_ms=25, name='batcher'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.name = name
+        self.metrics = BatchMetrics()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, item, timeout=None):
+        """
+        Queue a single request and wait for its result
+
+        Args:
+            item: Request object understood by batch_fn
+            timeout (float, optional): Seconds to wait for the result
+
+        Returns:
+            The result batch_fn produced for this item
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result(timeout)
+
+    def submit_many(self, items, timeout=None):
+        """
+        Queue several requests at once and wait for all of their results
+
+        The requests are queued together, so they fill batches alongside any
+        concurrent submit() calls instead of running one batch at a time.
+
+        Args:
+            items (list): Request objects understood by batch_fn
+            timeout (float, optional): Seconds to wait for each result
+
+        Returns:
+            list: Results in the same order as items; failed requests are
+                returned as their Exception instead of being raised
+        """
+        futures = []
+        self._ensure_worker()
+        for item in items:
+            future = Future()
+            self._queue.put((item, future, time.perf_counter()))
+            futures.append(future)
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def shutdown(self):
+        """Stop the worker thread once the queued requests have run"""
+        with self._thread_lock:
+            if self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name=f"{self.name}-batcher"
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = [first]
+            stop_after_batch = False
+            deadline = first[2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop_after_batch = True
+                    break
+                batch.append(entry)
+
+            self._execute(batch)
+            if stop_after_batch:
+                return
+
+    def _execute(self, batch):
+        items = [entry[0] for entry in batch]
+        started = time.perf_counter()
+        failed = False
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name} batch returned {len(results)} results for {len(items)} requests"
+                )
+        except Exception as e:
+            logger.error(f"Error running {self.name} batch of {len(items)}: {str(e)}")
+            results = [e] * len(items)
+            failed = True
+        finished = time.perf_counter()
+
+        for (item, future, queued_at), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        self.metrics.record(
+            size=len(batch),
+            run_ms=(finished - started) * 1000,
+            wait_ms=[(started - entry[2]) * 1000 for entry in batch],
+            request_ms=[(finished - entry[2]) * 1000 for entry in batch],
+            failed=failed,
+        )
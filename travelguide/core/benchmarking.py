@@ -0,0 +1,259 @@
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .batching import percentile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+# Metrics compared against a baseline run; concurrency runs are compared per caller count
+LOWER_IS_BETTER = ('load_seconds', 'latency_ms.p50', 'latency_ms.p95', 'latency_ms.p99', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('tokens_per_second',)
+
+
+def load_image_cases(path):
+    """
+    Read benchmark images from a directory or a JSON manifest
+
+    A manifest is a list of {"image": path, "landmark": name} entries, with
+    paths relative to the manifest; images from a directory have no label.
+
+    Returns:
+        list: Dicts with 'image' (absolute path) and 'landmark' (name or None)
+
+    Raises:
+        ValueError: If the manifest can't be read
+    """
+    if os.path.isdir(path):
+        return [
+            {'image': os.path.join(path, name), 'landmark': None}
+            for name in sorted(os.listdir(path))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+    try:
+        with open(path) as manifest:
+            cases = json.load(manifest)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read image manifest {path}: {str(e)}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return [
+        {'image': os.path.join(base_dir, case['image']), 'landmark': case.get('landmark')}
+        for case in cases
+    ]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB (Linux only)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def summarize_latencies(latencies_ms):
+    """Percentiles of a list of latencies in milliseconds"""
+    return {
+        'count': len(latencies_ms),
+        'mean': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else None,
+        'p50': percentile(latencies_ms, 50),
+        'p95': percentile(latencies_ms, 95),
+        'p99': percentile(latencies_ms, 99),
+        'max': max(latencies_ms) if latencies_ms else None,
+    }
+
+
+def environment_info():
+    """Where a benchmark ran, so results from different machines aren't compared blindly"""
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['torch_threads'] = torch.get_num_threads()
+    except ImportError:
+        pass
+    return info
+
+
+def time_load(load):
+    """
+    Time a model load
+
+    Returns:
+        dict: 'load_seconds' plus the RSS before and after, in MB
+    """
+    gc.collect()
+    rss_before = current_rss_mb()
+    started = time.perf_counter()
+    load()
+    return {
+        'load_seconds': round(time.perf_counter() - started, 3),
+        'rss_before_mb': rss_before,
+        'rss_after_mb': current_rss_mb(),
+    }
+
+
+def measure_calls(call, inputs, runs=1, warmup=1, count_tokens=None):
+    """
+    Call a function sequentially and measure per-call latency and token rate
+
+    Args:
+        call (callable): Takes one input and returns the output text (or None)
+        inputs (list): Inputs, each called `runs` times
+        runs (int): Timed calls per input
+        warmup (int): Untimed calls before measuring, to exclude one-off costs
+        count_tokens (callable, optional): Counts the tokens in an output text
+
+    Returns:
+        dict: Latency percentiles, 'tokens_per_second' and 'failures'
+    """
+    for index in range(min(warmup, len(inputs))):
+        call(inputs[index])
+
+    latencies = []
+    tokens = 0
+    failures = 0
+    busy_seconds = 0.0
+    for value in inputs:
+        for _ in range(runs):
+            started = time.perf_counter()
+            try:
+                output = call(value)
+            except Exception:
+                output = None
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed * 1000)
+            busy_seconds += elapsed
+            if output is None:
+                failures += 1
+            elif count_tokens is not None:
+                tokens += count_tokens(output)
+
+    return {
+        'latency_ms': summarize_latencies(latencies),
+        'tokens_per_second': round(tokens / busy_seconds, 2) if count_tokens and busy_seconds else None,
+        'failures': failures,
+    }
+
+
+def measure_concurrency(call, inputs, concurrency, requests=None):
+    """
+    Run a function from several threads at once and measure throughput
+
+    Args:
+        call (callable): Takes one input; returning None or raising counts as a failure
+        inputs (list): Inputs, cycled through until `requests` calls have been made
+        concurrency (int): Number of concurrent callers
+        requests (int, optional): Total calls (default: 4 per caller)
+
+    Returns:
+        dict: 'throughput_rps', latency percentiles, 'wall_seconds' and 'failures'
+    """
+    requests = requests or concurrency * 4
+    work = [inputs[index % len(inputs)] for index in range(requests)]
+
+    def timed(value):
+        started = time.perf_counter()
+        try:
+            ok = call(value) is not None
+        except Exception:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, work))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'wall_seconds': round(wall_seconds, 3),
+        'throughput_rps': round(requests / wall_seconds, 2) if wall_seconds else None,
+        'latency_ms': summarize_latencies([latency for latency, _ in results]),
+        'failures': sum(1 for _, ok in results if not ok),
+    }
+
+
+def _lookup(result, dotted):
+    value = result
+    for part in dotted.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value if isinstance(value, (int, float)) else None
+
+
+def compare_results(current, baseline, tolerance=0.1):
+    """
+    Find metrics that got worse than a baseline run by more than a tolerance
+
+    Both arguments are benchmark reports: {'benchmarks': {name: result}}, where
+    a result may hold a list of 'concurrency' runs matched by caller count.
+
+    Args:
+        tolerance (float): Allowed relative change, e.g. 0.1 for 10%
+
+    Returns:
+        list: One dict per regression with the benchmark, metric, both values and the change
+    """
+    regressions = []
+
+    def check(name, metric, now, before, lower_is_better):
+        if now is None or before is None or before == 0:
+            return
+        change = (now - before) / before
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        if worse:
+            regressions.append({
+                'benchmark': name,
+                'metric': metric,
+                'baseline': before,
+                'current': now,
+                'change': round(change, 4),
+            })
+
+    baseline_benchmarks = baseline.get('benchmarks', {})
+    for name, result in current.get('benchmarks', {}).items():
+        previous = baseline_benchmarks.get(name)
+        if not previous:
+            continue
+        for metric in LOWER_IS_BETTER:
+            check(name, metric, _lookup(result, metric), _lookup(previous, metric), True)
+        for metric in HIGHER_IS_BETTER:
+            check(name, metric, _lookup(result, metric), _lookup(previous, metric), False)
+
+        previous_runs = {run['concurrency']: run for run in previous.get('concurrency', [])}
+        for run in result.get('concurrency', []):
+            before = previous_runs.get(run['concurrency'])
+            if not before:
+                continue
+            label = f"concurrency[{run['concurrency']}]"
+            check(name, f"{label}.throughput_rps", run['throughput_rps'], before['throughput_rps'], False)
+            check(name, f"{label}.latency_ms.p95", run['latency_ms']['p95'], before['latency_ms']['p95'], True)
+    return regressions
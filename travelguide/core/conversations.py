@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Conversation:
+    """Server-side state of one multi-turn chat about a landmark image"""
+    landmark_name: str
+    # Alternating user/assistant messages, in the format model.chat keeps as context
+    msgs: list = field(default_factory=list)
+    # Prompt text standing in for the image, and the vision encoder output it refers to
+    image_placeholder: Optional[str] = None
+    vision_hidden_states: Any = None
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    turns: int = 0
+
+
+def conversation_key(user_id, landmark_image_id):
+    """Key a conversation by user plus landmark image"""
+    return f"{user_id}:{landmark_image_id}"
+
+
+class ConversationStore:
+    """
+    Bounded LRU of chat conversations with idle-timeout eviction
+
+    Keeps the message history and image embedding of recent conversations in
+    memory, so follow-up questions don't re-run the vision encoder.
+    """
+
+    def __init__(self, max_conversations=128, idle_timeout=1800, max_turns=6):
+        self.max_conversations = max_conversations
+        self.idle_timeout = idle_timeout
+        self.max_turns = max_turns
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        # Least recently used entries sit at the front
+        while self._conversations:
+            key, conversation = next(iter(self._conversations.items()))
+            if now - conversation.last_used < self.idle_timeout:
+                break
+            del self._conversations[key]
+            self.expirations += 1
+
+    def get(self, key):
+        """
+        Get a live conversation, marking it as recently used
+
+        Returns:
+            Conversation: The stored conversation, or None if unknown or idle too long
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            conversation = self._conversations.get(key)
+            if conversation is None:
+                self.misses += 1
+                return None
+            conversation.last_used = now
+            self._conversations.move_to_end(key)
+            self.hits += 1
+            return conversation
+
+    def record_turn(self, key, conversation, user_msg, answer):
+        """
+        Append a finished question/answer pair and store the conversation
+
+        Only the last max_turns exchanges are kept so the prompt stays within
+        the model's input length.
+        """
+        now = time.monotonic()
+        with self._lock:
+            conversation.msgs = conversation.msgs + [
+                user_msg,
+                {'role': 'assistant', 'content': answer},
+            ]
+            excess = len(conversation.msgs) - 2 * self.max_turns
+            if excess > 0:
+                conversation.msgs = conversation.msgs[excess:]
+            conversation.turns += 1
+            conversation.last_used = now
+            self._conversations[key] = conversation
+            self._conversations.move_to_end(key)
+            self._expire(now)
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Forget a conversation"""
+        with self._lock:
+            self._conversations.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._conversations.clear()
+
+    def get_stats(self):
+        """Get size and hit/miss counters for this process"""
+        with self._lock:
+            self._expire(time.monotonic())
+            lookups = self.hits + self.misses
+            return {
+                'conversations': len(self._conversations),
+                'max_conversations': self.max_conversations,
+                'idle_timeout_seconds': self.idle_timeout,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits / lookups) if lookups else None,
+            }
+
+
+# Global instance
+conversation_store = None
+
+def get_conversation_store():
+    """Get or create the global conversation store configured in settings"""
+    global conversation_store
+    if conversation_store is None:
+        conversation_store = ConversationStore(
+            max_conversations=getattr(settings, 'VQA_CONVERSATION_MAX', 128),
+            idle_timeout=getattr(settings, 'VQA_CONVERSATION_IDLE_SECONDS', 1800),
+            max_turns=getattr(settings, 'VQA_CONVERSATION_MAX_TURNS', 6),
+        )
+    return conversation_store
@@ -0,0 +1,166 @@
+import logging
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError
+from django.db.models import Count, F
+
+from .models import LandmarkDescription, LandmarkImage
+
+logger = logging.getLogger(__name__)
+
+# The model that writes the descriptions, recorded with each stored one
+DESCRIPTION_MODEL = 'gpt2'
+
+
+def normalize_landmark_name(landmark_name):
+    """
+    Reduce a landmark name to the key its description is stored under
+
+    Case, accents, punctuation, surrounding whitespace and a leading "the"
+    are ignored, so "The Eiffel Tower." and "eiffel  tower" share a description.
+    """
+    name = unicodedata.normalize('NFKD', landmark_name or '')
+    name = ''.join(char for char in name if not unicodedata.combining(char)).casefold()
+    name = re.sub(r"[^\w\s]", ' ', name)
+    name = ' '.join(name.split())
+    if name.startswith('the '):
+        name = name[4:]
+    return name
+
+
+def get_stored_description(landmark_name):
+    """
+    Look up the stored description of a landmark, counting the hit
+
+    Returns:
+        str: The description, or None if none has been stored
+    """
+    normalized = normalize_landmark_name(landmark_name)
+    if not normalized:
+        return None
+    stored = LandmarkDescription.objects.filter(normalized_name=normalized).only('description').first()
+    if stored is None:
+        return None
+    LandmarkDescription.objects.filter(pk=stored.pk).update(hits=F('hits') + 1)
+    return stored.description
+
+
+def store_description(landmark_name, description, model_name=DESCRIPTION_MODEL):
+    """Save a generated description, replacing any stored one for the same landmark"""
+    normalized = normalize_landmark_name(landmark_name)
+    if not normalized or not description:
+        return None
+    try:
+        stored, _ = LandmarkDescription.objects.update_or_create(
+            normalized_name=normalized,
+            defaults={
+                'landmark_name': landmark_name,
+                'description': description,
+                'model_name': model_name,
+            }
+        )
+    except IntegrityError:
+        # Another worker stored the same landmark at the same moment
+        stored = LandmarkDescription.objects.get(normalized_name=normalized)
+    return stored
+
+
+def get_or_generate_description(landmark_name, gpt2_service):
+    """
+    Return the stored description of a landmark, generating and storing it on first use
+
+    Stored descriptions are returned even while the GPT-2 model is not loaded.
+
+    Returns:
+        dict: Contains 'success' (bool), 'description' (str), 'stored' (bool, whether
+            it came from the store) and 'error' (str if any)
+    """
+    description = get_stored_description(landmark_name)
+    if description is not None:
+        return {'success': True, 'description': description, 'stored': True, 'error': None}
+
+    if not gpt2_service.is_ready():
+        return {'success': False, 'description': None, 'stored': False, 'error': 'GPT-2 model is not ready'}
+
+    result = gpt2_service.generate_landmark_description(landmark_name)
+    if result['success']:
+        store_description(landmark_name, result['description'])
+    return {**result, 'stored': False}
+
+
+def popular_landmark_names(limit=None):
+    """
+    Most frequently identified landmarks, counting spelling variants together
+
+    Returns:
+        list: (landmark_name, count) pairs, most identified first; each name is
+            the most common spelling of its landmark
+    """
+    rows = (
+        LandmarkImage.objects
+        .filter(status=LandmarkImage.STATUS_COMPLETED)
+        .exclude(landmark_name__isnull=True)
+        .exclude(landmark_name='')
+        .values_list('landmark_name')
+        .annotate(count=Count('id'))
+    )
+    spellings = defaultdict(Counter)
+    for landmark_name, count in rows:
+        normalized = normalize_landmark_name(landmark_name)
+        if normalized:
+            spellings[normalized][landmark_name] += count
+
+    ranked = sorted(
+        ((counter.most_common(1)[0][0], sum(counter.values())) for counter in spellings.values()),
+        key=lambda item: (-item[1], item[0])
+    )
+    return ranked[:limit] if limit else ranked
+
+
+def generate_missing_descriptions(landmark_names, gpt2_service, refresh=False, batch_size=32):
+    """
+    Generate and store descriptions for the landmarks that don't have one yet
+
+    Names are sent to GPT-2 in chunks so each chunk runs as shared, padded batches.
+
+    Args:
+        landmark_names (list): Landmark names
+        gpt2_service: Local or remote GPT-2 service
+        refresh (bool): Regenerate descriptions that are already stored
+        batch_size (int): Names per generate_landmark_descriptions call
+
+    Returns:
+        dict: Counts of 'generated', 'skipped' (already stored) and 'failed' landmarks,
+            and 'errors' mapping failed names to their error
+    """
+    by_normalized = {}
+    for landmark_name in landmark_names:
+        normalized = normalize_landmark_name(landmark_name)
+        if normalized and normalized not in by_normalized:
+            by_normalized[normalized] = landmark_name
+
+    stored = set()
+    if not refresh:
+        stored = set(
+            LandmarkDescription.objects
+            .filter(normalized_name__in=list(by_normalized))
+            .values_list('normalized_name', flat=True)
+        )
+    pending = [name for normalized, name in by_normalized.items() if normalized not in stored]
+
+    summary = {'generated': 0, 'skipped': len(stored), 'failed': 0, 'errors': {}}
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        results = gpt2_service.generate_landmark_descriptions(chunk)
+        for landmark_name in chunk:
+            result = results.get(landmark_name) or {'success': False, 'error': 'No result returned'}
+            if result['success']:
+                store_description(landmark_name, result['description'])
+                summary['generated'] += 1
+            else:
+                summary['failed'] += 1
+                summary['errors'][landmark_name] = result['error']
+        logger.info(f"Generated descriptions for {min(start + batch_size, len(pending))}/{len(pending)} landmarks")
+    return summary
@@ -0,0 +1,74 @@
+import logging
+import os
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Relative to MEDIA_ROOT, next to landmark_images/
+EMBEDDING_UPLOAD_DIR = 'landmark_embeddings'
+TENSOR_NAME = 'vision_hidden_states'
+
+
+def embedding_name(landmark_image_id):
+    """Storage name of the vision embedding for a LandmarkImage"""
+    return f"{EMBEDDING_UPLOAD_DIR}/{landmark_image_id}.safetensors"
+
+
+def embedding_path(landmark_image_id):
+    """Absolute path of the vision embedding for a LandmarkImage"""
+    return os.path.join(settings.MEDIA_ROOT, embedding_name(landmark_image_id))
+
+
+def save_vision_embedding(path, vision_hidden_states, image_placeholder, fingerprint):
+    """
+    Persist the vision encoder output for one image as a safetensors file
+
+    Args:
+        path (str): Destination file
+        vision_hidden_states (torch.Tensor): Encoder output for the image's slices
+        image_placeholder (str): Prompt text that stands in for the image
+        fingerprint (str): Identifies the model setup that produced the embedding
+    """
+    # Only the model processes write embeddings; keep torch out of web workers
+    from safetensors.torch import save_file
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    save_file(
+        {TENSOR_NAME: vision_hidden_states.detach().contiguous().cpu()},
+        temp_path,
+        metadata={
+            'image_placeholder': image_placeholder,
+            'fingerprint': fingerprint,
+        },
+    )
+    os.replace(temp_path, path)
+
+
+def load_vision_embedding(path, fingerprint, device='cpu'):
+    """
+    Load a stored vision embedding
+
+    The file is memory-mapped, so on CPU the tensor reads straight from the page
+    cache without a copy.
+
+    Returns:
+        tuple: (image_placeholder, vision_hidden_states), or None when the file is
+        missing or was produced by a different model setup
+    """
+    if not path or not os.path.exists(path):
+        return None
+
+    from safetensors import safe_open
+
+    try:
+        with safe_open(path, framework='pt', device=str(device)) as embedding_file:
+            metadata = embedding_file.metadata() or {}
+            if metadata.get('fingerprint') != fingerprint:
+                logger.info(f"Ignoring stale vision embedding {path}")
+                return None
+            return metadata['image_placeholder'], embedding_file.get_tensor(TENSOR_NAME)
+    except Exception as e:
+        logger.warning(f"Could not load vision embedding {path}: {str(e)}")
+        return None
@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+COMPASS_POINTS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+_GEOHASH_INDEX = {char: index for index, char in enumerate(GEOHASH_ALPHABET)}
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_km_array(lat, lng, lats, lngs):
+    """Great-circle distances in kilometres from one point to arrays of points"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    d_phi = phi2 - phi1
+    d_lambda = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    a = np.sin(d_phi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing_deg_array(lat, lng, lats, lngs):
+    """Initial bearings in degrees (clockwise from north, 0-360) from one point to arrays of points"""
+    phi1 = math.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    d_lambda = np.radians(np.asarray(lngs, dtype=np.float64) - lng)
+    y = np.sin(d_lambda) * np.cos(phi2)
+    x = math.cos(phi1) * np.sin(phi2) - math.sin(phi1) * np.cos(phi2) * np.cos(d_lambda)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def compass_point(bearing):
+    """Eight-point compass direction for a bearing in degrees"""
+    return COMPASS_POINTS[int((bearing % 360.0) / 45.0 + 0.5) % 8]
+
+
+def rank_by_distance(lat, lng, lats, lngs, radius_km=None, limit=None):
+    """
+    Order points by distance from a point, optionally within a radius
+
+    One array operation for all points, so ranking thousands of candidates
+    costs about as much as ranking a few.
+
+    Returns:
+        tuple: (indices into the inputs nearest first, their distances in km,
+        their bearings in degrees) as NumPy arrays
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    distances = haversine_km_array(lat, lng, lats, lngs)
+    indices = np.flatnonzero(distances <= radius_km) if radius_km is not None else np.arange(len(distances))
+    indices = indices[np.argsort(distances[indices], kind='stable')]
+    if limit is not None:
+        indices = indices[:limit]
+    return indices, distances[indices], bearing_deg_array(lat, lng, lats[indices], lngs[indices])
+
+
+def centroid(lats, lngs):
+    """
+    Geographic midpoint of some points (via 3D unit vectors, so it is right across the antimeridian)
+
+    Returns:
+        tuple: (lat, lng), or None if there are no points
+    """
+    if len(lats) == 0:
+        return None
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lngs, dtype=np.float64))
+    x = np.mean(np.cos(phi) * np.cos(lam))
+    y = np.mean(np.cos(phi) * np.sin(lam))
+    z = np.mean(np.sin(phi))
+    return math.degrees(math.atan2(z, math.hypot(x, y))), math.degrees(math.atan2(y, x))
+
+
+def geohash_encode(lat, lng, precision):
+    """
+    Encode a point as a geohash
+
+    Every point in the same cell gets the same hash, so a geohash works as a
+    tile id: precision 5 cells are about 4.9 x 4.9 km, precision 6 about 1.2 x 0.6 km.
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value_range, value = (lng_range, lng) if even else (lat_range, lat)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits <<= 1
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_bbox(geohash):
+    """
+    Bounding box of a geohash cell
+
+    Returns:
+        tuple: (south, west, north, east) in degrees
+    """
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = _GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            value_range = lng_range if even else lat_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def radius_bbox(lat, lng, radius_km):
+    """
+    Bounding box that contains a circle
+
+    Returns:
+        tuple: (south, west, north, east) in degrees, clamped to valid latitudes
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    d_lng = min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return max(lat - d_lat, -90.0), lng - d_lng, min(lat + d_lat, 90.0), lng + d_lng
+
+
+def geohashes_covering(lat, lng, radius_km, precision):
+    """
+    Geohash cells that together cover a circle
+
+    Walks the cell grid across the circle's bounding box, so the result is the
+    same set of tiles for every point that needs them.
+
+    Returns:
+        list: Sorted geohashes
+    """
+    south, west, north, east = radius_bbox(lat, lng, radius_km)
+    # Cell size at this precision, from any cell
+    cell_south, cell_west, cell_north, cell_east = geohash_bbox(geohash_encode(lat, lng, precision))
+    cell_height = cell_north - cell_south
+    cell_width = cell_east - cell_west
+
+    hashes = set()
+    row = south
+    while True:
+        column = west
+        while True:
+            wrapped = ((column + 180.0) % 360.0) - 180.0
+            hashes.add(geohash_encode(min(row, 90.0 - 1e-9), wrapped, precision))
+            if column >= east:
+                break
+            column = min(column + cell_width, east)
+        if row >= north:
+            break
+        row = min(row + cell_height, north)
+    return sorted(hashes)
@@ -0,0 +1,492 @@
+import hashlib
+import json
+import logging
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .geo import geohash_bbox, geohash_encode, geohashes_covering, rank_by_distance
+
+logger = logging.getLogger(__name__)
+
+# Overpass tag filters for the landmark categories shown on the explore page
+CATEGORIES = OrderedDict([
+    ('attraction', ('tourism', 'attraction')),
+    ('monument', ('historic', 'monument')),
+    ('museum', ('tourism', 'museum')),
+    ('park', ('leisure', 'park')),
+    ('restaurant', ('amenity', 'restaurant')),
+    ('mall', ('shop', 'mall')),
+])
+
+
+class UpstreamError(Exception):
+    """An upstream geo service failed or returned something unusable"""
+
+
+def element_position(element):
+    """(lat, lng) of an Overpass node, or of a way's center; None if it has neither"""
+    if 'lat' in element and 'lon' in element:
+        return element['lat'], element['lon']
+    center = element.get('center')
+    if center:
+        return center['lat'], center['lon']
+    return None
+
+
+def element_categories(element):
+    """Names of the CATEGORIES an Overpass element belongs to"""
+    tags = element.get('tags') or {}
+    return [name for name, (key, value) in CATEGORIES.items() if tags.get(key) == value]
+
+
+def wikipedia_title(tag):
+    """Page title from an OSM wikipedia tag such as 'en:Eiffel Tower'"""
+    title = (tag or '').strip()
+    if len(title) > 3 and title[2] == ':' and title[:2].isalpha():
+        title = title[3:]
+    return title.replace(' ', '_')
+
+
+class HTTPGeoUpstream:
+    """Overpass, Nominatim and Wikipedia REST over HTTP"""
+
+    def __init__(self, overpass_url=None, nominatim_url=None, wikipedia_url=None, user_agent=None, timeout=None):
+        self.overpass_url = overpass_url or settings.OVERPASS_URL
+        self.nominatim_url = (nominatim_url or settings.NOMINATIM_URL).rstrip('/')
+        self.wikipedia_url = (wikipedia_url or settings.WIKIPEDIA_API_URL).rstrip('/')
+        self.wikipedia_action_url = settings.WIKIPEDIA_ACTION_API_URL
+        # Nominatim and Wikipedia ask clients to identify themselves
+        self.user_agent = user_agent or settings.GEO_USER_AGENT
+        self.timeout = timeout or getattr(settings, 'GEO_UPSTREAM_TIMEOUT', 30)
+
+    def _fetch_json(self, url, data=None):
+        request = urllib.request.Request(url, data=data, headers={
+            'User-Agent': self.user_agent,
+            'Accept': 'application/json',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise UpstreamError(f"{url.split('?')[0]} returned HTTP {e.code}")
+        except (urllib.error.URLError, TimeoutError, ValueError) as e:
+            raise UpstreamError(f"{url.split('?')[0]} failed: {str(e)}")
+
+    def overpass_bbox(self, bbox, categories):
+        """
+        Fetch the named elements of some categories inside a bounding box
+
+        Args:
+            bbox (tuple): (south, west, north, east)
+            categories (list): Names from CATEGORIES
+
+        Returns:
+            list: Overpass elements (nodes, and ways with their center)
+        """
+        area = ','.join(f"{value:.7f}" for value in bbox)
+        clauses = ''.join(
+            f'{element_type}["{key}"="{value}"]["name"]({area});'
+            for name in categories
+            for key, value in [CATEGORIES[name]]
+            for element_type in ('node', 'way')
+        )
+        query = f"[out:json][timeout:25];({clauses});out center;"
+        data = self._fetch_json(self.overpass_url, urllib.parse.urlencode({'data': query}).encode('utf-8'))
+        if data is None:
+            raise UpstreamError('Overpass returned no data')
+        return data.get('elements', [])
+
+    def reverse_geocode(self, lat, lng):
+        """Nominatim reverse geocode at city level"""
+        query = urllib.parse.urlencode({'format': 'json', 'lat': f"{lat:.6f}", 'lon': f"{lng:.6f}", 'zoom': 10})
+        return self._fetch_json(f"{self.nominatim_url}/reverse?{query}") or {}
+
+    def wikipedia_summary(self, title):
+        """Wikipedia REST page summary, or None if there is no such page"""
+        return self._fetch_json(f"{self.wikipedia_url}/page/summary/{urllib.parse.quote(title, safe='')}")
+
+    def wikipedia_summaries(self, titles):
+        """
+        Intro extracts and thumbnails for several pages in one action API query
+
+        The API returns at most 20 extracts per query, so callers batch titles
+        in groups of 20 or fewer.
+
+        Returns:
+            dict: Requested title -> summary dict, or None for missing pages
+        """
+        query = urllib.parse.urlencode({
+            'action': 'query',
+            'format': 'json',
+            'formatversion': 2,
+            'prop': 'extracts|pageimages',
+            'exintro': 1,
+            'explaintext': 1,
+            'exlimit': 'max',
+            'piprop': 'thumbnail',
+            'pithumbsize': 320,
+            'pilimit': 'max',
+            'redirects': 1,
+            'titles': '|'.join(titles),
+        })
+        data = self._fetch_json(f"{self.wikipedia_action_url}?{query}")
+        if data is None or 'query' not in data:
+            raise UpstreamError('Wikipedia returned no query result')
+
+        result = data['query']
+        # Follow the API's title normalization and redirects back to what was asked for
+        renamed = {entry['from']: entry['to'] for entry in result.get('normalized', []) + result.get('redirects', [])}
+        pages = {page['title']: page for page in result.get('pages', [])}
+        summaries = {}
+        for title in titles:
+            resolved = title
+            for _ in range(3):
+                if resolved not in renamed:
+                    break
+                resolved = renamed[resolved]
+            page = pages.get(resolved)
+            if not page or page.get('missing') or page.get('invalid'):
+                summaries[title] = None
+            else:
+                summaries[title] = {
+                    'title': page['title'],
+                    'extract': page.get('extract'),
+                    'thumbnail': page.get('thumbnail'),
+                }
+        return summaries
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls
+
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class GeoProxy:
+    """
+    Cache and coalesce the explore page's map lookups
+
+    Overpass results are cached per geohash tile and category, so everyone in
+    the same area shares them however they move within it; reverse geocodes
+    are cached per smaller tile and Wikipedia summaries per title.
+    """
+
+    KEY_PREFIX = 'geo'
+
+    def __init__(self, upstream, cache, tile_precision=5, reverse_precision=6,
+                 overpass_ttl=86400, reverse_ttl=7 * 86400, wikipedia_ttl=7 * 86400):
+        self.upstream = upstream
+        self.cache = cache
+        self.tile_precision = tile_precision
+        self.reverse_precision = reverse_precision
+        self.overpass_ttl = overpass_ttl
+        self.reverse_ttl = reverse_ttl
+        self.wikipedia_ttl = wikipedia_ttl
+        self._single_flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.stats = {
+            'tile_hits': 0,
+            'tile_misses': 0,
+            'reverse_hits': 0,
+            'reverse_misses': 0,
+            'wikipedia_hits': 0,
+            'wikipedia_misses': 0,
+            'upstream_calls': 0,
+            'upstream_errors': 0,
+        }
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self.stats[counter] += amount
+
+    def _cache_get_many(self, keys):
+        try:
+            return self.cache.get_many(keys)
+        except Exception as e:
+            logger.warning(f"Geo cache lookup failed: {str(e)}")
+            return {}
+
+    def _cache_set_many(self, values, ttl):
+        try:
+            self.cache.set_many(values, timeout=ttl)
+        except Exception as e:
+            logger.warning(f"Geo cache store failed: {str(e)}")
+
+    def _upstream(self, key, fn):
+        def call():
+            self._count('upstream_calls')
+            try:
+                return fn()
+            except Exception:
+                self._count('upstream_errors')
+                raise
+        return self._single_flight.do(key, call)
+
+    def _tile_key(self, tile, category):
+        return f"{self.KEY_PREFIX}:overpass:{tile}:{category}"
+
+    def _tile_elements(self, tile, categories):
+        keys = {self._tile_key(tile, category): category for category in categories}
+        cached = self._cache_get_many(list(keys))
+        self._count('tile_hits', len(cached))
+        missing = [category for key, category in keys.items() if key not in cached]
+        elements_by_category = {keys[key]: elements for key, elements in cached.items()}
+        if not missing:
+            return elements_by_category
+
+        self._count('tile_misses', len(missing))
+        fetched = self._upstream(
+            f"overpass:{tile}:{','.join(missing)}",
+            lambda: self.upstream.overpass_bbox(geohash_bbox(tile), missing)
+        )
+        # Split one upstream answer into per-category entries, empty ones included
+        fresh = {category: [] for category in missing}
+        for element in fetched:
+            if element_position(element) is None or not (element.get('tags') or {}).get('name'):
+                continue
+            for category in element_categories(element):
+                if category in fresh:
+                    fresh[category].append(element)
+        self._cache_set_many(
+            {self._tile_key(tile, category): elements for category, elements in fresh.items()},
+            self.overpass_ttl
+        )
+        elements_by_category.update(fresh)
+        return elements_by_category
+
+    def nearby(self, lat, lng, radius_km, categories=None):
+        """
+        Named landmarks within a radius, in Overpass element form
+
+        Args:
+            categories (list, optional): Names from CATEGORIES (default: all)
+
+        Returns:
+            dict: 'elements' nearest first (each with 'distance_km' and 'bearing_deg')
+            and the 'tiles' that were read
+
+        Raises:
+            UpstreamError: If a tile had to be fetched and Overpass failed
+        """
+        categories = [category for category in (categories or CATEGORIES) if category in CATEGORIES]
+        tiles = geohashes_covering(lat, lng, radius_km, self.tile_precision)
+
+        candidates = {}
+        for tile in tiles:
+            for tile_elements in self._tile_elements(tile, categories).values():
+                for element in tile_elements:
+                    # Ways crossing tile borders come back from every tile they touch
+                    candidates.setdefault((element.get('type'), element.get('id')), element)
+
+        candidates = list(candidates.values())
+        positions = [element_position(element) for element in candidates]
+        indices, distances, bearings = rank_by_distance(
+            lat, lng, [position[0] for position in positions], [position[1] for position in positions], radius_km
+        )
+        elements = [
+            dict(candidates[index], distance_km=round(float(distance), 4), bearing_deg=round(float(bearing), 1))
+            for index, distance, bearing in zip(indices, distances, bearings)
+        ]
+        return {'elements': elements, 'tiles': tiles}
+
+    def reverse_geocode(self, lat, lng):
+        """
+        Place name around a point, shared by everyone in the same small tile
+
+        Returns:
+            dict: Nominatim response ('display_name', 'address', ...)
+        """
+        tile = geohash_encode(lat, lng, self.reverse_precision)
+        key = f"{self.KEY_PREFIX}:reverse:{tile}"
+        cached = self._cache_get_many([key]).get(key)
+        if cached is not None:
+            self._count('reverse_hits')
+            return cached
+
+        self._count('reverse_misses')
+        south, west, north, east = geohash_bbox(tile)
+        result = self._upstream(
+            f"reverse:{tile}",
+            lambda: self.upstream.reverse_geocode((south + north) / 2, (west + east) / 2)
+        )
+        self._cache_set_many({key: result}, self.reverse_ttl)
+        return result
+
+    def _wikipedia_key(self, title):
+        digest = hashlib.sha1(title.encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}:wikipedia:{digest}"
+
+    @staticmethod
+    def _summary_value(summary):
+        # Keep only what the page uses; {} marks a missing page
+        if not summary:
+            return {}
+        return {
+            'title': summary.get('title'),
+            'extract': summary.get('extract'),
+            'thumbnail': summary.get('thumbnail'),
+        }
+
+    def wikipedia_summary(self, title):
+        """
+        Wikipedia summary of a page: 'title', 'extract' and 'thumbnail'
+
+        Returns:
+            dict: The summary, or None if the page doesn't exist (also cached)
+        """
+        title = wikipedia_title(title)
+        if not title:
+            return None
+        key = self._wikipedia_key(title)
+        cached = self._cache_get_many([key]).get(key)
+        if cached is not None:
+            self._count('wikipedia_hits')
+            return cached or None
+
+        self._count('wikipedia_misses')
+        summary = self._upstream(f"wikipedia:{title}", lambda: self.upstream.wikipedia_summary(title))
+        value = self._summary_value(summary)
+        self._cache_set_many({key: value}, self.wikipedia_ttl)
+        return value or None
+
+    def _fetch_wikipedia_batch(self, titles):
+        """Fetch and cache one batch of uncached page titles"""
+        self._count('wikipedia_misses', len(titles))
+        summaries = self._upstream(
+            f"wikipedia-batch:{'|'.join(sorted(titles))}",
+            lambda: self.upstream.wikipedia_summaries(titles)
+        )
+        values = {title: self._summary_value(summaries.get(title)) for title in titles}
+        self._cache_set_many(
+            {self._wikipedia_key(title): value for title, value in values.items()},
+            self.wikipedia_ttl
+        )
+        return values
+
+    def stream_wikipedia_summaries(self, titles, batch_size=20, concurrency=4):
+        """
+        Wikipedia summaries for many pages, yielded as soon as each is known
+
+        Cached pages come first, in one cache read. The rest are fetched in
+        batches of batch_size titles per upstream query on a pool of at most
+        concurrency threads, and yielded as each batch completes.
+
+        Args:
+            titles (list): Page titles or OSM wikipedia tags, as sent by the page
+
+        Yields:
+            tuple: (title as given, summary dict or None, error message or None)
+        """
+        requested = OrderedDict()
+        for title in titles:
+            page_title = wikipedia_title(title)
+            if page_title:
+                requested.setdefault(page_title, []).append(title)
+
+        keys = {self._wikipedia_key(page_title): page_title for page_title in requested}
+        cached = self._cache_get_many(list(keys))
+        self._count('wikipedia_hits', len(cached))
+        for key, value in cached.items():
+            for title in requested[keys[key]]:
+                yield title, value or None, None
+
+        missing = [page_title for key, page_title in keys.items() if key not in cached]
+        if not missing:
+            return
+
+        batch_size = max(batch_size, 1)
+        executor = ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix='wikipedia-batch')
+        futures = {
+            executor.submit(self._fetch_wikipedia_batch, missing[start:start + batch_size]):
+                missing[start:start + batch_size]
+            for start in range(0, len(missing), batch_size)
+        }
+        try:
+            for finished in as_completed(futures):
+                batch = futures[finished]
+                try:
+                    values, error = finished.result(), None
+                except Exception as e:
+                    logger.warning(f"Wikipedia batch of {len(batch)} failed: {str(e)}")
+                    values, error = {}, str(e)
+                for page_title in batch:
+                    for title in requested[page_title]:
+                        yield title, values.get(page_title) or None, error
+        finally:
+            # The client went away: don't start the batches still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        """Get cache and upstream counters for this process"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['coalesced'] = self._single_flight.coalesced
+        stats['upstream'] = type(self.upstream).__name__
+        return stats
+
+
+UPSTREAMS = {
+    'http': 'core.geo_proxy.HTTPGeoUpstream',
+    'stand-in': 'core.geo_stub.StandInGeoUpstream',
+}
+
+# Global instance
+geo_proxy = None
+
+def get_geo_proxy():
+    """Get or create the global geo proxy configured in settings"""
+    global geo_proxy
+    if geo_proxy is None:
+        upstream_name = getattr(settings, 'GEO_UPSTREAM', 'http')
+        upstream_class = import_string(UPSTREAMS.get(upstream_name, upstream_name))
+        geo_proxy = GeoProxy(
+            upstream_class(),
+            caches[getattr(settings, 'GEO_CACHE_ALIAS', 'default')],
+            tile_precision=getattr(settings, 'GEO_TILE_PRECISION', 5),
+            reverse_precision=getattr(settings, 'GEO_REVERSE_PRECISION', 6),
+            overpass_ttl=getattr(settings, 'GEO_OVERPASS_TTL', 86400),
+            reverse_ttl=getattr(settings, 'GEO_REVERSE_TTL', 7 * 86400),
+            wikipedia_ttl=getattr(settings, 'GEO_WIKIPEDIA_TTL', 7 * 86400),
+        )
+    return geo_proxy
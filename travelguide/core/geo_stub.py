@@ -0,0 +1,93 @@
+import hashlib
+import math
+import threading
+import time
+
+from .geo_proxy import CATEGORIES
+
+# Stand-in landmarks sit on a fixed grid of cells this many degrees wide
+GRID_DEGREES = 0.004
+
+
+def _digest(*parts):
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).digest()
+
+
+class StandInGeoUpstream:
+    """
+    Offline stand-in for HTTPGeoUpstream
+
+    Landmarks are derived from a hash of a fixed grid cell, so every query over
+    the same ground returns the same elements whatever its bounding box; each
+    upstream call sleeps latency_ms and is counted in calls.
+    """
+
+    def __init__(self, latency_ms=0, density=0.15):
+        self.latency_ms = latency_ms
+        self.density = density
+        self._lock = threading.Lock()
+        self.calls = {'overpass': 0, 'reverse': 0, 'wikipedia': 0}
+
+    def _call(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def _cell_element(self, row, column, category):
+        digest = _digest(row, column, category)
+        if digest[0] / 256.0 >= self.density:
+            return None
+        key, value = CATEGORIES[category]
+        element_id = int.from_bytes(digest[1:6], 'big')
+        name = f"Stand-in {category.title()} {element_id % 10000}"
+        tags = {'name': name, key: value}
+        if digest[6] % 3 == 0:
+            tags['wikipedia'] = f"en:{name}"
+        return {
+            'type': 'node',
+            'id': element_id,
+            'lat': (row + digest[7] / 256.0) * GRID_DEGREES,
+            'lon': (column + digest[8] / 256.0) * GRID_DEGREES,
+            'tags': tags,
+        }
+
+    def overpass_bbox(self, bbox, categories):
+        self._call('overpass')
+        south, west, north, east = bbox
+        elements = []
+        for row in range(math.floor(south / GRID_DEGREES), math.floor(north / GRID_DEGREES) + 1):
+            for column in range(math.floor(west / GRID_DEGREES), math.floor(east / GRID_DEGREES) + 1):
+                for category in categories:
+                    element = self._cell_element(row, column, category)
+                    if element and south <= element['lat'] < north and west <= element['lon'] < east:
+                        elements.append(element)
+        return elements
+
+    def reverse_geocode(self, lat, lng):
+        self._call('reverse')
+        city = int.from_bytes(_digest(round(lat, 1), round(lng, 1))[:2], 'big') % 1000
+        return {
+            'display_name': f"Stand-in City {city}, Stand-in Country",
+            'lat': f"{lat:.6f}",
+            'lon': f"{lng:.6f}",
+            'address': {'city': f"Stand-in City {city}", 'country': 'Stand-in Country'},
+        }
+
+    def _summary(self, title):
+        if title.startswith('Missing'):
+            return None
+        readable = title.replace('_', ' ')
+        return {
+            'title': readable,
+            'extract': f"{readable} is a stand-in landmark used for offline testing.",
+            'thumbnail': None,
+        }
+
+    def wikipedia_summary(self, title):
+        self._call('wikipedia')
+        return self._summary(title)
+
+    def wikipedia_summaries(self, titles):
+        self._call('wikipedia')
+        return {title: self._summary(title) for title in titles}
@@ -1,22 +1,49 @@
-import os
 import torch
-from transformers import pipeline, set_seed, Pipeline
+from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline, set_seed, Pipeline
 import logging
+from collections import OrderedDict
 from typing import Optional
 
+from django.conf import settings
+
+from .batching import MicroBatcher
+from .model_lifecycle import ModelLifecycle
+from .model_snapshots import load_snapshot
+from .quantization import CPU_MODE_INT8, cpu_dtype, get_cpu_mode, quantize_dynamic_int8, resolve_cpu_mode
+
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = 'gpt2'
+
+# Descriptions shorter than this used to trigger a full regeneration; now the
+# end-of-text token is suppressed until this many tokens have been generated
+MIN_DESCRIPTION_TOKENS = 16
+
 class GPT2Service:
     """Service class for GPT-2 text generation for landmark descriptions"""
     
-    def __init__(self):
+    def __init__(self, cpu_mode=None, device=None, model_name=MODEL_NAME):
         self.generator: Optional[Pipeline] = None
-        self._is_loading = False
-        self._load_error = None
+        # Hub name or local path; benchmarks swap in tiny-random GPT-2 checkpoints
+        self.model_name = model_name
+        self.lifecycle = ModelLifecycle('gpt2')
         self.device: Optional[str] = None
+        self.dtype: Optional[torch.dtype] = None
+        # fp32, bf16 or int8 when running on CPU (default: GPT2_CPU_MODE / INFERENCE_CPU_MODE)
+        self.cpu_mode: Optional[str] = cpu_mode
+        self._requested_device = device
+        # Concurrent requests and bulk backfills share padded generate() calls
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=getattr(settings, 'GPT2_BATCH_MAX_SIZE', 8),
+            max_wait_ms=getattr(settings, 'GPT2_BATCH_MAX_WAIT_MS', 25),
+            name='gpt2',
+        )
     
     def _get_device(self):
         """Determine the best available device"""
+        if self._requested_device:
+            return self._requested_device
         if torch.cuda.is_available():
             return 'cuda'
         elif torch.backends.mps.is_available():
@@ -24,155 +51,226 @@ class GPT2Service:
         else:
             return 'cpu'
     
-    def _initialize_model(self):
-        """Initialize the GPT-2 model"""
-        if self._is_loading:
-            logger.info("GPT-2 model is already loading...")
-            return
-            
-        self._is_loading = True
-        self._load_error = None
+    def _initialize_model(self, use_snapshot=True):
+        """
+        Initialize the GPT-2 model
         
-        try:
-            self.device = self._get_device()
-            logger.info(f"Initializing GPT-2 model on device: {self.device}")
-            
-            # Set seed for reproducible results
-            set_seed(42)
-            
-            # Load GPT-2 model
-            # Use float32 for MPS to avoid LayerNormKernelImpl issues
-            dtype = torch.float32 if self.device == 'mps' else (torch.float16 if self.device == 'cuda' else torch.float32)
-            
-            self.generator = pipeline(
+        Loads at most once at a time; concurrent callers wait for the load in progress.
+        
+        Args:
+            use_snapshot (bool): Memory-map a local snapshot (see snapshot_models) if
+                one exists for this dtype, instead of loading from the hub
+        """
+        if not self.lifecycle.load(lambda: self._load_model(use_snapshot)):
+            raise RuntimeError(f"GPT-2 model failed to load: {self.lifecycle.error}")
+    
+    def _load_model(self, use_snapshot=True):
+        """Load, convert and quantize the model; raises on failure (see _initialize_model)"""
+        self.cpu_mode = resolve_cpu_mode(self.cpu_mode) if self.cpu_mode else get_cpu_mode('gpt2')
+        self.device = self._get_device()
+        logger.info(f"Initializing GPT-2 model on device: {self.device}")
+        
+        # Set seed for reproducible results
+        set_seed(42)
+        
+        # Load GPT-2 model
+        # Use float32 for MPS to avoid LayerNormKernelImpl issues
+        dtype = torch.float32 if self.device == 'mps' else (torch.float16 if self.device == 'cuda' else cpu_dtype(self.cpu_mode))
+        
+        snapshot = None
+        if use_snapshot:
+            snapshot = load_snapshot(
+                self.model_name, dtype, AutoModelForCausalLM, AutoTokenizer,
+                device='cuda' if self.device == 'cuda' else 'cpu'
+            )
+        if snapshot is not None:
+            model, tokenizer = snapshot
+            generator = pipeline(
+                'text-generation',
+                model=model,
+                tokenizer=tokenizer,
+                device=0 if self.device == 'cuda' else -1
+            )
+        else:
+            generator = pipeline(
                 'text-generation',
-                model='gpt2',
+                model=self.model_name,
                 device=0 if self.device == 'cuda' else -1,  # -1 for CPU, 0 for CUDA
                 torch_dtype=dtype
             )
-            
-            logger.info(f"GPT-2 model initialized successfully on {self.device}")
-            
-        except Exception as e:
-            self._load_error = str(e)
-            logger.error(f"Failed to initialize GPT-2 model: {str(e)}")
-            raise
-        finally:
-            self._is_loading = False
+        self.dtype = dtype
+        
+        if self.device == 'cpu' and self.cpu_mode == CPU_MODE_INT8:
+            quantize_dynamic_int8(generator.model)
+            logger.info("Applied dynamic int8 quantization to GPT-2")
+        
+        # GPT-2 has no padding token; batches are left-padded with end-of-text
+        # so every prompt ends right where generation starts
+        tokenizer = generator.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = 'left'
+        
+        self.generator = generator
+        
+        logger.info(f"GPT-2 model initialized successfully on {self.device} (cpu mode: {self.cpu_mode})")
+    
+    def _unavailable_error(self):
+        """Explain why descriptions can't be generated right now, or None if they can"""
+        if self.lifecycle.is_loading:
+            return 'GPT-2 model is still loading. Please try again in a moment.'
+        if not self.is_ready():
+            if self.lifecycle.error:
+                return f'GPT-2 model failed to load: {self.lifecycle.error}'
+            return 'GPT-2 model is not ready'
+        return None
+    
+    @staticmethod
+    def _prompt(landmark_name):
+        return f"Write a brief description of the significance and history of {landmark_name}:"
     
     def generate_landmark_description(self, landmark_name: str, max_length: int = 150, num_return_sequences: int = 1):
         """
         Generate a description about the landmark's significance and history
         
+        Concurrent calls are batched into one generation (see generate_landmark_descriptions).
+        
         Args:
             landmark_name (str): Name of the landmark from VQA model
             max_length (int): Maximum length of generated text
-            num_return_sequences (int): Number of sequences to generate
+            num_return_sequences (int): Kept for compatibility; only one description is generated
             
         Returns:
             dict: Contains 'success' (bool), 'description' (str), and 'error' (str if any)
         """
-        if self._is_loading:
-            return {
-                'success': False,
-                'description': None,
-                'error': 'GPT-2 model is still loading. Please try again in a moment.'
-            }
+        return self.generate_landmark_descriptions([landmark_name], max_length)[landmark_name]
+    
+    def generate_landmark_descriptions(self, landmark_names, max_length: int = 150):
+        """
+        Generate descriptions for many landmarks in shared, padded batches
         
-        if not self.is_ready():
-            if self._load_error:
-                return {
-                    'success': False,
-                    'description': None,
-                    'error': f'GPT-2 model failed to load: {self._load_error}'
-                }
-            return {
-                'success': False,
-                'description': None,
-                'error': 'GPT-2 model is not ready'
-            }
-        
-        try:
-            # Create a prompt for the landmark description
-            prompt = f"Write a brief description of the significance and history of {landmark_name}:"
-            
-            # Generate text
-            with torch.no_grad():
-                if self.generator is None:
-                    return {
-                        'success': False,
-                        'description': None,
-                        'error': 'GPT-2 generator is not initialized'
-                    }
-                
-                # Get the EOS token ID safely
-                pad_token_id = None
-                if hasattr(self.generator, 'tokenizer') and self.generator.tokenizer is not None:
-                    pad_token_id = getattr(self.generator.tokenizer, 'eos_token_id', None)
-                
-                result = self.generator(
-                    prompt,
-                    max_length=max_length,
-                    num_return_sequences=num_return_sequences,
-                    temperature=0.8,
-                    do_sample=True,
-                    pad_token_id=pad_token_id
-                )
-            
-            # Extract the generated text
-            if result and isinstance(result, list) and len(result) > 0:
-                first_result = result[0]
-                if isinstance(first_result, dict) and 'generated_text' in first_result:
-                    generated_text = first_result['generated_text']
-                    
-                    # Clean up the text - remove the original prompt and clean formatting
-                    if isinstance(generated_text, str):
-                        description = generated_text.replace(prompt, '').strip()
-                        
-                        # If the description is too short, try with a longer max_length
-                        if len(description) < 50 and max_length < 200:
-                            return self.generate_landmark_description(landmark_name, max_length + 50, num_return_sequences)
-                        
-                        logger.info(f"Generated description for {landmark_name}: {description[:100]}...")
-                        
-                        return {
-                            'success': True,
-                            'description': description,
-                            'error': None
-                        }
-            
-            return {
-                'success': False,
-                'description': None,
-                'error': 'No text was generated'
-            }
+        Duplicate names are generated once. The names are queued together with
+        any concurrent requests, up to GPT2_BATCH_MAX_SIZE prompts per generation.
+        
+        Args:
+            landmark_names (list): Landmark names
+            max_length (int): Maximum length of prompt plus generated text, in tokens
             
-        except Exception as e:
-            logger.error(f"Error generating landmark description: {str(e)}")
-            return {
-                'success': False,
-                'description': None,
-                'error': str(e)
-            }
+        Returns:
+            dict: Landmark name to a result dict with 'success', 'description' and 'error'
+        """
+        names = list(OrderedDict.fromkeys(landmark_names))
+        error = self._unavailable_error()
+        if error:
+            return {name: {'success': False, 'description': None, 'error': error} for name in names}
+        
+        results = {}
+        for name, result in zip(names, self._batcher.submit_many([(name, max_length) for name in names])):
+            if isinstance(result, Exception):
+                logger.error(f"Error generating landmark description: {str(result)}")
+                result = {'success': False, 'description': None, 'error': str(result)}
+            results[name] = result
+        return results
+    
+    def _generate_batch(self, items):
+        """
+        Run one batch of (landmark_name, max_length) requests
+        
+        Requests are grouped by max_length and identical ones share a row.
+        Runs on the batcher thread only.
+        """
+        groups = OrderedDict()
+        for landmark_name, max_length in items:
+            groups.setdefault(max_length, OrderedDict()).setdefault(landmark_name, None)
+        
+        descriptions = {}
+        for max_length, names in groups.items():
+            try:
+                texts = self._generate_group(list(names), max_length)
+                for name, text in zip(names, texts):
+                    descriptions[(name, max_length)] = text
+            except Exception as e:
+                for name in names:
+                    descriptions[(name, max_length)] = e
+        
+        results = []
+        for item in items:
+            description = descriptions[item]
+            if isinstance(description, Exception):
+                results.append(description)
+            elif description:
+                logger.info(f"Generated description for {item[0]}: {description[:100]}...")
+                results.append({'success': True, 'description': description, 'error': None})
+            else:
+                results.append({'success': False, 'description': None, 'error': 'No text was generated'})
+        return results
+    
+    def _generate_group(self, landmark_names, max_length):
+        """Generate one description per name with a single padded generate() call"""
+        if self.generator is None:
+            raise RuntimeError('GPT-2 generator is not initialized')
+        model = self.generator.model
+        tokenizer = self.generator.tokenizer
+        
+        inputs = tokenizer(
+            [self._prompt(name) for name in landmark_names],
+            return_tensors='pt',
+            padding=True
+        ).to(model.device)
+        prompt_length = inputs['input_ids'].shape[1]
+        # max_length used to count the prompt; keep that budget for the longest prompt
+        max_new_tokens = max(MIN_DESCRIPTION_TOKENS, max_length - prompt_length)
+        
+        with torch.no_grad():
+            output = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                min_new_tokens=MIN_DESCRIPTION_TOKENS,
+                temperature=0.8,
+                do_sample=True,
+                pad_token_id=tokenizer.pad_token_id
+            )
+        
+        return [
+            text.strip()
+            for text in tokenizer.batch_decode(output[:, prompt_length:], skip_special_tokens=True)
+        ]
+    
+    def get_batch_metrics(self):
+        """Get per-batch size and latency statistics for the GPT-2 batcher"""
+        metrics = self._batcher.metrics.snapshot()
+        metrics.update({
+            'max_batch_size': self._batcher.max_batch_size,
+            'max_wait_ms': self._batcher.max_wait * 1000,
+        })
+        return metrics
     
     def is_ready(self):
         """Check if the GPT-2 service is ready to use"""
-        return self.generator is not None
+        return self.lifecycle.is_ready and self.generator is not None
     
     def is_loading(self):
         """Check if the GPT-2 service is currently loading"""
-        return self._is_loading
+        return self.lifecycle.is_loading
     
     def get_status(self):
         """Get the current status of the GPT-2 service"""
-        if self._is_loading:
-            return 'loading'
-        elif self.is_ready():
-            return 'ready'
-        elif self._load_error:
-            return 'error'
-        else:
-            return 'not_initialized'
+        return self.lifecycle.state
+    
+    def get_lifecycle(self):
+        """Get the load state of the GPT-2 model with its timestamps and load duration"""
+        return self.lifecycle.snapshot()
+    
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the model to finish loading, starting the load if nobody has yet
+        
+        Returns:
+            bool: Whether the model is ready
+        """
+        self.lifecycle.start(self._load_model)
+        self.lifecycle.wait(timeout)
+        return self.is_ready()
 
 # Global instance
 gpt2_service = None
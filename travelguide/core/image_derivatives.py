@@ -0,0 +1,268 @@
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for each kind of image: about 1x and 2x the sizes the templates show them at
+DERIVATIVE_WIDTHS = {
+    'avatar': (64, 128, 240),
+    'landmark': (480, 800, 1200, 1600),
+}
+
+# Best first, as offered to browsers in <source> elements
+FORMAT_ORDER = ('avif', 'webp')
+FORMAT_OPTIONS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 80, 'method': 4},
+}
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+}
+
+# Derivatives live in the default storage next to the original's name, whatever
+# storage holds the original (uploads are content-addressed, derivatives aren't).
+# This manifest lists the widths and formats generated for it.
+MANIFEST_SUFFIX = '.derivatives.json'
+# Images whose derivatives aren't ready yet are looked for again after this many seconds
+MISSING_MANIFEST_TTL = 30
+
+
+def available_formats():
+    """IMAGE_DERIVATIVE_FORMATS this Pillow build can encode, best first"""
+    try:
+        # AVIF support for Pillow < 11.3 (pip install pillow-avif-plugin)
+        import pillow_avif  # noqa: F401
+    except ImportError:
+        pass
+    Image.init()
+    configured = [
+        fmt.strip().lower()
+        for fmt in getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', 'avif,webp').split(',') if fmt.strip()
+    ]
+    return [fmt for fmt in FORMAT_ORDER if fmt in configured and fmt.upper() in Image.SAVE]
+
+
+def derivative_name(name, width, fmt):
+    """Storage name of one derivative: landmark_images/a.jpg -> landmark_images/a.jpg.480w.webp"""
+    # The original's extension stays in, so a.jpg and a.png don't share derivatives
+    return f"{name}.{width}w.{fmt}"
+
+
+def manifest_name(name):
+    return f"{name}{MANIFEST_SUFFIX}"
+
+
+def render_derivatives(data, widths, formats):
+    """
+    Encode resized copies of an image; runs in a worker process
+
+    The image is decoded once (JPEGs in draft mode, at about the largest
+    width) and each size is resized from the next larger one.
+
+    Args:
+        data (bytes): The original image file
+        widths (list): Target widths; ones wider than the image are capped to it
+        formats (list): Keys of FORMAT_OPTIONS
+
+    Returns:
+        tuple: (widths generated in ascending order, list of (width, format, bytes))
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.format == 'JPEG':
+        # Either side may become the width once the EXIF orientation is applied
+        image.draft('RGB', (max(widths), max(widths)))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    targets = sorted({min(width, image.width) for width in widths}, reverse=True)
+    outputs = []
+    for width in targets:
+        if width != image.width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            encoded = io.BytesIO()
+            image.save(encoded, fmt.upper(), **FORMAT_OPTIONS[fmt])
+            outputs.append((width, fmt, encoded.getvalue()))
+    return sorted(targets), outputs
+
+
+def _cache():
+    return caches[getattr(settings, 'IMAGE_DERIVATIVE_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(name):
+    return f"image-derivatives:{hashlib.sha1(name.encode('utf-8')).hexdigest()}"
+
+
+def _replace(name, content):
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def derivative_url(name, width, fmt):
+    return default_storage.url(derivative_name(name, width, fmt))
+
+
+def _load_manifest(name):
+    key = _cache_key(name)
+    cache = _cache()
+    manifest = cache.get(key)
+    if manifest is None:
+        try:
+            with default_storage.open(manifest_name(name), 'rb') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = {}
+        cache.set(key, manifest, timeout=None if manifest else MISSING_MANIFEST_TTL)
+    return manifest or None
+
+
+def get_derivatives(field_file):
+    """
+    The derivatives generated for a stored image
+
+    Returns:
+        dict: 'widths' and 'formats', or None while there are none
+    """
+    if not field_file:
+        return None
+    return _load_manifest(field_file.name)
+
+
+def delete_derivatives(name):
+    """Delete the derivatives of an image, e.g. once the original is deleted"""
+    manifest = _load_manifest(name)
+    if manifest:
+        for width in manifest['widths']:
+            for fmt in manifest['formats']:
+                default_storage.delete(derivative_name(name, width, fmt))
+    default_storage.delete(manifest_name(name))
+    _cache().delete(_cache_key(name))
+
+
+class DerivativeGenerator:
+    """
+    Generates resized WebP/AVIF copies of uploaded images in the background
+
+    Storage reads and writes happen on a few threads; decoding, resizing and
+    encoding run in a process pool, so they use every core without holding
+    up the web workers.
+    """
+
+    def __init__(self, processes=2):
+        self.processes = processes
+        self._threads = ThreadPoolExecutor(max_workers=processes, thread_name_prefix='image-derivatives')
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.generated = 0
+        self.failed = 0
+
+    def _process_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # Spawned, not forked: forking a threaded web server can deadlock the child
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            self._pool = None
+
+    def _count(self, counter):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def schedule(self, storage, name, kind, refresh=False):
+        """
+        Generate the derivatives of a stored image in the background
+
+        Args:
+            storage (Storage): Where the image is, e.g. landmark_image.image.storage
+            name (str): Its storage name
+            kind (str): Key of DERIVATIVE_WIDTHS
+            refresh (bool): Regenerate derivatives that already exist
+
+        Returns:
+            Future: Resolves to the manifest (see generate)
+        """
+        return self._threads.submit(self.generate, storage, name, kind, refresh)
+
+    def generate(self, storage, name, kind, refresh=False):
+        """
+        Generate and store the derivatives of one image
+
+        Returns:
+            dict: 'widths' and 'formats' generated, or None if it failed
+        """
+        if not refresh:
+            # e.g. a re-upload of content-addressed bytes that were already processed
+            manifest = _load_manifest(name)
+            if manifest:
+                return manifest
+        formats = available_formats()
+        if not formats:
+            logger.warning("No image derivative formats available; check IMAGE_DERIVATIVE_FORMATS")
+            return None
+        try:
+            with storage.open(name, 'rb') as source:
+                data = source.read()
+            try:
+                widths, outputs = self._process_pool().submit(
+                    render_derivatives, data, DERIVATIVE_WIDTHS[kind], formats
+                ).result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool next time
+                self._reset_pool()
+                raise
+            for width, fmt, encoded in outputs:
+                _replace(derivative_name(name, width, fmt), encoded)
+            manifest = {'widths': widths, 'formats': formats}
+            _replace(manifest_name(name), json.dumps(manifest).encode('utf-8'))
+            _cache().set(_cache_key(name), manifest, timeout=None)
+            self._count('generated')
+            return manifest
+        except Exception as e:
+            self._count('failed')
+            logger.error(f"❌ Could not generate derivatives of {name}: {str(e)}")
+            return None
+
+    def get_stats(self):
+        """Get counters of images processed by this process"""
+        with self._stats_lock:
+            return {
+                'formats': available_formats(),
+                'generated': self.generated,
+                'failed': self.failed,
+            }
+
+
+# Global instance
+derivative_generator = None
+
+def get_derivative_generator():
+    """Get or create the global image derivative generator"""
+    global derivative_generator
+    if derivative_generator is None:
+        derivative_generator = DerivativeGenerator(
+            processes=getattr(settings, 'IMAGE_DERIVATIVE_PROCESSES', 2)
+        )
+    return derivative_generator
@@ -0,0 +1,150 @@
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from PIL import Image
+
+# MiniCPM-V-2 encodes every slice (and the downscaled whole image) at this
+# resolution into QUERY_NUM vision tokens
+SCALE_RESOLUTION = 448
+QUERY_NUM = 64
+
+
+@dataclass(frozen=True)
+class ResolutionPolicy:
+    """How much of a photo the vision encoder gets to see"""
+    name: str
+    # Longest edge in pixels the image is reduced to before slicing (None: as uploaded)
+    max_edge: Optional[int]
+    # Most 448px slices the model may cut the image into (1: no slicing)
+    max_slice_nums: int
+
+    def describe(self):
+        edge = f"{self.max_edge}px" if self.max_edge else 'full size'
+        slices = f"up to {self.max_slice_nums} slices" if self.max_slice_nums > 1 else 'no slicing'
+        return f"{self.name} ({edge}, {slices}, <= {self.max_vision_tokens} vision tokens)"
+
+    @property
+    def max_vision_tokens(self):
+        return vision_token_count(None, None, self.max_slice_nums)
+
+
+# 'full' is what MiniCPM-V-2 does out of the box
+RESOLUTION_POLICIES = {
+    policy.name: policy for policy in (
+        ResolutionPolicy('full', None, 9),
+        ResolutionPolicy('balanced', 1344, 6),
+        ResolutionPolicy('fast', 896, 4),
+        ResolutionPolicy('single', 448, 1),
+    )
+}
+
+
+def get_resolution_policy(name=None):
+    """
+    Get a resolution policy by name (default: VQA_RESOLUTION_POLICY)
+
+    VQA_MAX_IMAGE_EDGE and VQA_MAX_SLICE_NUMS override the configured policy's limits.
+
+    Raises:
+        ValueError: If the name is not one of RESOLUTION_POLICIES
+    """
+    configured = name is None
+    name = (name or getattr(settings, 'VQA_RESOLUTION_POLICY', 'balanced') or 'balanced').lower()
+    if name not in RESOLUTION_POLICIES:
+        raise ValueError(
+            f"Unknown resolution policy '{name}', expected one of {', '.join(RESOLUTION_POLICIES)}"
+        )
+    policy = RESOLUTION_POLICIES[name]
+    if configured:
+        max_edge = getattr(settings, 'VQA_MAX_IMAGE_EDGE', None)
+        max_slice_nums = getattr(settings, 'VQA_MAX_SLICE_NUMS', None)
+        if max_edge or max_slice_nums:
+            policy = ResolutionPolicy(
+                f"{name}-custom",
+                max_edge or policy.max_edge,
+                max_slice_nums or policy.max_slice_nums,
+            )
+    return policy
+
+
+def slice_count(width, height, max_slice_nums):
+    """
+    Number of slices MiniCPM-V-2 cuts an image of this size into
+
+    Mirrors the model's slice_image(): the grid has about one slice per
+    SCALE_RESOLUTION squared of area, picked among neighbouring slice counts to
+    best match the aspect ratio.
+
+    Returns:
+        int: 0 when the image is encoded whole
+    """
+    ratio = width * height / (SCALE_RESOLUTION * SCALE_RESOLUTION)
+    multiple = min(math.ceil(ratio), max_slice_nums)
+    if multiple <= 1:
+        return 0
+    log_ratio = math.log(width / height)
+    best_grid = (1, 1)
+    min_error = float('inf')
+    for count in (multiple - 1, multiple, multiple + 1):
+        if count == 1 or count > max_slice_nums:
+            continue
+        for columns in range(1, count + 1):
+            if count % columns:
+                continue
+            error = abs(log_ratio - math.log(columns / (count // columns)))
+            if error < min_error:
+                best_grid = (columns, count // columns)
+                min_error = error
+    return best_grid[0] * best_grid[1]
+
+
+def vision_token_count(width, height, max_slice_nums):
+    """
+    Vision tokens MiniCPM-V-2 spends on an image: the whole image plus each slice
+
+    With no size given, the most any image can cost under max_slice_nums.
+    """
+    if width is None or height is None:
+        # Grids are only picked among slice counts up to the cap
+        slices = max_slice_nums if max_slice_nums > 1 else 0
+    else:
+        slices = slice_count(width, height, max_slice_nums)
+    return QUERY_NUM * (1 + slices)
+
+
+def load_image(source, policy=None):
+    """
+    Decode a photo as RGB, no larger than the policy allows
+
+    JPEGs are decoded in draft mode, so the decoder itself skips the detail the
+    policy would throw away (a 12 MP photo is decoded at 1/2 to 1/8 scale)
+    instead of decoding every pixel and resizing afterwards.
+
+    Args:
+        source: Path to the image file, its bytes, a file-like object or an
+            already decoded PIL image (which is left unchanged)
+        policy (ResolutionPolicy, optional): Defaults to the configured policy
+
+    Returns:
+        PIL.Image.Image: The RGB image
+    """
+    policy = policy or get_resolution_policy()
+    if isinstance(source, Image.Image):
+        image = source
+    else:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        elif hasattr(source, 'seek'):
+            source.seek(0)
+        image = Image.open(source)
+        if policy.max_edge and image.format == 'JPEG' and max(image.size) > policy.max_edge:
+            # Picks the smallest scale that still covers max_edge on both sides
+            image.draft('RGB', (policy.max_edge, policy.max_edge))
+    # convert() copies, so a caller's decoded image is never resized in place
+    image = image.convert('RGB')
+    if policy.max_edge and max(image.size) > policy.max_edge:
+        image.thumbnail((policy.max_edge, policy.max_edge), Image.Resampling.BICUBIC)
+    return image
@@ -0,0 +1,368 @@
+import logging
+import os
+import threading
+import time
+import zlib
+from multiprocessing.connection import Client
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceServerError(Exception):
+    """Raised when the inference server cannot be reached or rejects a call"""
+
+
+def get_server_authkey():
+    """Shared secret used to authenticate connections to the inference server"""
+    authkey = getattr(settings, 'INFERENCE_SERVER_AUTHKEY', '') or settings.SECRET_KEY
+    return authkey.encode('utf-8')
+
+
+def worker_address(address, index):
+    """Socket path on which only the given inference worker accepts connections"""
+    return f"{address}.{index}"
+
+
+class InferenceClient:
+    """
+    Thin client for the inference server over a local Unix socket
+
+    Each thread keeps its own connection, so concurrent requests from one web
+    worker reach the server in parallel and can be micro-batched there. Calls
+    made for a conversation go to the worker chosen by hashing its id, so
+    every turn finds the context that worker cached for the previous one.
+    """
+
+    def __init__(self, address=None, authkey=None, timeout=None):
+        self.address = address or settings.INFERENCE_SERVER_SOCKET
+        self.authkey = authkey or get_server_authkey()
+        self.timeout = timeout if timeout is not None else getattr(settings, 'INFERENCE_SERVER_TIMEOUT', 300)
+        self._local = threading.local()
+        self._worker_count = None
+
+    def _count_workers(self):
+        # The server binds one socket per worker next to the shared one
+        count = 0
+        while os.path.exists(worker_address(self.address, count)):
+            count += 1
+        return count
+
+    def _route(self, affinity):
+        """Socket address to use for a call, pinned to one worker when affinity is given"""
+        if affinity is None:
+            return self.address
+        if self._worker_count is None:
+            self._worker_count = self._count_workers()
+        if not self._worker_count:
+            return self.address
+        index = zlib.crc32(str(affinity).encode('utf-8')) % self._worker_count
+        return worker_address(self.address, index)
+
+    def _connection(self, address):
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(address)
+        if conn is None:
+            conn = Client(address, family='AF_UNIX', authkey=self.authkey)
+            conns[address] = conn
+        return conn
+
+    def _reset(self, address):
+        conn = getattr(self._local, 'conns', {}).pop(address, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, service, method, *args, affinity=None, **kwargs):
+        """
+        Call a method on a model service inside the inference server
+
+        Args:
+            service (str): 'vqa' or 'gpt2'
+            method (str): Service method name
+            affinity (str, optional): Key (e.g. a conversation id) whose calls
+                must all reach the same inference worker
+
+        Returns:
+            Whatever the service method returned
+        """
+        request = (service, method, args, kwargs)
+        for attempt in range(2):
+            address = self._route(affinity)
+            try:
+                conn = self._connection(address)
+                conn.send(request)
+                if not conn.poll(self.timeout):
+                    self._reset(address)
+                    raise InferenceServerError(f"Inference server timed out after {self.timeout}s")
+                status, payload = conn.recv()
+                break
+            except (OSError, EOFError) as e:
+                # The server may have restarted (possibly with another number
+                # of workers) since this thread last connected; reconnect once
+                # before giving up
+                self._reset(address)
+                self._worker_count = None
+                if attempt:
+                    raise InferenceServerError(f"Inference server unavailable: {str(e)}") from e
+
+        if status != 'ok':
+            raise InferenceServerError(payload)
+        return payload
+
+    def stream(self, service, method, *args, affinity=None, **kwargs):
+        """
+        Call a streaming service method, yielding each piece the server sends
+
+        Args:
+            service (str): 'vqa' or 'gpt2'
+            method (str): Service method name (must return a generator)
+            affinity (str, optional): Key whose calls must all reach the same worker
+
+        Yields:
+            Each chunk produced by the service method
+        """
+        # Streams get their own connection: the consumer may resume the
+        # generator on a different thread than the one that started it
+        try:
+            conn = Client(self._route(affinity), family='AF_UNIX', authkey=self.authkey)
+        except (OSError, EOFError) as e:
+            self._worker_count = None
+            raise InferenceServerError(f"Inference server unavailable: {str(e)}") from e
+
+        with conn:
+            try:
+                conn.send((service, method, args, kwargs))
+                while True:
+                    if not conn.poll(self.timeout):
+                        raise InferenceServerError(f"Inference server timed out after {self.timeout}s")
+                    status, payload = conn.recv()
+                    if status == 'chunk':
+                        yield payload
+                    elif status == 'ok':
+                        return
+                    else:
+                        raise InferenceServerError(payload)
+            except (OSError, EOFError) as e:
+                raise InferenceServerError(f"Inference server unavailable: {str(e)}") from e
+
+
+class RemoteModelService:
+    """Base class for proxies that forward service calls to the inference server"""
+
+    service_name = None
+
+    def __init__(self, client=None):
+        self.client = client or InferenceClient()
+
+    def _call(self, method, *args, affinity=None, **kwargs):
+        return self.client.call(self.service_name, method, *args, affinity=affinity, **kwargs)
+
+    def _initialize_model(self):
+        """Models are loaded by the inference server, nothing to do here"""
+        logger.info(f"{self.service_name} model is managed by the inference server")
+
+    def is_ready(self):
+        """Check if the remote service is ready to use"""
+        try:
+            return self._call('is_ready')
+        except InferenceServerError:
+            return False
+
+    def is_loading(self):
+        """Check if the remote service is currently loading"""
+        try:
+            return self._call('is_loading')
+        except InferenceServerError:
+            return False
+
+    def get_status(self):
+        """Get the current status of the remote service"""
+        try:
+            return self._call('get_status')
+        except InferenceServerError as e:
+            logger.warning(f"Could not get {self.service_name} status: {str(e)}")
+            return 'error'
+
+    def get_lifecycle(self):
+        """Get the load state of the model in the inference server"""
+        try:
+            return self._call('get_lifecycle')
+        except InferenceServerError as e:
+            return {'model': self.service_name, 'state': 'error', 'error': str(e)}
+
+    def wait_until_ready(self, timeout=None):
+        """Poll the inference server until its model is ready or has failed to load"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            status = self.get_status()
+            if status == 'ready':
+                return True
+            if status == 'error' or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(1)
+
+
+class RemoteVQAService(RemoteModelService):
+    """Drop-in replacement for VQAService that runs inference in the inference server"""
+
+    service_name = 'vqa'
+
+    def identify_landmark(self, image, embedding_path=None):
+        """
+        Identify landmark in the given image
+
+        Args:
+            image: Path to the image file (must be readable by the server), its
+                bytes, a file-like object or a decoded PIL image; in-memory images
+                are sent over the socket
+            embedding_path (str, optional): Where the server keeps the image's vision embedding
+
+        Returns:
+            dict: Contains 'success' (bool), 'landmark_name' (str), and 'error' (str if any)
+        """
+        if hasattr(image, 'read'):
+            # File objects can't be pickled; their encoded bytes are also the smallest payload
+            image.seek(0)
+            image = image.read()
+        try:
+            return self._call('identify_landmark', image, embedding_path)
+        except InferenceServerError as e:
+            return {
+                'success': False,
+                'landmark_name': None,
+                'error': str(e)
+            }
+
+    def chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                   embedding_path=None):
+        """
+        Chat with the VQA model using landmark context
+
+        Conversation state lives in the inference worker the conversation id
+        hashes to, so follow-ups reuse it whichever web worker they arrive on.
+
+        Returns:
+            dict: Contains 'success' (bool), 'response' (str), and 'error' (str if any)
+        """
+        try:
+            return self._call(
+                'chat_with_landmark_context', user_message, landmark_name, image_path, conversation_id,
+                embedding_path, affinity=conversation_id
+            )
+        except InferenceServerError as e:
+            return {
+                'success': False,
+                'response': None,
+                'error': str(e)
+            }
+
+    def stream_chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                          embedding_path=None):
+        """
+        Chat with the VQA model, yielding the answer as the server generates it
+
+        Yields:
+            str: Pieces of the response text, in order
+        """
+        yield from self.client.stream(
+            self.service_name, 'stream_chat_with_landmark_context',
+            user_message, landmark_name, image_path, conversation_id, embedding_path,
+            affinity=conversation_id
+        )
+
+    def get_batch_metrics(self):
+        """Get batching statistics from the server's VQA service"""
+        try:
+            return self._call('get_batch_metrics')
+        except InferenceServerError as e:
+            return {'error': str(e)}
+
+    def get_streaming_metrics(self):
+        """Get time-to-first-token statistics from the server's VQA service"""
+        try:
+            return self._call('get_streaming_metrics')
+        except InferenceServerError as e:
+            return {'error': str(e)}
+
+    def get_conversation_metrics(self):
+        """Get cached conversation statistics from the server's VQA service"""
+        try:
+            return self._call('get_conversation_metrics')
+        except InferenceServerError as e:
+            return {'error': str(e)}
+
+    def get_unavailable_reason(self):
+        """Explain why the remote service can't take requests right now"""
+        try:
+            return self._call('get_unavailable_reason')
+        except InferenceServerError as e:
+            return str(e)
+
+
+class RemoteGPT2Service(RemoteModelService):
+    """Drop-in replacement for GPT2Service that runs inference in the inference server"""
+
+    service_name = 'gpt2'
+
+    def generate_landmark_description(self, landmark_name, max_length=150, num_return_sequences=1):
+        """
+        Generate a description about the landmark's significance and history
+
+        Returns:
+            dict: Contains 'success' (bool), 'description' (str), and 'error' (str if any)
+        """
+        try:
+            return self._call('generate_landmark_description', landmark_name, max_length, num_return_sequences)
+        except InferenceServerError as e:
+            return {
+                'success': False,
+                'description': None,
+                'error': str(e)
+            }
+
+    def generate_landmark_descriptions(self, landmark_names, max_length=150):
+        """
+        Generate descriptions for many landmarks in shared, padded batches
+
+        Returns:
+            dict: Landmark name to a result dict with 'success', 'description' and 'error'
+        """
+        try:
+            return self._call('generate_landmark_descriptions', list(landmark_names), max_length)
+        except InferenceServerError as e:
+            return {
+                name: {'success': False, 'description': None, 'error': str(e)}
+                for name in landmark_names
+            }
+
+    def get_batch_metrics(self):
+        """Get batching statistics from the server's GPT-2 service"""
+        try:
+            return self._call('get_batch_metrics')
+        except InferenceServerError as e:
+            return {'error': str(e)}
+
+
+# Global instances
+remote_vqa_service = None
+remote_gpt2_service = None
+
+def get_remote_vqa_service():
+    """Get or create the global remote VQA service proxy"""
+    global remote_vqa_service
+    if remote_vqa_service is None:
+        remote_vqa_service = RemoteVQAService()
+    return remote_vqa_service
+
+def get_remote_gpt2_service():
+    """Get or create the global remote GPT-2 service proxy"""
+    global remote_gpt2_service
+    if remote_gpt2_service is None:
+        remote_gpt2_service = RemoteGPT2Service()
+    return remote_gpt2_service
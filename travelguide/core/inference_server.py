@@ -0,0 +1,207 @@
+import inspect
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import Listener
+from multiprocessing import AuthenticationError
+
+from .inference_client import get_server_authkey, worker_address
+
+logger = logging.getLogger(__name__)
+
+# Methods clients may call on each service
+ALLOWED_METHODS = {
+    'vqa': {
+        'identify_landmark',
+        'chat_with_landmark_context',
+        'stream_chat_with_landmark_context',
+        'get_batch_metrics',
+        'get_streaming_metrics',
+        'get_conversation_metrics',
+        'get_unavailable_reason',
+        'get_status',
+        'get_lifecycle',
+        'is_ready',
+        'is_loading',
+    },
+    'gpt2': {
+        'generate_landmark_description',
+        'generate_landmark_descriptions',
+        'get_batch_metrics',
+        'get_status',
+        'get_lifecycle',
+        'is_ready',
+        'is_loading',
+    },
+}
+
+
+def _get_local_services():
+    from .gpt2_service import get_gpt2_service
+    from .vqa_service import get_vqa_service
+    return {
+        'vqa': get_vqa_service(),
+        'gpt2': get_gpt2_service(),
+    }
+
+
+def _handle_connection(conn, services):
+    """Serve requests from one client connection until it closes"""
+    with conn:
+        while True:
+            try:
+                service_name, method, args, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+            except Exception as e:
+                logger.warning(f"Dropping malformed inference request: {str(e)}")
+                return
+
+            try:
+                if method not in ALLOWED_METHODS.get(service_name, ()):
+                    conn.send(('error', f"Unknown inference method {service_name}.{method}"))
+                    continue
+                try:
+                    result = getattr(services[service_name], method)(*args, **kwargs)
+                    if inspect.isgenerator(result):
+                        # Streaming methods send each piece as it is produced; if the
+                        # client has gone, closing the generator stops its model call
+                        try:
+                            for chunk in result:
+                                conn.send(('chunk', chunk))
+                        finally:
+                            result.close()
+                        result = None
+                    reply = ('ok', result)
+                except Exception as e:
+                    logger.error(f"Error in {service_name}.{method}: {str(e)}")
+                    reply = ('error', str(e))
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+
+
+def _accept_loop(listener, services, index):
+    """Accept clients on one listener, serving each on its own thread"""
+    while True:
+        try:
+            conn = listener.accept()
+        except AuthenticationError as e:
+            logger.warning(f"Rejected inference client: {str(e)}")
+            continue
+        except OSError as e:
+            logger.error(f"Inference worker {index} stopped accepting: {str(e)}")
+            return
+        # One thread per connection, so concurrent clients reach the
+        # service together and can share a micro-batch
+        threading.Thread(
+            target=_handle_connection, args=(conn, services), daemon=True,
+            name=f"inference-conn-{index}"
+        ).start()
+
+
+def _worker_main(listener, own_listener, index):
+    """Entry point of a worker process: load the models, then accept clients"""
+    # The parent handles shutdown; workers just exit when terminated
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    from .services import load_local_models
+
+    services = _get_local_services()
+    threading.Thread(target=load_local_models, daemon=True, name="AI-Models-Loader").start()
+    logger.info(f"Inference worker {index} (pid {os.getpid()}) started")
+
+    # Chat requests for a conversation arrive on this worker's own socket, so
+    # they always reach the ConversationStore that holds its context
+    threading.Thread(
+        target=_accept_loop, args=(own_listener, services, index), daemon=True,
+        name=f"inference-accept-{index}"
+    ).start()
+    _accept_loop(listener, services, index)
+
+
+class InferenceServer:
+    """
+    Standalone model server with a pre-forked pool of worker processes
+
+    Every worker loads its own copy of the VQA and GPT-2 models and accepts
+    connections on a shared Unix socket, so model memory scales with the number
+    of inference workers instead of the number of web workers. Each worker also
+    listens on its own socket (see worker_address), which clients use to send
+    every turn of a conversation to the same worker.
+    """
+
+    def __init__(self, address, workers=1, authkey=None):
+        self.address = address
+        self.workers = max(1, int(workers))
+        self.authkey = authkey or get_server_authkey()
+        self._processes = []
+        self._listener = None
+        self._worker_listeners = []
+        self._stopping = False
+
+    def _start_worker(self, index):
+        # Fork so the worker inherits the listening socket and Django setup
+        context = multiprocessing.get_context('fork')
+        process = context.Process(
+            target=_worker_main, args=(self._listener, self._worker_listeners[index], index),
+            name=f"inference-worker-{index}"
+        )
+        process.start()
+        return process
+
+    def _stop(self, signum=None, frame=None):
+        self._stopping = True
+
+    def _listen(self, address):
+        if os.path.exists(address):
+            os.unlink(address)
+        listener = Listener(address, family='AF_UNIX', authkey=self.authkey)
+        os.chmod(address, 0o660)
+        return listener
+
+    def _remove_stale_worker_sockets(self):
+        # A previous run with more workers may have left sockets behind that
+        # clients would otherwise try to route conversations to
+        index = self.workers
+        while os.path.exists(worker_address(self.address, index)):
+            os.unlink(worker_address(self.address, index))
+            index += 1
+
+    def serve_forever(self):
+        """Start the worker pool and supervise it until SIGINT/SIGTERM"""
+        self._remove_stale_worker_sockets()
+        self._listener = self._listen(self.address)
+        self._worker_listeners = [
+            self._listen(worker_address(self.address, i)) for i in range(self.workers)
+        ]
+
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+
+        try:
+            self._processes = [self._start_worker(i) for i in range(self.workers)]
+            logger.info(f"Inference server listening on {self.address} with {self.workers} worker(s)")
+
+            while not self._stopping:
+                for i, process in enumerate(self._processes):
+                    if not process.is_alive() and not self._stopping:
+                        logger.error(f"Inference worker {i} exited with code {process.exitcode}, restarting")
+                        self._processes[i] = self._start_worker(i)
+                time.sleep(1)
+        finally:
+            logger.info("Shutting down inference server...")
+            for process in self._processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in self._processes:
+                process.join(timeout=10)
+            for listener in [self._listener] + self._worker_listeners:
+                listener.close()
+            for address in [self.address] + [worker_address(self.address, i) for i in range(self.workers)]:
+                if os.path.exists(address):
+                    os.unlink(address)
@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .descriptions import get_or_generate_description
+from .embedding_store import embedding_name, embedding_path
+from .image_preprocessing import load_image
+from .landmark_cache import get_landmark_cache
+from .models import LandmarkImage
+from .services import get_gpt2_service, get_vqa_service
+
+logger = logging.getLogger(__name__)
+
+# Rough progress reported to the client for each job status
+STATUS_PROGRESS = {
+    LandmarkImage.STATUS_QUEUED: 10,
+    LandmarkImage.STATUS_IDENTIFYING: 40,
+    LandmarkImage.STATUS_DESCRIBING: 75,
+    LandmarkImage.STATUS_COMPLETED: 100,
+    LandmarkImage.STATUS_FAILED: 100,
+}
+
+
+def _update_job(landmark_image, **fields):
+    for name, value in fields.items():
+        setattr(landmark_image, name, value)
+    landmark_image.save(update_fields=list(fields))
+
+
+def _wait_for_model(service, timeout):
+    """
+    Wait until a model service is ready, starting it if nobody has yet
+
+    Runs on a job worker thread, so a cold model never blocks a web request.
+
+    Returns:
+        str: None when ready, otherwise the reason it isn't
+    """
+    if service.wait_until_ready(timeout):
+        return None
+    if service.get_status() == 'error':
+        return 'VQA model failed to load. Please try again later.'
+    return 'VQA model is still loading. Please try again in a moment.'
+
+
+def _claim_job(landmark_image_id):
+    """Atomically move a queued job to identifying so only one worker runs it"""
+    claimed = LandmarkImage.objects.filter(
+        id=landmark_image_id, status=LandmarkImage.STATUS_QUEUED
+    ).update(status=LandmarkImage.STATUS_IDENTIFYING, started_at=timezone.now())
+    if not claimed:
+        return None
+    return LandmarkImage.objects.get(id=landmark_image_id)
+
+
+def run_landmark_job(landmark_image_id, image=None, cache_keys=None):
+    """
+    Identify an uploaded landmark image, then describe it with GPT-2
+
+    Status and results are written back to the LandmarkImage row as the job
+    moves through identifying -> describing -> completed (or failed).
+
+    Args:
+        landmark_image_id (int): Primary key of the LandmarkImage to process
+        image (PIL.Image.Image, optional): The upload, already decoded; read from
+            storage if not given (e.g. for jobs requeued after a restart)
+        cache_keys (list, optional): The upload's landmark cache keys
+    """
+    close_old_connections()
+    try:
+        landmark_image = _claim_job(landmark_image_id)
+        if landmark_image is None:
+            return
+
+        vqa_service = get_vqa_service()
+        wait_error = _wait_for_model(vqa_service, settings.LANDMARK_JOB_MODEL_WAIT_SECONDS)
+        if wait_error:
+            _update_job(
+                landmark_image,
+                status=LandmarkImage.STATUS_FAILED,
+                error=wait_error,
+                completed_at=timezone.now(),
+            )
+            return
+
+        # The model saves the image's vision embedding for later chats
+        vision_embedding_path = embedding_path(landmark_image.id)
+        result = vqa_service.identify_landmark(
+            image if image is not None else landmark_image.image.path, vision_embedding_path
+        )
+        if not result['success']:
+            _update_job(
+                landmark_image,
+                status=LandmarkImage.STATUS_FAILED,
+                error=result['error'] or 'Could not identify landmark',
+                completed_at=timezone.now(),
+            )
+            return
+
+        _update_job(
+            landmark_image,
+            landmark_name=result['landmark_name'],
+            vision_embedding=(
+                embedding_name(landmark_image.id) if os.path.exists(vision_embedding_path) else None
+            ),
+            status=LandmarkImage.STATUS_DESCRIBING,
+        )
+
+        # Reuse the stored description of this landmark, or generate it once with GPT-2
+        description = None
+        try:
+            description_result = get_or_generate_description(result['landmark_name'], get_gpt2_service())
+            if description_result['success']:
+                description = description_result['description']
+            else:
+                logger.warning(f"GPT-2 description generation failed: {description_result['error']}")
+        except Exception as e:
+            logger.warning(f"Error generating description with GPT-2: {str(e)}")
+
+        _update_job(
+            landmark_image,
+            description=description,
+            status=LandmarkImage.STATUS_COMPLETED,
+            completed_at=timezone.now(),
+        )
+
+        try:
+            if cache_keys:
+                get_landmark_cache().store(None, result['landmark_name'], description, keys=cache_keys)
+            else:
+                # Keyed like find_landmark_view does, on the image reduced for the model
+                get_landmark_cache().store(load_image(landmark_image.image.path), result['landmark_name'], description)
+        except Exception as e:
+            logger.warning(f"Could not cache landmark result: {str(e)}")
+
+    except Exception as e:
+        logger.error(f"Error in landmark job {landmark_image_id}: {str(e)}")
+        LandmarkImage.objects.filter(id=landmark_image_id).update(
+            status=LandmarkImage.STATUS_FAILED,
+            error='An error occurred during landmark identification',
+            completed_at=timezone.now(),
+        )
+    finally:
+        close_old_connections()
+
+
+class LandmarkJobQueue:
+    """In-process pool of background threads that run landmark identification jobs"""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='landmark-job')
+        self._recovered = False
+        self._lock = threading.Lock()
+
+    def enqueue(self, landmark_image, image=None, cache_keys=None):
+        """
+        Queue a LandmarkImage for identification once the current transaction commits
+
+        Args:
+            landmark_image (LandmarkImage): Row created with status 'queued'
+            image (PIL.Image.Image, optional): The decoded upload, handed to the
+                job in memory instead of being read back from storage
+            cache_keys (list, optional): The upload's landmark cache keys
+        """
+        self._recover_once()
+        image_id = landmark_image.id
+        transaction.on_commit(lambda: self._executor.submit(run_landmark_job, image_id, image, cache_keys))
+
+    def _recover_once(self):
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        self._executor.submit(self.recover_stale_jobs)
+
+    def recover_stale_jobs(self):
+        """
+        Requeue jobs left behind by a restarted process
+
+        Jobs stuck mid-run for longer than LANDMARK_JOB_STALE_SECONDS are reset
+        to queued; queued jobs created before that are then submitted again.
+        Younger queued jobs are left alone: they include the upload that
+        triggered this recovery, whose own submission carries the image in memory. The atomic claim in
+        run_landmark_job keeps a job from running twice.
+        """
+        close_old_connections()
+        try:
+            stale_before = timezone.now() - timedelta(seconds=settings.LANDMARK_JOB_STALE_SECONDS)
+            LandmarkImage.objects.filter(
+                status__in=[LandmarkImage.STATUS_IDENTIFYING, LandmarkImage.STATUS_DESCRIBING],
+                started_at__lt=stale_before,
+            ).update(status=LandmarkImage.STATUS_QUEUED)
+            queued_ids = list(
+                LandmarkImage.objects.filter(
+                    status=LandmarkImage.STATUS_QUEUED, identified_at__lt=stale_before
+                ).values_list('id', flat=True)
+            )
+        finally:
+            close_old_connections()
+        for image_id in queued_ids:
+            self._executor.submit(run_landmark_job, image_id)
+        if queued_ids:
+            logger.info(f"Requeued {len(queued_ids)} pending landmark job(s)")
+
+
+def get_job_status(landmark_image):
+    """Build the JSON payload describing a landmark job"""
+    return {
+        'job_id': landmark_image.id,
+        'status': landmark_image.status,
+        'stage': landmark_image.get_status_display(),
+        'progress': STATUS_PROGRESS.get(landmark_image.status, 0),
+        'done': not landmark_image.is_pending,
+        'success': landmark_image.status == LandmarkImage.STATUS_COMPLETED,
+        'landmark_name': landmark_image.landmark_name,
+        'description': landmark_image.description,
+        'error': landmark_image.error or None,
+        'image_url': landmark_image.image.url if landmark_image.image else None,
+    }
+
+
+# Global instance
+landmark_job_queue = None
+
+def get_landmark_job_queue():
+    """Get or create the global landmark job queue"""
+    global landmark_job_queue
+    if landmark_job_queue is None:
+        landmark_job_queue = LandmarkJobQueue(workers=settings.LANDMARK_JOB_WORKERS)
+    return landmark_job_queue
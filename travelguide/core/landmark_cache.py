@@ -0,0 +1,365 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def perceptual_hash(image, hash_size=8):
+    """
+    Compute a 64-bit difference hash (dHash) of an image
+
+    Visually identical images (re-encoded, resized, recompressed) get the same
+    hash, unlike a byte-level digest.
+
+    Args:
+        image (PIL.Image.Image): Decoded image
+        hash_size (int): Hash grid size (hash_size * hash_size bits)
+
+    Returns:
+        str: Hex encoded hash
+    """
+    gray = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def content_hash(image):
+    """SHA-256 of the decoded RGB pixels (independent of the file container)"""
+    rgb = image.convert('RGB')
+    digest = hashlib.sha256(f"{rgb.width}x{rgb.height}:".encode('ascii'))
+    digest.update(rgb.tobytes())
+    return digest.hexdigest()
+
+
+class MemoryLRUBackend:
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, ttl, max_entries, **options):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileBackend:
+    """
+    JSON files on local disk, shared between processes on the same host
+
+    Entries are sharded by key prefix. Reads refresh the file mtime so the
+    oldest mtimes are evicted first once max_entries is exceeded.
+    """
+
+    def __init__(self, ttl, max_entries, location=None, **options):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.location = str(location or settings.LANDMARK_CACHE_DIR)
+        self._lock = threading.Lock()
+        self._writes_since_cull = 0
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.location, name[:2], f"{name}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires_at') is not None and entry['expires_at'] < time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('value')
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            'expires_at': time.time() + self.ttl if self.ttl else None,
+            'value': value,
+        }
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w') as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._writes_since_cull += 1
+            should_cull = self._writes_since_cull >= max(1, self.max_entries // 10)
+            if should_cull:
+                self._writes_since_cull = 0
+        if should_cull:
+            self._cull()
+
+    def clear(self):
+        for path in self._entry_paths():
+            self._remove(path)
+
+    def _entry_paths(self):
+        if not os.path.isdir(self.location):
+            return []
+        paths = []
+        for shard in os.scandir(self.location):
+            if shard.is_dir():
+                paths.extend(entry.path for entry in os.scandir(shard.path) if entry.name.endswith('.json'))
+        return paths
+
+    def _cull(self):
+        paths = self._entry_paths()
+        if len(paths) <= self.max_entries:
+            return
+        by_age = []
+        for path in paths:
+            try:
+                by_age.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        by_age.sort()
+        for _, path in by_age[:len(by_age) - self.max_entries]:
+            self._remove(path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class DjangoCacheBackend:
+    """Store entries in a Django cache (size limits come from its CACHES OPTIONS)"""
+
+    def __init__(self, ttl, max_entries, alias=None, **options):
+        self.ttl = ttl
+        self.cache = caches[alias or settings.LANDMARK_CACHE_ALIAS]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, timeout=self.ttl or None)
+
+    def clear(self):
+        # Never flush a shared Django cache; entries expire by TTL
+        pass
+
+
+BACKENDS = {
+    'memory': MemoryLRUBackend,
+    'file': FileBackend,
+    'django': DjangoCacheBackend,
+}
+
+
+class LandmarkResultCache:
+    """
+    Cache landmark identification results by image content
+
+    Results are keyed by the exact SHA-256 of the decoded pixels, so only the
+    same photo hits. With match_perceptual, a photo whose perceptual hash is
+    within max_distance bits of a cached one also hits, so re-encoded or resized
+    copies are recognised; this is opt-in because different photos can share a
+    dHash. A hit carries the landmark name and GPT-2 description, so the caller
+    can skip model inference entirely.
+    """
+
+    KEY_PREFIX = 'landmark-result'
+    # Candidates remembered per perceptual hash band
+    MAX_BAND_CANDIDATES = 16
+
+    def __init__(self, backend, match_perceptual=False, max_distance=4):
+        self.backend = backend
+        self.match_perceptual = match_perceptual
+        self.max_distance = max(0, min(int(max_distance), 63))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+
+    def keys_for(self, image):
+        """
+        Cache keys of a decoded image, to hash it once for both lookup and store
+
+        The first key is the exact content key; a perceptual hash key follows
+        when perceptual matching is enabled.
+        """
+        keys = [f"{self.KEY_PREFIX}:sha256:{content_hash(image)}"]
+        if self.match_perceptual:
+            phash = perceptual_hash(image)
+            # Flat images all hash to zero, so they can't be told apart
+            if int(phash, 16) not in (0, 2 ** 64 - 1):
+                keys.append(f"{self.KEY_PREFIX}:phash:{phash}")
+        return keys
+
+    def _band_keys(self, phash):
+        """
+        Index keys for the bands of a perceptual hash
+
+        The 64 bits are split into max_distance + 1 bands, so any two hashes
+        within max_distance bits of each other agree exactly on at least one band.
+        """
+        bits = int(phash, 16)
+        bands = self.max_distance + 1
+        keys = []
+        start = 0
+        for band in range(bands):
+            width = (64 - start) // (bands - band)
+            value = (bits >> (64 - start - width)) & ((1 << width) - 1)
+            keys.append(f"{self.KEY_PREFIX}:phash-band:{bands}:{band}:{value:x}")
+            start += width
+        return keys
+
+    def _split_keys(self, keys):
+        exact_key = keys[0]
+        phash = None
+        if self.match_perceptual and len(keys) > 1:
+            phash = keys[1].rsplit(':', 1)[-1]
+        return exact_key, phash
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _lookup_perceptual(self, phash):
+        bits = int(phash, 16)
+        best = None
+        for band_key in self._band_keys(phash):
+            for candidate_phash, exact_key in self.backend.get(band_key) or ():
+                distance = bin(bits ^ int(candidate_phash, 16)).count('1')
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, exact_key)
+        if best is None:
+            return None
+        return self.backend.get(best[1])
+
+    def lookup(self, image, keys=None):
+        """
+        Look up a cached result for an image
+
+        Args:
+            image (PIL.Image.Image): Decoded uploaded image
+            keys (list, optional): keys_for(image), if already computed
+
+        Returns:
+            dict: 'landmark_name' and 'description', or None on a miss
+        """
+        try:
+            exact_key, phash = self._split_keys(keys or self.keys_for(image))
+            value = self.backend.get(exact_key)
+            if value is not None:
+                self._count('hits')
+                return value
+            if phash is not None:
+                value = self._lookup_perceptual(phash)
+                if value is not None:
+                    self._count('perceptual_hits')
+                    return value
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Landmark cache lookup failed: {str(e)}")
+            return None
+        self._count('misses')
+        return None
+
+    def store(self, image, landmark_name, description=None, keys=None):
+        """Cache the identification result for an image (or its keys_for(image), with image None)"""
+        value = {
+            'landmark_name': landmark_name,
+            'description': description,
+        }
+        try:
+            exact_key, phash = self._split_keys(keys or self.keys_for(image))
+            self.backend.set(exact_key, value)
+            if phash is not None:
+                for band_key in self._band_keys(phash):
+                    # Best effort: a concurrent store may drop a candidate, which only costs a miss
+                    candidates = [
+                        entry for entry in (self.backend.get(band_key) or ()) if entry[1] != exact_key
+                    ]
+                    candidates.append([phash, exact_key])
+                    self.backend.set(band_key, candidates[-self.MAX_BAND_CANDIDATES:])
+            self._count('stores')
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Landmark cache store failed: {str(e)}")
+
+    def get_stats(self):
+        """Get hit/miss counters for this process"""
+        with self._lock:
+            lookups = self.hits + self.perceptual_hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'hits': self.hits,
+                'perceptual_hits': self.perceptual_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'errors': self.errors,
+                'hit_rate': ((self.hits + self.perceptual_hits) / lookups) if lookups else None,
+            }
+
+
+# Global instance
+landmark_cache = None
+
+def get_landmark_cache():
+    """Get or create the global landmark result cache configured in settings"""
+    global landmark_cache
+    if landmark_cache is None:
+        backend_name = getattr(settings, 'LANDMARK_CACHE_BACKEND', 'memory')
+        backend_class = BACKENDS.get(backend_name) or import_string(backend_name)
+        backend = backend_class(
+            ttl=getattr(settings, 'LANDMARK_CACHE_TTL', 7 * 24 * 3600),
+            max_entries=getattr(settings, 'LANDMARK_CACHE_MAX_ENTRIES', 1000),
+        )
+        landmark_cache = LandmarkResultCache(
+            backend,
+            match_perceptual=getattr(settings, 'LANDMARK_CACHE_MATCH_PERCEPTUAL', False),
+            max_distance=getattr(settings, 'LANDMARK_CACHE_PERCEPTUAL_MAX_DISTANCE', 4),
+        )
+    return landmark_cache
@@ -0,0 +1,464 @@
+import http.cookiejar
+import io
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import Counter
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import Client
+from PIL import Image
+
+from .batching import percentile
+from .models import LandmarkImage, SavedLocation
+from .saved_locations import bump_saved_locations_version
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests land in the last, open bucket
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+QUERY_COUNT_HEADER = 'X-Loadtest-Queries'
+LOADTEST_PASSWORD = 'loadtest-password'
+
+# Seeded saved locations are scattered around this point (central Paris)
+SEED_CENTER = (48.8566, 2.3522)
+SEED_PLACE_TYPES = [['museum'], ['park'], ['restaurant', 'food'], ['tourist_attraction'], ['church']]
+
+
+def make_test_image(seed, size=(96, 96)):
+    """
+    A small JPEG that differs for every seed
+
+    Noise images never match each other in the landmark cache, so every upload
+    exercises the identification job unless seeds are repeated on purpose.
+    """
+    rng = random.Random(seed)
+    image = Image.effect_noise(size, 64).convert('RGB')
+    tint = Image.new('RGB', size, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = io.BytesIO()
+    Image.blend(image, tint, 0.5).save(buffer, 'JPEG', quality=80)
+    return buffer.getvalue()
+
+
+def seed_data(prefix, users, locations_per_user, seed=0):
+    """
+    Create load-test users, each with saved locations around SEED_CENTER
+
+    Returns:
+        list: The created users (their password is LOADTEST_PASSWORD)
+    """
+    rng = random.Random(seed)
+    created = []
+    for index in range(users):
+        user = User.objects.create_user(
+            username=f"{prefix}-{index}",
+            password=LOADTEST_PASSWORD,
+            first_name='Load',
+            last_name=f"Test {index}",
+        )
+        SavedLocation.objects.bulk_create([
+            SavedLocation(
+                user=user,
+                name=f"Seeded place {index}-{number}",
+                address=f"{number} Rue de Test, Paris",
+                latitude=round(SEED_CENTER[0] + rng.uniform(-0.05, 0.05), 6),
+                longitude=round(SEED_CENTER[1] + rng.uniform(-0.08, 0.08), 6),
+                place_id=f"{prefix}-seed-{index}-{number}",
+                types=rng.choice(SEED_PLACE_TYPES),
+                rating=round(rng.uniform(3, 5), 1),
+                user_ratings_total=rng.randrange(10, 5000),
+            )
+            for number in range(locations_per_user)
+        ])
+        # bulk_create skips the signals that invalidate cached routes
+        bump_saved_locations_version(user.id)
+        created.append(user)
+    return created
+
+
+def remove_seed_data(prefix):
+    """Delete the load-test users and everything they own (locations, uploaded images)"""
+    users = User.objects.filter(username__startswith=f"{prefix}-")
+    for landmark_image in LandmarkImage.objects.filter(user__in=users):
+        if landmark_image.image:
+            landmark_image.image.delete(save=False)
+        landmark_image.delete()
+    deleted, _ = users.delete()
+    return deleted
+
+
+def wait_for_jobs(users, timeout=60):
+    """Wait until the seeded users' landmark jobs have finished, so teardown doesn't race them"""
+    deadline = time.monotonic() + timeout
+    pending = LandmarkImage.objects.filter(user__in=users, status__in=LandmarkImage.PENDING_STATUSES)
+    while pending.exists():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.2)
+    return True
+
+
+class QueryCounter:
+    """Execute wrapper that counts the queries run on one database connection"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def count_queries(app):
+    """Wrap a WSGI application so every response reports how many queries it ran"""
+    def counting_app(environ, start_response):
+        counter = QueryCounter()
+
+        def counted_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [(QUERY_COUNT_HEADER, str(counter.count))], exc_info)
+
+        with connection.execute_wrapper(counter):
+            return app(environ, counted_start_response)
+
+    return counting_app
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_wsgi(app, host='127.0.0.1', port=0):
+    """
+    Serve a WSGI application from background threads on a local port
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done
+    """
+    server = make_server(host, port, app, server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True, name='loadtest-wsgi').start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+class ClientDriver:
+    """Sends requests in-process through the Django test client, as one logged-in user"""
+
+    name = 'client'
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method, path, json_body=None, files=None, headers=None):
+        """
+        Send one request
+
+        Returns:
+            tuple: (status code, number of database queries it ran)
+        """
+        extra = {f"HTTP_{name.upper().replace('-', '_')}": value for name, value in (headers or {}).items()}
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            if method == 'GET':
+                response = self.client.get(path, **extra)
+            elif files:
+                data = {
+                    field: SimpleUploadedFile(filename, content, content_type='image/jpeg')
+                    for field, (filename, content) in files.items()
+                }
+                response = self.client.post(path, data, **extra)
+            else:
+                response = self.client.post(path, json.dumps(json_body or {}), content_type='application/json', **extra)
+        return response.status_code, counter.count
+
+    def close(self):
+        connections.close_all()
+
+
+class HTTPDriver:
+    """Sends requests over HTTP to a running server, logging in through the login form"""
+
+    name = 'http'
+
+    def __init__(self, base_url, username, password, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self._login(username, password)
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def _login(self, username, password):
+        self.opener.open(f"{self.base_url}/login/", timeout=self.timeout).read()
+        body = urllib.parse.urlencode({
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self._csrf_token(),
+        }).encode('utf-8')
+        self.opener.open(f"{self.base_url}/login/", body, timeout=self.timeout).read()
+        if not any(cookie.name == 'sessionid' for cookie in self.cookies):
+            raise RuntimeError(f"Could not log in as {username}")
+
+    def request(self, method, path, json_body=None, files=None, headers=None):
+        """
+        Send one request
+
+        Returns:
+            tuple: (status code, database queries reported by the server, or None)
+        """
+        request_headers = {'X-CSRFToken': self._csrf_token(), 'Referer': f"{self.base_url}/"}
+        request_headers.update(headers or {})
+        body = None
+        if method != 'GET':
+            if files:
+                boundary = uuid.uuid4().hex
+                body = _multipart_body(boundary, files)
+                request_headers['Content-Type'] = f"multipart/form-data; boundary={boundary}"
+            else:
+                body = json.dumps(json_body or {}).encode('utf-8')
+                request_headers['Content-Type'] = 'application/json'
+
+        request = urllib.request.Request(f"{self.base_url}{path}", data=body, headers=request_headers, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status, queries = response.status, response.headers.get(QUERY_COUNT_HEADER)
+        except urllib.error.HTTPError as e:
+            e.read()
+            status, queries = e.code, e.headers.get(QUERY_COUNT_HEADER)
+        return status, int(queries) if queries is not None else None
+
+    def close(self):
+        pass
+
+
+def _multipart_body(boundary, files):
+    parts = []
+    for field, (filename, content) in files.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: image/jpeg\r\n\r\n".encode('utf-8') + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode('utf-8'))
+    return b''.join(parts)
+
+
+class Endpoint:
+    """One endpoint in the load mix and how to build a request for it"""
+
+    def __init__(self, name, method, path, build=None, headers=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build
+        self.headers = headers or {}
+
+    def send(self, driver, context):
+        json_body, files = self.build(context) if self.build else (None, None)
+        return driver.request(self.method, self.path, json_body=json_body, files=files, headers=self.headers)
+
+
+def default_endpoints(prefix, image_pool=0):
+    """
+    The endpoint mix of the app's main flows
+
+    Args:
+        image_pool (int): Upload one of this many distinct images to find-landmark
+            to exercise the landmark cache; 0 uploads a new image every time
+    """
+    def find_landmark(context):
+        seed = context['sequence'] % image_pool if image_pool else f"{context['worker']}-{context['sequence']}"
+        return None, {'image': (f"loadtest-{seed}.jpg", make_test_image(seed))}
+
+    def vqa_chat(context):
+        return {'message': 'When was it built?', 'landmark_name': 'Eiffel Tower'}, None
+
+    def save_location(context):
+        number = context['sequence']
+        return {
+            'place_id': f"{prefix}-saved-{context['worker']}-{number}",
+            'name': f"Load test place {number}",
+            'address': f"{number} Avenue de Test, Paris",
+            'latitude': SEED_CENTER[0],
+            'longitude': SEED_CENTER[1],
+            'types': ['tourist_attraction'],
+            'rating': 4.5,
+            'user_ratings_total': 100,
+        }, None
+
+    return {
+        'find_landmark': Endpoint(
+            'find_landmark', 'POST', '/find-landmark/', find_landmark, headers={'Accept': 'application/json'}
+        ),
+        'vqa_chat': Endpoint('vqa_chat', 'POST', '/vqa-chat/', vqa_chat),
+        'save_location': Endpoint('save_location', 'POST', '/save-location/', save_location),
+        'get_saved_locations': Endpoint('get_saved_locations', 'GET', '/get-saved-locations/'),
+        'plan': Endpoint('plan', 'GET', '/plan/'),
+        'plan_route': Endpoint('plan_route', 'GET', '/plan/route/?day_hours=8'),
+    }
+
+
+class EndpointStats:
+    """Latency, status and query statistics of one endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies_ms = []
+        self.queries = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    def record(self, latency_ms, status=None, queries=None, error=None):
+        with self._lock:
+            self.latencies_ms.append(latency_ms)
+            if status is not None:
+                self.statuses[status] += 1
+            if queries is not None:
+                self.queries.append(queries)
+            if error is not None:
+                self.errors[error] += 1
+
+    def snapshot(self, wall_seconds):
+        with self._lock:
+            latencies = list(self.latencies_ms)
+            queries = list(self.queries)
+            statuses = dict(self.statuses)
+            errors = dict(self.errors)
+
+        histogram = Counter()
+        for latency in latencies:
+            bucket = next((f"<={bound}" for bound in HISTOGRAM_BUCKETS_MS if latency <= bound),
+                          f">{HISTOGRAM_BUCKETS_MS[-1]}")
+            histogram[bucket] += 1
+        failed = sum(count for status, count in statuses.items() if status >= 400) + sum(errors.values())
+
+        return {
+            'requests': len(latencies),
+            'rps': round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+            'failed': failed,
+            'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+            'errors': errors,
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': max(latencies) if latencies else None,
+            },
+            'latency_histogram_ms': {
+                bucket: histogram[bucket]
+                for bucket in [f"<={bound}" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}"]
+            },
+            'db_queries': {
+                'mean': round(sum(queries) / len(queries), 2) if queries else None,
+                'p95': percentile(queries, 95),
+                'max': max(queries) if queries else None,
+            },
+        }
+
+
+def run_load(make_driver, endpoints, weights, concurrency, duration=None, total_requests=None, seed=0):
+    """
+    Drive a weighted mix of endpoints from concurrent workers
+
+    Each worker gets its own driver (one logged-in user) and picks endpoints at
+    random by weight until the duration has passed or total_requests were sent.
+
+    Args:
+        make_driver (callable): Takes a worker index and returns a driver
+        endpoints (dict): Endpoint name to Endpoint
+        weights (dict): Endpoint name to relative weight
+        concurrency (int): Number of concurrent workers
+        duration (float, optional): Seconds to run
+        total_requests (int, optional): Requests to send across all workers
+
+    Returns:
+        dict: 'wall_seconds', 'total' and per-endpoint statistics
+    """
+    names = [name for name in weights if weights[name] > 0]
+    stats = {name: EndpointStats() for name in names}
+    total_stats = EndpointStats()
+    remaining = [total_requests]
+    remaining_lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+    start_barrier = threading.Barrier(concurrency + 1)
+
+    def take_ticket():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        if remaining[0] is None:
+            return True
+        with remaining_lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{index}")
+        driver = None
+        try:
+            driver = make_driver(index)
+        except Exception as e:
+            logger.error(f"Load test worker {index} could not start: {str(e)}")
+        start_barrier.wait()
+        if driver is None:
+            return
+        sequence = 0
+        try:
+            while take_ticket():
+                name = rng.choices(names, weights=[weights[name] for name in names])[0]
+                context = {'worker': index, 'sequence': sequence}
+                sequence += 1
+                started = time.perf_counter()
+                try:
+                    status, queries = endpoints[name].send(driver, context)
+                    error = None
+                except Exception as e:
+                    status, queries, error = None, None, type(e).__name__
+                latency_ms = (time.perf_counter() - started) * 1000
+                stats[name].record(latency_ms, status, queries, error)
+                total_stats.record(latency_ms, status, queries, error)
+        finally:
+            driver.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(index,), daemon=True, name=f"loadtest-{index}")
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    # Logins and setup happen before the clock starts
+    start_barrier.wait()
+    started = time.perf_counter()
+    if deadline is not None:
+        deadline = time.monotonic() + duration
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        'wall_seconds': round(wall_seconds, 3),
+        'total': total_stats.snapshot(wall_seconds),
+        'endpoints': {name: endpoint_stats.snapshot(wall_seconds) for name, endpoint_stats in stats.items()},
+    }
@@ -0,0 +1,299 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_LANDMARKS = [
+    'Eiffel Tower', 'Taj Mahal', 'Golden Gate Bridge', 'Colosseum', 'Sydney Opera House',
+    'Statue of Liberty', 'Machu Picchu', 'Big Ben',
+]
+
+DEFAULT_QUESTIONS = [
+    'When was it built?',
+    'What is it made of?',
+    'Why is it famous?',
+    'What is the best time to visit?',
+]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark VQA and GPT-2 inference: load time, latency percentiles, tokens/sec, '
+            'peak RSS and concurrent throughput, written to JSON for regression checks')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--service',
+            choices=['vqa', 'gpt2', 'all'],
+            default='all',
+            help='Which model to benchmark (default: all)',
+        )
+        parser.add_argument(
+            '--backend',
+            choices=['local', 'stand-in'],
+            default='local',
+            help="'local' loads the real models; 'stand-in' uses offline deterministic "
+                 "stand-ins to benchmark the serving code without model weights (default: local)",
+        )
+        parser.add_argument(
+            '--gpt2-model',
+            default=None,
+            help='GPT-2 checkpoint to load instead of gpt2, e.g. a cached tiny-random model',
+        )
+        parser.add_argument(
+            '--images',
+            help='Directory of landmark photos, or a JSON file of [{"image": path, "landmark": name}] '
+                 '(required for VQA with the local backend)',
+        )
+        parser.add_argument(
+            '--landmarks',
+            default=','.join(DEFAULT_LANDMARKS),
+            help='Comma separated landmark names to describe with GPT-2',
+        )
+        parser.add_argument(
+            '--device',
+            default=None,
+            help='Device to run on: cpu, cuda or mps (default: best available)',
+        )
+        parser.add_argument(
+            '--cpu-mode',
+            default=None,
+            help='CPU mode to run in (default: INFERENCE_CPU_MODE and per-model overrides)',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Timed sequential calls per input (default: 3)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=1,
+            help='Untimed calls before measuring (default: 1)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            default='1,4,8',
+            help='Comma separated numbers of concurrent callers (default: 1,4,8)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=None,
+            help='Calls per concurrency level (default: 4 per caller)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results to this JSON file',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Earlier results JSON to compare against; fails if a metric regressed',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.1,
+            help='Relative change allowed before --compare reports a regression (default: 0.1)',
+        )
+
+    def handle(self, *args, **options):
+        from core.benchmarking import compare_results, environment_info
+
+        try:
+            concurrency_levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        except ValueError:
+            raise CommandError('--concurrency must be comma separated integers')
+        if any(level < 1 for level in concurrency_levels):
+            raise CommandError('--concurrency levels must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read {options['compare']}: {str(e)}")
+
+        services = ['vqa', 'gpt2'] if options['service'] == 'all' else [options['service']]
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'backend': options['backend'],
+            'environment': environment_info(),
+            'settings': {
+                'runs': options['runs'],
+                'warmup': options['warmup'],
+                'concurrency': concurrency_levels,
+                'requests': options['requests'],
+                'cpu_mode': options['cpu_mode'],
+                'device': options['device'],
+                'gpt2_model': options['gpt2_model'],
+            },
+            'benchmarks': {},
+        }
+
+        if 'vqa' in services:
+            report['benchmarks'].update(self._benchmark_vqa(options, concurrency_levels))
+        if 'gpt2' in services:
+            report['benchmarks'].update(self._benchmark_gpt2(options, concurrency_levels))
+
+        self._print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+        if baseline is not None:
+            if baseline.get('backend') != report['backend']:
+                self.stderr.write(
+                    f"⚠️ Comparing {report['backend']} results against a {baseline.get('backend')} baseline"
+                )
+            regressions = compare_results(report, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(
+                        f"❌ {regression['benchmark']} {regression['metric']}: "
+                        f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%})"
+                    )
+                raise CommandError(f"{len(regressions)} metric(s) regressed beyond {options['tolerance']:.0%}")
+            self.stdout.write(self.style.SUCCESS(f"✅ No regressions against {options['compare']}"))
+
+    def _run(self, name, service, call, inputs, count_tokens, load_info, options, concurrency_levels):
+        from core.batching import BatchMetrics
+        from core.benchmarking import measure_calls, measure_concurrency, peak_rss_mb
+
+        self.stdout.write(f"🔄 Benchmarking {name}...")
+        result = dict(load_info)
+        result.update(measure_calls(
+            call, inputs, runs=max(1, options['runs']), warmup=max(0, options['warmup']),
+            count_tokens=count_tokens,
+        ))
+        result['concurrency'] = [
+            measure_concurrency(call, inputs, level, options['requests'])
+            for level in concurrency_levels
+        ]
+        result['peak_rss_mb'] = peak_rss_mb()
+        # Batch statistics of this benchmark only
+        result['batching'] = service.get_batch_metrics()
+        service._batcher.metrics = BatchMetrics()
+        return result
+
+    def _benchmark_vqa(self, options, concurrency_levels):
+        from core.benchmarking import load_image_cases, time_load
+
+        if options['backend'] == 'stand-in':
+            from core.stand_ins import StandInVQAService
+
+            service = StandInVQAService()
+            images = [f"stand-in-{index}.jpg" for index in range(8)]
+
+            def count_tokens(text):
+                return len(text.split())
+        else:
+            from core.vqa_service import VQAService
+
+            if not options['images']:
+                raise CommandError('--images is required to benchmark VQA with the local backend')
+            try:
+                images = [case['image'] for case in load_image_cases(options['images'])]
+            except ValueError as e:
+                raise CommandError(str(e))
+            if not images:
+                raise CommandError(f"No images found in {options['images']}")
+            service = VQAService(cpu_mode=options['cpu_mode'], device=options['device'])
+
+            def count_tokens(text):
+                return len(service.tokenizer.encode(text, add_special_tokens=False))
+
+        try:
+            load_info = time_load(service._initialize_model)
+        except Exception as e:
+            raise CommandError(f"Could not load the VQA model: {str(e)}")
+
+        def identify(image):
+            result = service.identify_landmark(image)
+            return result['landmark_name'] if result['success'] else None
+
+        # Every question is asked about one image with no conversation, so each call runs the vision encoder
+        chat_inputs = [
+            (question, images[index % len(images)])
+            for index, question in enumerate(DEFAULT_QUESTIONS)
+        ]
+
+        def chat(value):
+            question, image = value
+            result = service.chat_with_landmark_context(question, 'this landmark', image_path=image)
+            return result['response'] if result['success'] else None
+
+        results = {
+            'vqa.identify_landmark': self._run(
+                'identify_landmark', service, identify, images, count_tokens, load_info, options, concurrency_levels
+            ),
+            'vqa.chat_with_landmark_context': self._run(
+                'chat_with_landmark_context', service, chat, chat_inputs, count_tokens, load_info, options,
+                concurrency_levels
+            ),
+        }
+        service._batcher.shutdown()
+        return results
+
+    def _benchmark_gpt2(self, options, concurrency_levels):
+        from core.benchmarking import time_load
+
+        landmarks = [name.strip() for name in options['landmarks'].split(',') if name.strip()]
+        if not landmarks:
+            raise CommandError('--landmarks must name at least one landmark')
+
+        if options['backend'] == 'stand-in':
+            from core.stand_ins import StandInGPT2Service
+
+            service = StandInGPT2Service()
+
+            def count_tokens(text):
+                return len(text.split())
+        else:
+            from core.gpt2_service import MODEL_NAME, GPT2Service
+
+            service = GPT2Service(
+                cpu_mode=options['cpu_mode'], device=options['device'],
+                model_name=options['gpt2_model'] or MODEL_NAME,
+            )
+
+            def count_tokens(text):
+                return len(service.generator.tokenizer.encode(text))
+
+        try:
+            load_info = time_load(service._initialize_model)
+        except Exception as e:
+            raise CommandError(f"Could not load the GPT-2 model: {str(e)}")
+
+        def describe(landmark):
+            result = service.generate_landmark_description(landmark)
+            return result['description'] if result['success'] else None
+
+        result = self._run(
+            'generate_landmark_description', service, describe, landmarks, count_tokens, load_info, options,
+            concurrency_levels
+        )
+        service._batcher.shutdown()
+        return {'gpt2.generate_landmark_description': result}
+
+    def _print_report(self, report):
+        self.stdout.write(f"\nBackend: {report['backend']}")
+        for name, result in report['benchmarks'].items():
+            latency = result['latency_ms']
+            line = (
+                f"  {name}: load {result['load_seconds']}s, "
+                f"p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms, p99 {latency['p99']:.0f} ms"
+            )
+            if result['tokens_per_second'] is not None:
+                line += f", {result['tokens_per_second']:.1f} tokens/s"
+            if result['peak_rss_mb'] is not None:
+                line += f", peak RSS {result['peak_rss_mb']:.0f} MB"
+            self.stdout.write(line)
+            for run in result['concurrency']:
+                self.stdout.write(
+                    f"    {run['concurrency']:>3} callers: {run['throughput_rps']:.2f} req/s, "
+                    f"p95 {run['latency_ms']['p95']:.0f} ms, {run['failures']} failed"
+                )
@@ -0,0 +1,228 @@
+import gc
+import json
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.batching import percentile
+
+DEFAULT_LANDMARKS = ['Eiffel Tower', 'Taj Mahal', 'Golden Gate Bridge', 'Colosseum', 'Sydney Opera House']
+
+# Held-out text for measuring how much a mode degrades GPT-2 (lower perplexity is better)
+REFERENCE_TEXTS = [
+    "The Eiffel Tower was built for the 1889 World's Fair in Paris and was the tallest "
+    "man-made structure in the world for over forty years.",
+    "The Taj Mahal is an ivory-white marble mausoleum on the south bank of the Yamuna river "
+    "in Agra, commissioned by the Mughal emperor Shah Jahan.",
+    "The Colosseum in Rome is the largest ancient amphitheatre ever built and could hold "
+    "tens of thousands of spectators for gladiatorial contests.",
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare latency, memory and accuracy of the CPU inference modes (fp32, bf16, int8)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--service',
+            choices=['vqa', 'gpt2', 'all'],
+            default='all',
+            help='Which model to compare (default: all)',
+        )
+        parser.add_argument(
+            '--modes',
+            default='fp32,bf16,int8',
+            help='Comma separated CPU modes; the first one is the baseline (default: fp32,bf16,int8)',
+        )
+        parser.add_argument(
+            '--images',
+            help='Directory of landmark photos, or a JSON file of [{"image": path, "landmark": name}] '
+                 'to also score identification accuracy (required for VQA)',
+        )
+        parser.add_argument(
+            '--landmarks',
+            default=','.join(DEFAULT_LANDMARKS),
+            help='Comma separated landmark names to describe with GPT-2',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Timed runs per input (default: 3)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the results to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        from core.quantization import CPU_MODES
+
+        modes = [mode.strip().lower() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in CPU_MODES]
+        if unknown:
+            raise CommandError(f"Unknown mode(s): {', '.join(unknown)}. Choose from {', '.join(CPU_MODES)}")
+
+        services = ['vqa', 'gpt2'] if options['service'] == 'all' else [options['service']]
+        if 'vqa' in services and not options['images']:
+            raise CommandError('--images is required to compare VQA modes')
+
+        results = {}
+        if 'vqa' in services:
+            cases = self._load_image_cases(options['images'])
+            if not cases:
+                raise CommandError(f"No images found in {options['images']}")
+            results['vqa'] = self._compare(modes, lambda mode, baseline: self._run_vqa(
+                mode, cases, options['runs'], baseline
+            ))
+        if 'gpt2' in services:
+            landmarks = [name.strip() for name in options['landmarks'].split(',') if name.strip()]
+            results['gpt2'] = self._compare(modes, lambda mode, baseline: self._run_gpt2(
+                mode, landmarks, options['runs'], baseline
+            ))
+
+        for service, service_results in results.items():
+            self._print_table(service, service_results)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+    def _compare(self, modes, run_mode):
+        service_results = []
+        baseline = None
+        for mode in modes:
+            self.stdout.write(f"🔄 Running {mode}...")
+            result = run_mode(mode, baseline)
+            if baseline is None:
+                baseline = result
+            service_results.append(result)
+            gc.collect()
+        # Outputs are only needed to score the other modes against the baseline
+        for result in service_results:
+            result.pop('outputs', None)
+        return service_results
+
+    def _load_image_cases(self, path):
+        from core.benchmarking import load_image_cases
+
+        try:
+            return load_image_cases(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+    def _timed(self, fn, runs):
+        import torch
+
+        latencies = []
+        output = None
+        for run in range(runs):
+            # Same seed for every mode, so sampling differences come from precision
+            torch.manual_seed(run)
+            started = time.perf_counter()
+            result = fn()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if output is None:
+                output = result
+        return output, latencies
+
+    def _summary(self, requested_mode, service, model, load_seconds, latencies):
+        from core.quantization import model_size_bytes
+
+        return {
+            'mode': requested_mode,
+            'effective_mode': service.cpu_mode,
+            'load_seconds': round(load_seconds, 2),
+            'model_mb': round(model_size_bytes(model) / (1024 * 1024), 1),
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'mean': sum(latencies) / len(latencies) if latencies else None,
+            },
+        }
+
+    def _run_vqa(self, mode, cases, runs, baseline):
+        from core.vqa_service import VQAService
+
+        service = VQAService(cpu_mode=mode, device='cpu')
+        started = time.perf_counter()
+        service._initialize_model()
+        load_seconds = time.perf_counter() - started
+
+        answers = []
+        latencies = []
+        for case in cases:
+            result, case_latencies = self._timed(lambda: service.identify_landmark(case['image']), runs)
+            answers.append((result.get('landmark_name') or '').strip())
+            latencies.extend(case_latencies)
+
+        summary = self._summary(mode, service, service.model, load_seconds, latencies)
+        labelled = [(answer, case['landmark']) for answer, case in zip(answers, cases) if case['landmark']]
+        summary['accuracy'] = (
+            sum(1 for answer, label in labelled if label.lower() in answer.lower()) / len(labelled)
+            if labelled else None
+        )
+        summary['agreement_with_baseline'] = (
+            sum(1 for a, b in zip(answers, baseline['outputs']) if a.lower() == b.lower()) / len(answers)
+            if baseline and answers else None
+        )
+        summary['outputs'] = answers
+
+        service._batcher.shutdown()
+        del service
+        return summary
+
+    def _run_gpt2(self, mode, landmarks, runs, baseline):
+        import torch
+        from core.gpt2_service import GPT2Service
+
+        service = GPT2Service(cpu_mode=mode, device='cpu')
+        started = time.perf_counter()
+        service._initialize_model()
+        load_seconds = time.perf_counter() - started
+
+        latencies = []
+        for landmark in landmarks:
+            _, landmark_latencies = self._timed(lambda: service.generate_landmark_description(landmark), runs)
+            latencies.extend(landmark_latencies)
+
+        model = service.generator.model
+        tokenizer = service.generator.tokenizer
+        losses = []
+        with torch.no_grad():
+            for text in REFERENCE_TEXTS:
+                input_ids = tokenizer(text, return_tensors='pt').input_ids
+                losses.append(model(input_ids, labels=input_ids).loss.float().item())
+        perplexity = math.exp(sum(losses) / len(losses))
+
+        summary = self._summary(mode, service, model, load_seconds, latencies)
+        summary['perplexity'] = round(perplexity, 3)
+        summary['perplexity_change'] = (
+            round(perplexity / baseline['perplexity'] - 1, 4) if baseline else None
+        )
+        summary['outputs'] = []
+
+        del service
+        return summary
+
+    def _print_table(self, service, service_results):
+        self.stdout.write(f"\n{service.upper()}")
+        for result in service_results:
+            latency = result['latency_ms']
+            line = (
+                f"  {result['mode']:<5} (ran as {result['effective_mode']}): "
+                f"load {result['load_seconds']}s, {result['model_mb']} MB, "
+                f"p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms"
+            )
+            if service == 'vqa':
+                if result['accuracy'] is not None:
+                    line += f", accuracy {result['accuracy']:.0%}"
+                if result['agreement_with_baseline'] is not None:
+                    line += f", agrees with baseline {result['agreement_with_baseline']:.0%}"
+            else:
+                line += f", perplexity {result['perplexity']}"
+                if result['perplexity_change'] is not None:
+                    line += f" ({result['perplexity_change']:+.1%} vs baseline)"
+            self.stdout.write(line)
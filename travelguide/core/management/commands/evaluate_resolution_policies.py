@@ -0,0 +1,167 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.batching import percentile
+
+
+class Command(BaseCommand):
+    help = ('Measure identification accuracy against latency and vision tokens for each VQA '
+            'input resolution policy')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images',
+            required=True,
+            help='Directory of landmark photos, or a JSON file of [{"image": path, "landmark": name}] '
+                 'to also score identification accuracy',
+        )
+        parser.add_argument(
+            '--policies',
+            default='full,balanced,fast,single',
+            help='Comma separated resolution policies; the first one is the baseline '
+                 '(default: full,balanced,fast,single)',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=1,
+            help='Timed runs per image (default: 1)',
+        )
+        parser.add_argument(
+            '--cpu-mode',
+            help='CPU inference mode to evaluate under (default: VQA_CPU_MODE / INFERENCE_CPU_MODE)',
+        )
+        parser.add_argument(
+            '--decode-only',
+            action='store_true',
+            help='Only measure decoding time and vision tokens, without loading the model',
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the results to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        from core.benchmarking import load_image_cases
+        from core.image_preprocessing import RESOLUTION_POLICIES
+
+        names = [name.strip().lower() for name in options['policies'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in RESOLUTION_POLICIES]
+        if unknown:
+            raise CommandError(
+                f"Unknown policy(s): {', '.join(unknown)}. Choose from {', '.join(RESOLUTION_POLICIES)}"
+            )
+        try:
+            cases = load_image_cases(options['images'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not cases:
+            raise CommandError(f"No images found in {options['images']}")
+
+        service = None
+        if not options['decode_only']:
+            from core.vqa_service import VQAService
+
+            self.stdout.write("🔄 Loading the VQA model...")
+            service = VQAService(cpu_mode=options['cpu_mode'], device='cpu')
+            service._initialize_model()
+
+        results = []
+        baseline = None
+        runs = max(1, options['runs'])
+        for name in names:
+            policy = RESOLUTION_POLICIES[name]
+            self.stdout.write(f"🔄 Running {policy.describe()}...")
+            result = self._run_policy(policy, cases, runs, service, baseline)
+            if baseline is None:
+                baseline = result
+            results.append(result)
+        # Outputs are only needed to score the other policies against the baseline
+        for result in results:
+            result.pop('outputs', None)
+
+        if service is not None:
+            service._batcher.shutdown()
+
+        self._print_table(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(results, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Results written to {options['output']}"))
+
+    def _run_policy(self, policy, cases, runs, service, baseline):
+        from core.image_preprocessing import load_image, vision_token_count
+
+        decode_ms = []
+        tokens = []
+        for case in cases:
+            started = time.perf_counter()
+            image = load_image(case['image'], policy)
+            decode_ms.append((time.perf_counter() - started) * 1000)
+            tokens.append(vision_token_count(image.width, image.height, policy.max_slice_nums))
+
+        result = {
+            'policy': policy.name,
+            'max_edge': policy.max_edge,
+            'max_slice_nums': policy.max_slice_nums,
+            'vision_tokens': {'mean': sum(tokens) / len(tokens), 'max': max(tokens)},
+            'decode_ms': {'p50': percentile(decode_ms, 50), 'p95': percentile(decode_ms, 95)},
+            'latency_ms': None,
+            'accuracy': None,
+            'agreement_with_baseline': None,
+            'outputs': [],
+        }
+        if service is None:
+            return result
+
+        import torch
+
+        service.set_resolution_policy(policy)
+        answers = []
+        latencies = []
+        for case in cases:
+            for run in range(runs):
+                # Same seed for every policy, so sampling differences come from the input
+                torch.manual_seed(run)
+                started = time.perf_counter()
+                response = service.identify_landmark(case['image'])
+                latencies.append((time.perf_counter() - started) * 1000)
+                if run == 0:
+                    answers.append((response.get('landmark_name') or '').strip())
+
+        result['latency_ms'] = {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'mean': sum(latencies) / len(latencies),
+        }
+        labelled = [(answer, case['landmark']) for answer, case in zip(answers, cases) if case['landmark']]
+        result['accuracy'] = (
+            sum(1 for answer, label in labelled if label.lower() in answer.lower()) / len(labelled)
+            if labelled else None
+        )
+        result['agreement_with_baseline'] = (
+            sum(1 for a, b in zip(answers, baseline['outputs']) if a.lower() == b.lower()) / len(answers)
+            if baseline else None
+        )
+        result['outputs'] = answers
+        return result
+
+    def _print_table(self, results):
+        self.stdout.write("\nPOLICY        EDGE   SLICES  TOKENS(mean/max)  DECODE p50  LATENCY p50/p95  ACCURACY  AGREES")
+        for result in results:
+            latency = result['latency_ms']
+            line = (
+                f"{result['policy']:<13} {str(result['max_edge'] or 'full'):<6} {result['max_slice_nums']:<7} "
+                f"{result['vision_tokens']['mean']:>6.0f}/{result['vision_tokens']['max']:<9} "
+                f"{result['decode_ms']['p50']:>7.1f} ms  "
+            )
+            line += f"{latency['p50']:>6.0f}/{latency['p95']:<6.0f} ms  " if latency else f"{'-':<17}"
+            line += f"{result['accuracy']:>8.0%}  " if result['accuracy'] is not None else f"{'-':>8}  "
+            if result['agreement_with_baseline'] is not None:
+                line += f"{result['agreement_with_baseline']:>6.0%}"
+            else:
+                line += f"{'-':>6}"
+            self.stdout.write(line)
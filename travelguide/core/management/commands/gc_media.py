@@ -0,0 +1,104 @@
+import time
+from collections import Counter
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Recount references to content-addressed uploads and delete the blobs (and their resized '
+            'copies) that no landmark image or profile picture uses any more')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be deleted',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Keep unreferenced blobs younger than this many seconds, and leave the counts of '
+                 'blobs retained or released that recently alone; they may belong to an upload '
+                 'still being saved (default: 3600)',
+        )
+
+    def handle(self, *args, **options):
+        from core.models import LandmarkImage, MediaBlob, UserProfile
+        from core.storage import collect_blob, is_blob_name, iter_blob_names, media_blob_storage
+
+        cutoff = time.time() - options['min_age']
+        # Read before the rows are counted, so a count that changes meanwhile isn't overwritten
+        counts = {
+            name: (refcount, updated_at)
+            for name, refcount, updated_at in MediaBlob.objects.values_list('name', 'refcount', 'updated_at')
+        }
+        references = Counter(
+            name for name in LandmarkImage.objects.values_list('image', flat=True) if is_blob_name(name)
+        )
+        references.update(
+            name for name in UserProfile.objects.values_list('profile_picture', flat=True) if is_blob_name(name)
+        )
+
+        # Bring the stored counts in line with the rows, one blob at a time. Blobs retained or
+        # released recently may belong to an upload whose row isn't saved yet, so they're skipped,
+        # and each update only applies if the count hasn't changed since it was read.
+        fixed = 0
+        recent = timezone.now() - timedelta(seconds=options['min_age'])
+        for name in set(references) | set(counts):
+            count = references.get(name, 0)
+            if name not in counts:
+                fixed += 1
+                if not options['dry_run']:
+                    try:
+                        MediaBlob.objects.get_or_create(name=name, defaults={'refcount': count})
+                    except IntegrityError:
+                        pass
+                continue
+            refcount, updated_at = counts[name]
+            if refcount == count or updated_at > recent:
+                continue
+            if options['dry_run']:
+                fixed += 1
+            elif MediaBlob.objects.filter(name=name, refcount=refcount, updated_at=updated_at).update(
+                refcount=count, updated_at=timezone.now()
+            ):
+                fixed += 1
+
+        storage = media_blob_storage()
+        directories = {
+            LandmarkImage._meta.get_field('image').upload_to.strip('/'),
+            UserProfile._meta.get_field('profile_picture').upload_to.strip('/'),
+        }
+        stored = [name for directory in sorted(directories) for name in iter_blob_names(directory)]
+        deleted = 0
+        freed = 0
+        for name in stored:
+            if name in references or storage.get_modified_time(name).timestamp() > cutoff:
+                continue
+            size = storage.size(name)
+            if not options['dry_run']:
+                # Blobs saved without a row (e.g. an abandoned upload) get one to collect
+                MediaBlob.objects.get_or_create(name=name)
+                if not collect_blob(name):
+                    continue
+            deleted += 1
+            freed += size
+        if not options['dry_run']:
+            # Rows whose blob is already gone from storage
+            for name in MediaBlob.objects.filter(refcount=0).values_list('name', flat=True):
+                if not storage.exists(name):
+                    collect_blob(name)
+
+        stored_bytes = sum(storage.size(name) for name in stored if name in references)
+        uploads = sum(references.values())
+        prefix = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {prefix} {deleted} unreferenced blobs ({freed / (1024 * 1024):.1f} MB); "
+            f"fixed {fixed} reference counts. {uploads} uploads share {len(references)} blobs "
+            f"({stored_bytes / (1024 * 1024):.1f} MB)"
+        ))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Generate the resized WebP/AVIF copies of landmark images and profile pictures that pages '
+            'show instead of the originals, e.g. for images uploaded before derivatives existed')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Regenerate derivatives that already exist',
+        )
+
+    def handle(self, *args, **options):
+        from core.image_derivatives import available_formats, get_derivative_generator, get_derivatives
+        from core.models import LandmarkImage, UserProfile
+
+        if not available_formats():
+            raise CommandError('Pillow can encode none of IMAGE_DERIVATIVE_FORMATS')
+
+        images = [(landmark_image.image, 'landmark') for landmark_image in LandmarkImage.objects.exclude(image='')]
+        images += [
+            (profile.profile_picture, 'avatar')
+            for profile in UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        ]
+        if not options['refresh']:
+            images = [(field_file, kind) for field_file, kind in images if not get_derivatives(field_file)]
+        if not images:
+            self.stdout.write("No images without derivatives")
+            return
+
+        self.stdout.write(f"🔄 Generating derivatives of {len(images)} images...")
+        generator = get_derivative_generator()
+        started = time.perf_counter()
+        futures = [
+            generator.schedule(field_file.storage, field_file.name, kind, refresh=options['refresh'])
+            for field_file, kind in images
+        ]
+        failed = sum(1 for future in futures if future.result() is None)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated derivatives of {len(images) - failed} images in {time.perf_counter() - started:.1f}s"
+            + (f" ({failed} failed, see the log)" if failed else '')
+        ))
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Import named attractions, monuments, museums, parks, restaurants and malls from OpenStreetMap '
+            'extracts into the local spatial index used for offline nearby search')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='+',
+            help='GeoJSON (.geojson), saved Overpass JSON (.json) or, with pyosmium installed, PBF (.osm.pbf) files',
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Delete all previously imported landmarks first',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows written per insert (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        from core.spatial_index import import_landmarks
+
+        def records():
+            for path in options['paths']:
+                self.stdout.write(f"🔄 Reading {path}...")
+                yield from self._read(path)
+
+        started = time.perf_counter()
+        summary = import_landmarks(records(), replace=options['replace'], batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {summary['imported']} landmarks in {time.perf_counter() - started:.1f}s "
+            f"({summary['skipped']} features skipped: unnamed or not a landmark category)"
+        ))
+
+    def _read(self, path):
+        try:
+            yield from self._reader(path)(path)
+        except OSError as e:
+            raise CommandError(f"Could not read {path}: {str(e)}")
+        except ValueError as e:
+            raise CommandError(f"Could not parse {path}: {str(e)}")
+
+    def _reader(self, path):
+        from core.spatial_index import iter_geojson, iter_overpass_json, iter_pbf
+
+        lower_path = path.lower()
+        if lower_path.endswith('.pbf'):
+            try:
+                import osmium  # noqa: F401
+            except ImportError:
+                raise CommandError('Reading PBF extracts needs pyosmium: pip install osmium')
+            return iter_pbf
+        if lower_path.endswith('.geojson'):
+            return iter_geojson
+        if lower_path.endswith('.json'):
+            # GeoJSON saved as .json is told apart by its features
+            with open(path, encoding='utf-8') as json_file:
+                head = json_file.read(4096)
+            return iter_geojson if '"features"' in head else iter_overpass_json
+        raise CommandError(f"Unsupported file type: {path}")
@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+DEFAULT_MIX = 'find_landmark:1,vqa_chat:2,save_location:2,get_saved_locations:4,plan:3'
+
+
+class Command(BaseCommand):
+    help = ('Load test find-landmark, vqa-chat, save-location, get-saved-locations and plan with '
+            'seeded users and stand-in AI models; reports RPS, latency histograms and DB queries per endpoint')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--driver',
+            choices=['client', 'wsgi', 'http'],
+            default='client',
+            help="'client' calls the views in-process through the Django test client, 'wsgi' serves "
+                 "the app from a local threaded WSGI server, 'http' targets --base-url (default: client)",
+        )
+        parser.add_argument(
+            '--base-url',
+            help="Server to target with --driver http; it must share this database and can't use "
+                 "the stand-in models, so run it with the real (or remote) ones",
+        )
+        parser.add_argument(
+            '--mix',
+            default=DEFAULT_MIX,
+            help=f"Endpoints and relative weights as name:weight pairs (default: {DEFAULT_MIX})",
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Concurrent clients, each logged in as a seeded user (default: 8)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=20,
+            help='Seconds to run (default: 20)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=None,
+            help='Stop after this many requests instead of after --duration',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=None,
+            help='Users to seed (default: one per client)',
+        )
+        parser.add_argument(
+            '--locations',
+            type=int,
+            default=25,
+            help='Saved locations seeded per user (default: 25)',
+        )
+        parser.add_argument(
+            '--image-pool',
+            type=int,
+            default=0,
+            help='Upload one of this many distinct images, so repeats hit the landmark cache '
+                 '(default: 0, a new image every time)',
+        )
+        parser.add_argument(
+            '--vqa-latency-ms',
+            type=float,
+            default=300,
+            help='Stand-in VQA latency per batch (default: 300)',
+        )
+        parser.add_argument(
+            '--gpt2-latency-ms',
+            type=float,
+            default=150,
+            help='Stand-in GPT-2 latency per batch (default: 150)',
+        )
+        parser.add_argument(
+            '--use-existing-db',
+            action='store_true',
+            help='Seed into the configured database (removed afterwards) instead of a throwaway test database',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for the seeded data and the request mix (default: 0)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the report to this JSON file',
+        )
+
+    def handle(self, *args, **options):
+        from core.loadtest import default_endpoints
+
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        if options['driver'] == 'http':
+            if not options['base_url']:
+                raise CommandError('--base-url is required with --driver http')
+            if not options['use_existing_db']:
+                raise CommandError('--driver http needs --use-existing-db so the server sees the seeded users')
+
+        prefix = f"loadtest-{int(time.time())}"
+        endpoints = default_endpoints(prefix, options['image_pool'])
+        weights = self._parse_mix(options['mix'], endpoints)
+
+        with ExitStack() as stack:
+            media_root = tempfile.mkdtemp(prefix='loadtest-media-')
+            stack.callback(shutil.rmtree, media_root, True)
+            stack.enter_context(override_settings(
+                MEDIA_ROOT=media_root,
+                ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver', '127.0.0.1', 'localhost'],
+            ))
+            if not options['use_existing_db']:
+                self._use_test_database(stack)
+            if options['driver'] != 'http':
+                self._use_stand_ins(stack, options)
+
+            report = self._run(prefix, endpoints, weights, options, stack)
+
+        self._print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Report written to {options['output']}"))
+
+    def _parse_mix(self, mix, endpoints):
+        weights = {}
+        for entry in mix.split(','):
+            if not entry.strip():
+                continue
+            name, _, weight = entry.strip().partition(':')
+            if name not in endpoints:
+                raise CommandError(f"Unknown endpoint {name}. Choose from {', '.join(endpoints)}")
+            try:
+                weights[name] = float(weight) if weight else 1.0
+            except ValueError:
+                raise CommandError(f"Invalid weight for {name}: {weight}")
+        if not any(weight > 0 for weight in weights.values()):
+            raise CommandError('--mix must give at least one endpoint a positive weight')
+        return weights
+
+    def _use_test_database(self, stack):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # A file rather than the default in-memory database, so every thread shares it
+            test_dir = tempfile.mkdtemp(prefix='loadtest-db-')
+            stack.callback(shutil.rmtree, test_dir, True)
+            test_settings['NAME'] = os.path.join(test_dir, 'loadtest.sqlite3')
+            stack.callback(test_settings.pop, 'NAME', None)
+
+        self.stdout.write("🔄 Creating a throwaway test database...")
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        def destroy():
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        stack.callback(destroy)
+
+    def _use_stand_ins(self, stack, options):
+        from core.services import override_services
+        from core.stand_ins import StandInGPT2Service, StandInLatency, StandInVQAService
+
+        vqa = StandInVQAService(latency=StandInLatency(
+            fixed_ms=options['vqa_latency_ms'], per_item_ms=options['vqa_latency_ms'] / 10
+        ))
+        gpt2 = StandInGPT2Service(latency=StandInLatency(
+            fixed_ms=options['gpt2_latency_ms'], per_item_ms=options['gpt2_latency_ms'] / 10
+        ))
+        vqa._initialize_model()
+        gpt2._initialize_model()
+        stack.enter_context(override_services(vqa=vqa, gpt2=gpt2))
+        stack.callback(vqa._batcher.shutdown)
+        stack.callback(gpt2._batcher.shutdown)
+        self._stand_ins = {'vqa': vqa, 'gpt2': gpt2}
+
+    def _run(self, prefix, endpoints, weights, options, stack):
+        from core.loadtest import (
+            LOADTEST_PASSWORD, ClientDriver, HTTPDriver, count_queries, remove_seed_data, run_load,
+            seed_data, serve_wsgi, wait_for_jobs,
+        )
+
+        user_count = options['users'] or options['concurrency']
+        self.stdout.write(f"🔄 Seeding {user_count} users with {options['locations']} saved locations each...")
+        users = seed_data(prefix, user_count, options['locations'], options['seed'])
+        stack.callback(remove_seed_data, prefix)
+
+        if options['driver'] == 'client':
+            def make_driver(index):
+                return ClientDriver(users[index % len(users)])
+        else:
+            if options['driver'] == 'wsgi':
+                from django.core.wsgi import get_wsgi_application
+
+                server, base_url = serve_wsgi(count_queries(get_wsgi_application()))
+                stack.callback(server.server_close)
+                stack.callback(server.shutdown)
+            else:
+                base_url = options['base_url']
+
+            def make_driver(index):
+                return HTTPDriver(base_url, users[index % len(users)].username, LOADTEST_PASSWORD)
+
+        limit = f"{options['requests']} requests" if options['requests'] else f"{options['duration']:.0f}s"
+        self.stdout.write(f"🔄 Running {options['concurrency']} clients ({options['driver']} driver) for {limit}...")
+        result = run_load(
+            make_driver, endpoints, weights, options['concurrency'],
+            duration=None if options['requests'] else options['duration'],
+            total_requests=options['requests'],
+            seed=options['seed'],
+        )
+
+        if not wait_for_jobs(users):
+            self.stderr.write("⚠️ Some landmark jobs were still running at the end of the test")
+
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'settings': {
+                'driver': options['driver'],
+                'mix': weights,
+                'concurrency': options['concurrency'],
+                'duration': options['duration'],
+                'requests': options['requests'],
+                'users': user_count,
+                'locations_per_user': options['locations'],
+                'image_pool': options['image_pool'],
+                'vqa_latency_ms': options['vqa_latency_ms'],
+                'gpt2_latency_ms': options['gpt2_latency_ms'],
+                'database': connection.vendor,
+            },
+        }
+        report.update(result)
+        stand_ins = getattr(self, '_stand_ins', None)
+        if stand_ins:
+            report['stand_in_batching'] = {name: service.get_batch_metrics() for name, service in stand_ins.items()}
+        return report
+
+    def _print_report(self, report):
+        total = report['total']
+        self.stdout.write(
+            f"\n{total['requests']} requests in {report['wall_seconds']:.1f}s: "
+            f"{total['rps']:.1f} req/s, {total['failed']} failed"
+        )
+        for name, stats in report['endpoints'].items():
+            latency = stats['latency_ms']
+            if not stats['requests']:
+                self.stdout.write(f"  {name:<20} no requests")
+                continue
+            queries = stats['db_queries']['mean']
+            self.stdout.write(
+                f"  {name:<20} {stats['requests']:>6} req {stats['rps']:>8.1f} req/s  "
+                f"p50 {latency['p50']:>7.1f} ms  p95 {latency['p95']:>7.1f} ms  p99 {latency['p99']:>7.1f} ms  "
+                f"queries {queries if queries is not None else '-':>5}  failed {stats['failed']}"
+            )
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Pre-generate GPT-2 descriptions for the most identified landmarks (run off-peak, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=100,
+            help='How many of the most identified landmarks to describe (default: 100)',
+        )
+        parser.add_argument(
+            '--names',
+            help='Comma separated landmark names to describe as well, e.g. ones not identified yet',
+        )
+        parser.add_argument(
+            '--names-file',
+            help='Text file with one landmark name per line to describe as well',
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Regenerate descriptions that are already stored',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=32,
+            help='Landmarks sent to GPT-2 per call (default: 32)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=600,
+            help='Seconds to wait for the GPT-2 model to load (default: 600)',
+        )
+
+    def handle(self, *args, **options):
+        from core.descriptions import generate_missing_descriptions, popular_landmark_names
+        from core.services import get_gpt2_service
+
+        names = []
+        if options['top'] > 0:
+            popular = popular_landmark_names(options['top'])
+            names.extend(name for name, _ in popular)
+            self.stdout.write(f"Found {len(popular)} identified landmarks")
+        if options['names']:
+            names.extend(name.strip() for name in options['names'].split(',') if name.strip())
+        if options['names_file']:
+            try:
+                with open(options['names_file'], encoding='utf-8') as names_file:
+                    names.extend(line.strip() for line in names_file if line.strip())
+            except OSError as e:
+                raise CommandError(f"Could not read {options['names_file']}: {str(e)}")
+        if not names:
+            self.stdout.write("No landmarks to describe")
+            return
+
+        gpt2_service = get_gpt2_service()
+        self.stdout.write("🔄 Waiting for the GPT-2 model...")
+        if not gpt2_service.wait_until_ready(options['timeout']):
+            raise CommandError(f"GPT-2 model is not ready: {gpt2_service.get_status()}")
+
+        started = time.perf_counter()
+        summary = generate_missing_descriptions(
+            names, gpt2_service,
+            refresh=options['refresh'],
+            batch_size=max(1, options['batch_size']),
+        )
+        for landmark_name, error in summary['errors'].items():
+            self.stderr.write(f"❌ {landmark_name}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {summary['generated']} descriptions in {time.perf_counter() - started:.0f}s "
+            f"({summary['skipped']} already stored, {summary['failed']} failed)"
+        ))
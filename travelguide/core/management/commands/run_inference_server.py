@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = 'Run the out-of-process model server that owns the VQA and GPT-2 models'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket',
+            default=settings.INFERENCE_SERVER_SOCKET,
+            help='Unix socket path to listen on (default: INFERENCE_SERVER_SOCKET)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.INFERENCE_SERVER_WORKERS,
+            help='Number of worker processes, each holding one copy of the models',
+        )
+
+    def handle(self, *args, **options):
+        if not options['socket']:
+            raise CommandError('Set INFERENCE_SERVER_SOCKET or pass --socket')
+
+        self.stdout.write(
+            f"🚀 Starting inference server on {options['socket']} with {options['workers']} worker(s)..."
+        )
+        InferenceServer(options['socket'], workers=options['workers']).serve_forever()
+        self.stdout.write(self.style.SUCCESS('✅ Inference server stopped'))
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Write converted, eval-mode model weights to local safetensors snapshots for fast startup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--service',
+            choices=['vqa', 'gpt2', 'all'],
+            default='all',
+            help='Which model to snapshot (default: all)',
+        )
+        parser.add_argument(
+            '--device',
+            default=None,
+            help='Device the snapshot will be loaded on: cpu, cuda or mps (default: best available)',
+        )
+        parser.add_argument(
+            '--cpu-mode',
+            default=None,
+            help='CPU mode the snapshot is for (default: INFERENCE_CPU_MODE and per-model overrides)',
+        )
+
+    def handle(self, *args, **options):
+        from core.gpt2_service import MODEL_NAME as GPT2_MODEL_NAME, GPT2Service
+        from core.model_snapshots import write_snapshot
+        from core.quantization import CPU_MODE_FP32, CPU_MODE_INT8, get_cpu_mode, resolve_cpu_mode
+        from core.vqa_service import MODEL_NAME as VQA_MODEL_NAME, VQAService
+
+        services = ['vqa', 'gpt2'] if options['service'] == 'all' else [options['service']]
+        for name in services:
+            try:
+                cpu_mode = resolve_cpu_mode(options['cpu_mode']) if options['cpu_mode'] else get_cpu_mode(name)
+            except ValueError as e:
+                raise CommandError(str(e))
+            if cpu_mode == CPU_MODE_INT8:
+                # int8 weights are quantized at load time from the fp32 snapshot
+                cpu_mode = CPU_MODE_FP32
+
+            self.stdout.write(f"🔄 Loading {name} from the hub...")
+            started = time.perf_counter()
+            try:
+                if name == 'vqa':
+                    service = VQAService(cpu_mode=cpu_mode, device=options['device'])
+                    service._initialize_model(use_snapshot=False)
+                    path = write_snapshot(VQA_MODEL_NAME, service.model, service.tokenizer, service.dtype)
+                    service._batcher.shutdown()
+                else:
+                    service = GPT2Service(cpu_mode=cpu_mode, device=options['device'])
+                    service._initialize_model(use_snapshot=False)
+                    path = write_snapshot(
+                        GPT2_MODEL_NAME, service.generator.model, service.generator.tokenizer, service.dtype
+                    )
+            except Exception as e:
+                raise CommandError(f"Could not snapshot {name}: {str(e)}")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {name} snapshot ({service.dtype}) written to {path} in {time.perf_counter() - started:.0f}s"
+            ))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+def mark_existing_images_completed(apps, schema_editor):
+    # Images uploaded before jobs existed were identified synchronously
+    LandmarkImage = apps.get_model('core', 'LandmarkImage')
+    LandmarkImage.objects.update(status='completed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_savedlocation_latitude_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('identifying', 'Identifying landmark'), ('describing', 'Generating description'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.RunPython(mark_existing_images_completed, migrations.RunPython.noop),
+    ]
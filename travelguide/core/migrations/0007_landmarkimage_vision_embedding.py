@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 15:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_landmarkimage_job_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='landmarkimage',
+            name='vision_embedding',
+            field=models.FileField(blank=True, help_text='Vision encoder output for the image (safetensors), reused by chat', null=True, upload_to='landmark_embeddings/'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-18 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_landmarkimage_vision_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LandmarkDescription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_name', models.CharField(max_length=255, unique=True)),
+                ('landmark_name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('model_name', models.CharField(blank=True, default='', max_length=100)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
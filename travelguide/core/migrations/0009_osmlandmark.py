@@ -0,0 +1,46 @@
+# Generated by Django 4.2.23 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+RTREE_TABLE = 'core_osmlandmark_rtree'
+
+
+def create_rtree(apps, schema_editor):
+    # SQLite only; other databases fall back to the latitude index
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+        )
+
+
+def drop_rtree(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {RTREE_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_landmarkdescription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OSMLandmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('osm_type', models.CharField(max_length=10)),
+                ('osm_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('category', models.CharField(db_index=True, max_length=20)),
+                ('latitude', models.FloatField(db_index=True)),
+                ('longitude', models.FloatField()),
+                ('tags', models.JSONField(default=dict)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('osm_type', 'osm_id')},
+            },
+        ),
+        migrations.RunPython(create_rtree, drop_rtree),
+    ]
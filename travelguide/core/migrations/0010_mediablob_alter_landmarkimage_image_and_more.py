@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 16:32
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_osmlandmark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='landmarkimage',
+            name='image',
+            field=models.ImageField(help_text='Uploaded landmark image', storage=core.storage.media_blob_storage, upload_to='landmark_images/'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, help_text='Upload a profile picture (optional)', null=True, storage=core.storage.media_blob_storage, upload_to='profile_pictures/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_mediablob_alter_landmarkimage_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedlocation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
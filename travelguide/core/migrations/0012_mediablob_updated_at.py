@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_savedlocation_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
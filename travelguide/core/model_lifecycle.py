@@ -0,0 +1,257 @@
+import logging
+import os
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Every lifecycle in this process, so they can be reset in forked children
+_lifecycles = weakref.WeakSet()
+_preload_requested = False
+# Called with the lifecycle after every state change (see add_state_listener)
+_state_listeners = []
+
+
+def add_state_listener(callback):
+    """
+    Call callback(lifecycle) whenever any model starts or finishes loading
+
+    Callbacks run in the thread that changed the state, outside the lifecycle's
+    lock, and must not block.
+    """
+    if callback not in _state_listeners:
+        _state_listeners.append(callback)
+
+
+class ModelLifecycle:
+    """
+    Thread-safe load state of one model
+
+    The model loads at most once at a time: callers that arrive while it is
+    loading wait for that load instead of starting their own. The states match
+    the strings the status endpoints have always returned.
+    """
+
+    NOT_LOADED = 'not_initialized'
+    LOADING = 'loading'
+    READY = 'ready'
+    FAILED = 'error'
+
+    def __init__(self, name):
+        self.name = name
+        self._reset_state()
+        _lifecycles.add(self)
+
+    def _reset_state(self):
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self.state = self.NOT_LOADED
+        self.error = None
+        self.attempts = 0
+        self.started_at = None
+        self.finished_at = None
+        self.load_seconds = None
+
+    @property
+    def is_ready(self):
+        return self.state == self.READY
+
+    @property
+    def is_loading(self):
+        return self.state == self.LOADING
+
+    def _begin(self, retry_failed):
+        # Caller holds the lock
+        if self.state in (self.LOADING, self.READY):
+            return False
+        if self.state == self.FAILED and not retry_failed:
+            return False
+        self.state = self.LOADING
+        self.error = None
+        self.attempts += 1
+        self.started_at = time.time()
+        self.finished_at = None
+        self.load_seconds = None
+        return True
+
+    def _state_changed(self):
+        for callback in list(_state_listeners):
+            try:
+                callback(self)
+            except Exception as e:
+                logger.warning(f"Model state listener failed: {str(e)}")
+
+    def _run(self, loader):
+        started = time.perf_counter()
+        error = None
+        try:
+            loader()
+        except Exception as e:
+            error = e
+            logger.error(f"❌ Failed to load {self.name} model: {str(e)}")
+        with self._lock:
+            self.load_seconds = time.perf_counter() - started
+            self.finished_at = time.time()
+            self.state = self.READY if error is None else self.FAILED
+            self.error = str(error) if error is not None else None
+            self._settled.notify_all()
+        self._state_changed()
+        if error is None:
+            logger.info(f"✅ {self.name} model ready after {self.load_seconds:.1f}s")
+
+    def load(self, loader, retry_failed=True):
+        """
+        Load the model in the calling thread, or wait for the load already running
+
+        Args:
+            loader (callable): Does the actual loading; raises on failure
+            retry_failed (bool): Try again if an earlier load failed
+
+        Returns:
+            bool: Whether the model is ready
+        """
+        with self._lock:
+            if not self._begin(retry_failed):
+                self._settled.wait_for(lambda: self.state != self.LOADING)
+                return self.state == self.READY
+        self._state_changed()
+        self._run(loader)
+        return self.is_ready
+
+    def start(self, loader, retry_failed=False):
+        """
+        Start loading the model in a background thread, unless it is loaded or loading
+
+        Returns:
+            bool: Whether a new load was started
+        """
+        with self._lock:
+            if not self._begin(retry_failed):
+                return False
+        self._state_changed()
+        threading.Thread(target=self._run, args=(loader,), daemon=True, name=f"{self.name}-loader").start()
+        return True
+
+    def wait(self, timeout=None):
+        """
+        Wait until the model is no longer loading
+
+        Returns:
+            str: The state afterwards (still LOADING if the timeout expired)
+        """
+        with self._lock:
+            self._settled.wait_for(lambda: self.state != self.LOADING, timeout)
+            return self.state
+
+    def snapshot(self):
+        """Describe the current state with its timestamps and load duration"""
+        with self._lock:
+            elapsed = None
+            if self.state == self.LOADING and self.started_at is not None:
+                elapsed = time.time() - self.started_at
+            return {
+                'model': self.name,
+                'state': self.state,
+                'error': self.error,
+                'attempts': self.attempts,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'load_seconds': self.load_seconds,
+                'loading_for_seconds': elapsed,
+            }
+
+
+def _after_fork_in_child():
+    # A load running in the parent has no thread here; forget it and start over
+    for lifecycle in list(_lifecycles):
+        if lifecycle.state == ModelLifecycle.LOADING:
+            lifecycle._reset_state()
+        else:
+            lifecycle._lock = threading.Lock()
+            lifecycle._settled = threading.Condition(lifecycle._lock)
+    if _preload_requested:
+        preload_models()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _local_services():
+    from .gpt2_service import get_gpt2_service
+    from .vqa_service import get_vqa_service
+    return [get_vqa_service(), get_gpt2_service()]
+
+
+def preload_models(wait=False, timeout=None):
+    """
+    Load the VQA and GPT-2 models in parallel background threads
+
+    Safe to call repeatedly: models already loaded or loading are left alone.
+
+    Args:
+        wait (bool): Block until every model has finished loading (or failed)
+        timeout (float, optional): Longest time to wait for each model
+    """
+    global _preload_requested
+    _preload_requested = True
+
+    # Set environment variable
+    os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
+
+    services = _local_services()
+    for service in services:
+        if service.lifecycle.start(service._load_model):
+            logger.info(f"🔄 Loading {service.lifecycle.name} model in the background...")
+    if wait:
+        for service in services:
+            service.lifecycle.wait(timeout)
+
+
+def preload_on_startup(serving):
+    """
+    Start loading the models if this process should have them at startup
+
+    Application servers (gunicorn, uvicorn, runserver's serving process) import
+    the WSGI/ASGI module, so that is where 'auto' preloading happens; unlike
+    the old RUN_MAIN check this works in every server. MODEL_PRELOAD='always'
+    also preloads during app setup (shell, management commands), 'never' turns
+    preloading off.
+
+    Args:
+        serving (bool): Called from the WSGI/ASGI entry point rather than app setup
+
+    Returns:
+        bool: Whether preloading was started
+    """
+    from .services import use_inference_server
+
+    if use_inference_server():
+        logger.info("Skipping AI model preloading (models live in the inference server)")
+        return False
+
+    mode = str(getattr(settings, 'MODEL_PRELOAD', 'auto')).lower()
+    mode = {'true': 'always', 'false': 'never'}.get(mode, mode)
+    if mode == 'never' or (mode == 'auto' and not serving):
+        return False
+
+    logger.info("Starting AI model background loading...")
+    try:
+        preload_models()
+        logger.info("✅ AI models loading threads started")
+    except Exception as e:
+        logger.error(f"❌ Failed to start AI models loading: {e}")
+        return False
+    return True
+
+
+def get_model_statuses():
+    """Lifecycle snapshots of the models in this process, keyed by model name"""
+    from .services import get_gpt2_service, get_vqa_service
+    return {
+        'vqa': get_vqa_service().get_lifecycle(),
+        'gpt2': get_gpt2_service().get_lifecycle(),
+    }
@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import struct
+import time
+from contextlib import contextmanager
+
+import torch
+import transformers
+from django.conf import settings
+from transformers import AutoConfig
+from transformers.modeling_utils import no_init_weights
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'snapshot.json'
+WEIGHTS_NAME = 'model.safetensors'
+WEIGHTS_INDEX_NAME = 'model.safetensors.index.json'
+
+SAFETENSORS_DTYPES = {
+    'F64': torch.float64,
+    'F32': torch.float32,
+    'F16': torch.float16,
+    'BF16': torch.bfloat16,
+    'I64': torch.int64,
+    'I32': torch.int32,
+    'I16': torch.int16,
+    'I8': torch.int8,
+    'U8': torch.uint8,
+    'BOOL': torch.bool,
+}
+
+
+def snapshot_path(model_name, dtype):
+    """Directory holding the snapshot of a model converted to a dtype"""
+    dtype_name = str(dtype).replace('torch.', '')
+    return os.path.join(settings.MODEL_SNAPSHOT_DIR, f"{model_name.replace('/', '--')}-{dtype_name}")
+
+
+def write_snapshot(model_name, model, tokenizer, dtype):
+    """
+    Save a loaded, eval-mode model and its tokenizer as a local snapshot
+
+    Weights are written as safetensors in their final dtype, so loading the
+    snapshot needs no conversion and can memory-map the files directly.
+
+    Returns:
+        str: The snapshot directory
+    """
+    path = snapshot_path(model_name, dtype)
+    os.makedirs(path, exist_ok=True)
+    # One large shard keeps loading to a single mmap where possible
+    model.save_pretrained(path, safe_serialization=True, max_shard_size='20GB')
+    tokenizer.save_pretrained(path)
+    with open(os.path.join(path, MANIFEST_NAME), 'w') as manifest:
+        json.dump({
+            'model_name': model_name,
+            'dtype': str(dtype),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'torch_version': torch.__version__,
+            'transformers_version': transformers.__version__,
+        }, manifest, indent=2)
+    return path
+
+
+def mmap_safetensors(path):
+    """
+    Map a safetensors file into memory and return its tensors without copying
+
+    The file is mapped copy-on-write, so every process that loads the same
+    snapshot shares the page-cache pages for the weights.
+
+    Returns:
+        dict: Tensor name to tensor
+    """
+    with open(path, 'rb') as weights_file:
+        header_size = struct.unpack('<Q', weights_file.read(8))[0]
+        header = json.loads(weights_file.read(header_size))
+    header.pop('__metadata__', None)
+
+    file_size = os.path.getsize(path)
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=file_size)
+    file_bytes = torch.empty(0, dtype=torch.uint8).set_(storage, 0, (file_size,))
+    data_start = 8 + header_size
+
+    tensors = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info['dtype']]
+        begin, end = info['data_offsets']
+        raw = file_bytes[data_start + begin:data_start + end]
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        if (data_start + begin) % itemsize:
+            # Misaligned tensors can't be viewed in place, so copy just those
+            raw = raw.clone()
+        tensors[name] = raw.view(dtype).reshape(info['shape'])
+    return tensors
+
+
+def _weight_files(path):
+    index_path = os.path.join(path, WEIGHTS_INDEX_NAME)
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            weight_map = json.load(index_file)['weight_map']
+        return [os.path.join(path, name) for name in sorted(set(weight_map.values()))]
+    return [os.path.join(path, WEIGHTS_NAME)]
+
+
+@contextmanager
+def _parameters_on_meta():
+    """Build modules with parameters on the meta device but real buffers"""
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_meta_parameter(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            param_class = type(module._parameters[name])
+            module._parameters[name] = param_class(
+                module._parameters[name].to('meta'), requires_grad=param.requires_grad
+            )
+
+    torch.nn.Module.register_parameter = register_meta_parameter
+    try:
+        with no_init_weights():
+            yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+
+def load_snapshot(model_name, dtype, auto_model_class, auto_tokenizer_class, device='cpu'):
+    """
+    Load a model and tokenizer from a local snapshot, if one exists
+
+    The model skeleton is built without allocating or initializing weights,
+    then the memory-mapped tensors are assigned to it directly.
+
+    Returns:
+        tuple: (model, tokenizer), or None when there is no usable snapshot
+    """
+    if not getattr(settings, 'USE_MODEL_SNAPSHOTS', True):
+        return None
+    path = snapshot_path(model_name, dtype)
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        started = time.perf_counter()
+        config = AutoConfig.from_pretrained(path, trust_remote_code=True)
+        with _parameters_on_meta():
+            model = auto_model_class.from_config(config, trust_remote_code=True, torch_dtype=dtype)
+
+        state_dict = {}
+        for weights_path in _weight_files(path):
+            state_dict.update(mmap_safetensors(weights_path))
+        model.load_state_dict(state_dict, strict=False, assign=True)
+        # Tied weights (e.g. output embeddings) are stored once
+        model.tie_weights()
+
+        missing = [name for name, param in model.named_parameters() if param.is_meta]
+        if missing:
+            raise ValueError(f"snapshot is missing {len(missing)} weights, e.g. {missing[0]}")
+
+        if device != 'cpu':
+            model = model.to(device)
+        model.eval()
+        tokenizer = auto_tokenizer_class.from_pretrained(path, trust_remote_code=True)
+
+        logger.info(f"Loaded {model_name} snapshot from {path} in {time.perf_counter() - started:.1f}s")
+        return model, tokenizer
+    except Exception as e:
+        logger.warning(f"Could not load {model_name} snapshot from {path}, loading from the hub: {str(e)}")
+        return None
@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .model_lifecycle import add_state_listener
+
+logger = logging.getLogger(__name__)
+
+
+def read_model_statuses():
+    """
+    Current status of the VQA and GPT-2 models, as the status endpoints report it
+
+    Returns:
+        dict: 'vqa' and 'gpt2', each with 'status', 'is_ready' and 'is_loading'
+    """
+    from .services import get_gpt2_service, get_vqa_service
+
+    statuses = {}
+    for key, get_service in (('vqa', get_vqa_service), ('gpt2', get_gpt2_service)):
+        try:
+            service = get_service()
+            statuses[key] = {
+                'status': service.get_status(),
+                'is_ready': service.is_ready(),
+                'is_loading': service.is_loading()
+            }
+        except Exception as e:
+            statuses[key] = {
+                'status': 'error',
+                'error': str(e),
+                'is_ready': False,
+                'is_loading': False
+            }
+    return statuses
+
+
+class ModelStatusBoard:
+    """
+    In-memory model status that request threads can wait on
+
+    Every change gets a new version number, reported to clients together
+    with the board's id (see version_tag): each web process has its own
+    board, so a version handed out by another process never matches and is
+    answered at once instead of being held. Models loaded in this process
+    publish their changes as they happen (see add_state_listener); states that
+    aren't (e.g. the inference server's) are re-read by waiters at most once per
+    refresh_interval for the whole process, however many clients are waiting.
+    """
+
+    def __init__(self, refresh_interval=2.0):
+        self.refresh_interval = refresh_interval
+        self.board_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._waiting = 0
+        self.version = 0
+        self.statuses = None
+        self._refreshed_at = 0.0
+        self.refreshes = 0
+
+    def publish(self, statuses):
+        """
+        Record new statuses, waking the waiters if anything changed
+
+        Returns:
+            tuple: (version, statuses) afterwards
+        """
+        with self._lock:
+            if statuses != self.statuses:
+                self.statuses = statuses
+                self.version += 1
+                self._changed.notify_all()
+            return self.version, self.statuses
+
+    def refresh(self, force=False):
+        """
+        Re-read the model statuses unless that happened within refresh_interval
+
+        Returns:
+            tuple: (version, statuses)
+        """
+        with self._lock:
+            fresh = time.monotonic() - self._refreshed_at < self.refresh_interval
+            if self.statuses is not None and fresh and not force:
+                return self.version, self.statuses
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+        return self.publish(read_model_statuses())
+
+    def version_tag(self, version):
+        """A version as reported to clients, e.g. '3f2a9c1e:4'"""
+        return f"{self.board_id}:{version}"
+
+    def current(self):
+        """(version, statuses), reading them first if nothing has been read yet"""
+        with self._lock:
+            if self.statuses is not None:
+                return self.version, self.statuses
+        return self.refresh()
+
+    def wait_for_change(self, version, timeout):
+        """
+        Block until the statuses differ from the given version
+
+        Args:
+            version (int): The version the caller has already seen
+            timeout (float): Longest time to wait, in seconds
+
+        Returns:
+            tuple: (version, statuses); the version is unchanged if the timeout expired
+        """
+        self.current()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self.version != version:
+                    return self.version, self.statuses
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self.version, self.statuses
+                self._waiting += 1
+                try:
+                    self._changed.wait(min(remaining, self.refresh_interval))
+                finally:
+                    self._waiting -= 1
+                if self.version != version:
+                    return self.version, self.statuses
+            self.refresh()
+
+    def get_stats(self):
+        """Get the current version and how often statuses were read"""
+        with self._lock:
+            return {
+                'board_id': self.board_id,
+                'version': self.version,
+                'waiters': self._waiting,
+                'refreshes': self.refreshes
+            }
+
+
+# Global instance
+model_status_board = None
+_board_lock = threading.Lock()
+
+def get_model_status_board():
+    """Get or create the global model status board"""
+    global model_status_board
+    with _board_lock:
+        if model_status_board is None:
+            model_status_board = ModelStatusBoard(
+                refresh_interval=getattr(settings, 'MODEL_STATUS_REFRESH_INTERVAL', 2.0)
+            )
+            add_state_listener(lambda lifecycle: model_status_board.refresh(force=True))
+    return model_status_board
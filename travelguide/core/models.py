@@ -1,13 +1,16 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from django.dispatch import receiver
 
+from .storage import media_blob_storage
+
 class UserProfile(models.Model):
     """Extended user profile with profile picture"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     profile_picture = models.ImageField(
         upload_to='profile_pictures/',
+        storage=media_blob_storage,
         null=True,
         blank=True,
         help_text='Upload a profile picture (optional)'
@@ -26,18 +29,90 @@ class UserProfile(models.Model):
         return None
 
 class LandmarkImage(models.Model):
-    """Model to store uploaded landmark images"""
+    """Model to store uploaded landmark images and their identification job"""
+    STATUS_QUEUED = 'queued'
+    STATUS_IDENTIFYING = 'identifying'
+    STATUS_DESCRIBING = 'describing'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_IDENTIFYING, 'Identifying landmark'),
+        (STATUS_DESCRIBING, 'Generating description'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    PENDING_STATUSES = (STATUS_QUEUED, STATUS_IDENTIFYING, STATUS_DESCRIBING)
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='landmark_images')
     image = models.ImageField(
         upload_to='landmark_images/',
+        storage=media_blob_storage,
         help_text='Uploaded landmark image'
     )
     landmark_name = models.CharField(max_length=255, null=True, blank=True)
+    description = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True, default='')
     identified_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    vision_embedding = models.FileField(
+        upload_to='landmark_embeddings/',
+        null=True,
+        blank=True,
+        help_text='Vision encoder output for the image (safetensors), reused by chat'
+    )
     
     def __str__(self):
         return f"Landmark image by {self.user.username} - {self.landmark_name or 'Unknown'}"
 
+    @property
+    def is_pending(self):
+        """Whether the identification job has not finished yet"""
+        return self.status in self.PENDING_STATUSES
+
+class MediaBlob(models.Model):
+    """A content-addressed upload and how many rows refer to it (see core.storage)"""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by every reference count change, so gc_media can leave blobs in use alone
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+class LandmarkDescription(models.Model):
+    """Generated landmark description, shared by every image of the same landmark"""
+    normalized_name = models.CharField(max_length=255, unique=True)
+    landmark_name = models.CharField(max_length=255)
+    description = models.TextField()
+    model_name = models.CharField(max_length=100, blank=True, default='')
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Description of {self.landmark_name}"
+
+class OSMLandmark(models.Model):
+    """Landmark imported from an OpenStreetMap extract for offline nearby search"""
+    osm_type = models.CharField(max_length=10)  # node, way or relation
+    osm_id = models.BigIntegerField()
+    name = models.CharField(max_length=255)
+    category = models.CharField(max_length=20, db_index=True)  # A key of geo_proxy.CATEGORIES
+    latitude = models.FloatField(db_index=True)
+    longitude = models.FloatField()
+    tags = models.JSONField(default=dict)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['osm_type', 'osm_id']
+
+    def __str__(self):
+        return f"{self.name} ({self.osm_type}/{self.osm_id})"
+
 class SavedLocation(models.Model):
     """Model to store locations saved by users from explore nearby"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_locations')
@@ -50,6 +125,7 @@ class SavedLocation(models.Model):
     rating = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True)
     user_ratings_total = models.IntegerField(null=True, blank=True)
     saved_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['user', 'place_id']
@@ -69,4 +145,77 @@ def save_user_profile(sender, instance, **kwargs):
         instance.profile.save()
     except UserProfile.DoesNotExist:
         # Create profile if it doesn't exist
-        UserProfile.objects.create(user=instance) 
\ No newline at end of file
+        UserProfile.objects.create(user=instance) 
+
+@receiver(post_delete, sender=LandmarkImage)
+def delete_landmark_embedding(sender, instance, **kwargs):
+    # The embedding is only useful alongside its image row
+    if instance.vision_embedding:
+        instance.vision_embedding.delete(save=False)
+
+# Reference counts of content-addressed uploads; a blob is deleted with its last reference.
+# A file uploaded through the field is stored during save, and storing it already
+# takes the row's reference (see ContentAddressedStorage._save)
+@receiver(pre_save, sender=LandmarkImage)
+@receiver(pre_save, sender=UserProfile)
+def note_uploaded_blob(sender, instance, **kwargs):
+    field_file = instance.image if sender is LandmarkImage else instance.profile_picture
+    instance._blob_retained_on_save = bool(field_file) and not field_file._committed
+
+@receiver(post_save, sender=LandmarkImage)
+def retain_landmark_image_blob(sender, instance, created, **kwargs):
+    from .storage import retain_blob
+    if created and instance.image and not instance._blob_retained_on_save:
+        retain_blob(instance.image.name)
+
+@receiver(post_delete, sender=LandmarkImage)
+def release_landmark_image_blob(sender, instance, **kwargs):
+    from .storage import release_blob
+    if instance.image:
+        release_blob(instance.image.name)
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_picture(sender, instance, **kwargs):
+    # The stored name, read before the field wraps it, to spot a replaced picture on save
+    picture = instance.__dict__.get('profile_picture')
+    instance._stored_profile_picture = getattr(picture, 'name', picture) or ''
+
+@receiver(post_save, sender=UserProfile)
+def update_profile_picture_blobs(sender, instance, **kwargs):
+    from .storage import release_blob, retain_blob
+    current = instance.profile_picture.name or ''
+    previous = instance._stored_profile_picture
+    if current == previous:
+        if instance._blob_retained_on_save:
+            # The same picture uploaded again; the row already holds its reference
+            release_blob(current)
+        return
+    instance._stored_profile_picture = current
+    if current and not instance._blob_retained_on_save:
+        retain_blob(current)
+    if previous:
+        release_blob(previous)
+
+@receiver(post_delete, sender=UserProfile)
+def release_profile_picture_blob(sender, instance, **kwargs):
+    from .storage import release_blob
+    if instance._stored_profile_picture:
+        release_blob(instance._stored_profile_picture)
+
+@receiver(post_save, sender=SavedLocation)
+@receiver(post_delete, sender=SavedLocation)
+def saved_locations_changed(sender, instance, **kwargs):
+    # Drops cached routes for this user
+    from .saved_locations import bump_saved_locations_version
+    bump_saved_locations_version(instance.user_id)
+
+# Keep the spatial index in step with single-row edits; bulk imports rebuild it
+@receiver(post_save, sender=OSMLandmark)
+def index_osm_landmark(sender, instance, **kwargs):
+    from .spatial_index import index_landmark
+    index_landmark(instance)
+
+@receiver(post_delete, sender=OSMLandmark)
+def unindex_osm_landmark(sender, instance, **kwargs):
+    from .spatial_index import unindex_landmark
+    unindex_landmark(instance.pk)
@@ -0,0 +1,105 @@
+import logging
+
+import torch
+from django.conf import settings
+from transformers.pytorch_utils import Conv1D
+
+logger = logging.getLogger(__name__)
+
+CPU_MODE_FP32 = 'fp32'
+CPU_MODE_BF16 = 'bf16'
+CPU_MODE_INT8 = 'int8'
+CPU_MODES = (CPU_MODE_FP32, CPU_MODE_BF16, CPU_MODE_INT8)
+
+
+def cpu_supports_bf16():
+    """Check whether this CPU has native bfloat16 matmul support (AVX512-BF16/AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        pass
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            flags = cpuinfo.read()
+    except OSError:
+        return False
+    return 'avx512_bf16' in flags or 'amx_bf16' in flags
+
+
+def get_cpu_mode(service_name=None):
+    """
+    Get the configured CPU inference mode
+
+    Args:
+        service_name (str, optional): 'vqa' or 'gpt2'; VQA_CPU_MODE / GPT2_CPU_MODE
+            override INFERENCE_CPU_MODE for that service
+
+    Returns:
+        str: One of CPU_MODES
+    """
+    mode = ''
+    if service_name:
+        mode = getattr(settings, f'{service_name.upper()}_CPU_MODE', '')
+    return resolve_cpu_mode(mode or getattr(settings, 'INFERENCE_CPU_MODE', CPU_MODE_FP32))
+
+
+def resolve_cpu_mode(mode):
+    """Validate a CPU mode, falling back to fp32 when this CPU can't run it well"""
+    mode = (mode or CPU_MODE_FP32).lower()
+    if mode not in CPU_MODES:
+        raise ValueError(f"Unknown CPU inference mode '{mode}', expected one of {', '.join(CPU_MODES)}")
+    if mode == CPU_MODE_BF16 and not cpu_supports_bf16():
+        logger.warning("CPU has no native bfloat16 support, using fp32 instead")
+        return CPU_MODE_FP32
+    return mode
+
+
+def cpu_dtype(mode):
+    """Weight/activation dtype to load a model with for a CPU mode"""
+    # int8 quantizes float32 weights, so it loads at fp32 first
+    return torch.bfloat16 if mode == CPU_MODE_BF16 else torch.float32
+
+
+def conv1d_to_linear(module):
+    """
+    Replace GPT-2 style Conv1D layers with equivalent nn.Linear layers, in place
+
+    Conv1D is a Linear with transposed weights, but dynamic quantization only
+    recognises nn.Linear, so GPT-2 would otherwise stay at full precision.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features, dtype=child.weight.dtype)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+def quantize_dynamic_int8(module):
+    """
+    Apply dynamic int8 quantization to every nn.Linear in a module
+
+    Weights are stored as int8 and activations are quantized on the fly, which
+    roughly quarters Linear weight memory and speeds up matmuls on CPU.
+    """
+    conv1d_to_linear(module)
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def model_size_bytes(module):
+    """Approximate in-memory size of a module's weights, including quantized ones"""
+    size = sum(t.numel() * t.element_size() for t in module.state_dict().values() if isinstance(t, torch.Tensor))
+    for submodule in module.modules():
+        # Dynamically quantized Linears keep packed weights outside state_dict tensors
+        packed = getattr(submodule, '_packed_params', None)
+        if hasattr(packed, '_weight_bias'):
+            weight, bias = packed._weight_bias()
+            size += weight.numel() * weight.element_size()
+            if bias is not None:
+                size += bias.numel() * bias.element_size()
+    return size
@@ -0,0 +1,237 @@
+import time
+
+import numpy as np
+
+from .geo import EARTH_RADIUS_KM, centroid, haversine_km_array
+
+# Improvements smaller than this (km) are treated as ties, so the search terminates
+EPSILON_KM = 1e-9
+
+# Segment lengths Or-opt tries to move
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+
+def distance_matrix(lats, lngs):
+    """
+    Pairwise great-circle distances in kilometres
+
+    Returns:
+        numpy.ndarray: n x n matrix
+    """
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lngs, dtype=np.float64))
+    d_phi = phi[:, None] - phi[None, :]
+    d_lambda = lam[:, None] - lam[None, :]
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(order, matrix):
+    """Length of an open path through the matrix in the given order"""
+    order = np.asarray(order)
+    if len(order) < 2:
+        return 0.0
+    return float(matrix[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour(matrix, start=0):
+    """Greedy path from start, always moving to the closest unvisited point"""
+    count = len(matrix)
+    visited = np.zeros(count, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(count - 1):
+        distances = np.where(visited, np.inf, matrix[order[-1]])
+        closest = int(np.argmin(distances))
+        order.append(closest)
+        visited[closest] = True
+    return order
+
+
+def two_opt(order, matrix, deadline=None):
+    """
+    Improve an open path by reversing sub-paths while that shortens it
+
+    The first point stays first. For each cut point every candidate reversal is
+    scored in one array operation.
+
+    Returns:
+        tuple: (order, whether anything improved)
+    """
+    order = np.asarray(order)
+    count = len(order)
+    improved_any = False
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, count - 1):
+            if deadline and time.perf_counter() > deadline:
+                return order, improved_any
+            # Reverse order[i..j] for every j > i at once
+            a, b = order[i - 1], order[i]
+            ends = order[i + 1:]
+            following = np.append(order[i + 2:], order[-1])
+            has_next = np.ones(len(ends), dtype=bool)
+            has_next[-1] = False
+            delta = (
+                matrix[a, ends] - matrix[a, b]
+                + np.where(has_next, matrix[b, following] - matrix[ends, following], 0.0)
+            )
+            best = int(np.argmin(delta))
+            if delta[best] < -EPSILON_KM:
+                j = i + 1 + best
+                order[i:j + 1] = order[i:j + 1][::-1].copy()
+                improved = improved_any = True
+    return order, improved_any
+
+
+def or_opt(order, matrix, deadline=None):
+    """
+    Improve an open path by moving short runs of stops elsewhere, possibly reversed
+
+    One sweep over every run of OR_OPT_SEGMENT_LENGTHS stops; the first point
+    stays first. Insertion points for a run are scored in one array operation.
+
+    Returns:
+        tuple: (order, whether anything improved)
+    """
+    order = list(order)
+    count = len(order)
+    improved_any = False
+    for length in OR_OPT_SEGMENT_LENGTHS:
+        i = 1
+        while i + length <= count:
+            if deadline and time.perf_counter() > deadline:
+                return order, improved_any
+            segment = order[i:i + length]
+            first, last = segment[0], segment[-1]
+            before = order[i - 1]
+            after = order[i + length] if i + length < count else None
+            removal = -matrix[before, first]
+            if after is not None:
+                removal += matrix[before, after] - matrix[last, after]
+
+            rest = np.array(order[:i] + order[i + length:])
+            # Insert after rest[k] for every k; after the last stop there is no edge to break
+            nexts = np.append(rest[1:], rest[-1])
+            has_next = np.ones(len(rest), dtype=bool)
+            has_next[-1] = False
+            broken = np.where(has_next, matrix[rest, nexts], 0.0)
+            forward = matrix[rest, first] + np.where(has_next, matrix[last, nexts], 0.0) - broken
+            backward = matrix[rest, last] + np.where(has_next, matrix[first, nexts], 0.0) - broken
+
+            k_forward = int(np.argmin(forward))
+            k_backward = int(np.argmin(backward))
+            reverse = backward[k_backward] < forward[k_forward]
+            k = k_backward if reverse else k_forward
+            gain = removal + (backward[k] if reverse else forward[k])
+            if gain < -EPSILON_KM:
+                moved = segment[::-1] if reverse else segment
+                rest = list(rest)
+                order = rest[:k + 1] + moved + rest[k + 1:]
+                improved_any = True
+            else:
+                i += 1
+    return order, improved_any
+
+
+def split_days(order, matrix, day_minutes, visit_minutes, speed_kmh, start=None):
+    """
+    Split a visiting order into days that fit a time budget
+
+    A day is filled greedily with travel time plus visit_minutes per stop. The
+    first day starts at start (if given), later days at their first stop, and
+    a stop that alone exceeds the budget still gets a day of its own.
+
+    Returns:
+        list: Day number (from 1) for each position in order
+    """
+    days = []
+    day = 1
+    used = 0.0
+    previous = start
+    for stop in order:
+        travel = 0.0 if previous is None else matrix[previous, stop] / speed_kmh * 60
+        if used and used + travel + visit_minutes > day_minutes:
+            day += 1
+            used = 0.0
+            travel = 0.0
+        used += travel + visit_minutes
+        days.append(day)
+        previous = stop
+    return days
+
+
+def plan_route(lats, lngs, start=None, day_minutes=None, visit_minutes=60, speed_kmh=4.5, time_limit=2.0):
+    """
+    Order places into a short trip, optionally split into days
+
+    Builds a nearest-neighbour path and improves it with 2-opt and Or-opt until
+    neither helps or time_limit seconds have passed.
+
+    Args:
+        lats (list): Latitudes of the places
+        lngs (list): Longitudes of the places
+        start (tuple, optional): (lat, lng) the trip starts from, e.g. the hotel;
+            otherwise it starts at the place furthest from the middle
+        day_minutes (float, optional): Time budget per day; no split if None
+        visit_minutes (float): Time spent at each place
+        speed_kmh (float): Travel speed used for the time budget
+
+    Returns:
+        dict: 'order' (indices into the inputs), 'legs_km' (distance to each stop
+        from the previous one or the start), 'days' (day of each stop),
+        'total_km', 'initial_km' (before improvement) and 'complete'
+        (False if the time limit cut the improvement short)
+    """
+    count = len(lats)
+    if count == 0:
+        return {'order': [], 'legs_km': [], 'days': [], 'total_km': 0.0, 'initial_km': 0.0, 'complete': True}
+
+    deadline = time.perf_counter() + time_limit
+    if start is not None:
+        # The start is an extra fixed first point that isn't part of the result
+        matrix = distance_matrix([start[0]] + list(lats), [start[1]] + list(lngs))
+        first = 0
+    else:
+        matrix = distance_matrix(lats, lngs)
+        middle = centroid(lats, lngs)
+        first = int(np.argmax(haversine_km_array(middle[0], middle[1], lats, lngs)))
+
+    order = nearest_neighbour(matrix, first)
+    initial_km = path_length(order, matrix)
+    complete = True
+    while True:
+        order, _ = two_opt(order, matrix, deadline)
+        order, improved_or_opt = or_opt(order, matrix, deadline)
+        if time.perf_counter() > deadline:
+            complete = False
+            break
+        if not improved_or_opt:
+            break
+
+    order = [int(index) for index in order]
+    legs = [0.0] + [float(matrix[a, b]) for a, b in zip(order[:-1], order[1:])]
+    if start is not None:
+        # Drop the start point, keeping the distance from it to the first stop
+        legs = legs[1:]
+        stops = [index - 1 for index in order[1:]]
+    else:
+        stops = order
+
+    if day_minutes:
+        if start is not None:
+            days = split_days(order[1:], matrix, day_minutes, visit_minutes, speed_kmh, start=order[0])
+        else:
+            days = split_days(order, matrix, day_minutes, visit_minutes, speed_kmh)
+    else:
+        days = [1] * len(stops)
+
+    return {
+        'order': stops,
+        'legs_km': [round(leg, 3) for leg in legs],
+        'days': days,
+        'total_km': round(path_length(order, matrix), 3),
+        'initial_km': round(initial_km, 3),
+        'complete': complete,
+    }
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import SavedLocation
+from .route_planner import plan_route
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, 'SAVED_LOCATIONS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f"saved-locations:version:{user_id}"
+
+
+def get_saved_locations_version(user_id):
+    """
+    Version of a user's saved locations, changed whenever one is saved, edited or removed
+
+    The version is the time of the last change in nanoseconds, kept in the
+    cache so revalidating costs no query. If the cache lost it, a new one is
+    started from now, which only makes cached data look stale, never fresh.
+    Every web process must see the same bumps, so SAVED_LOCATIONS_CACHE_ALIAS
+    has to be a shared backend when there's more than one worker.
+    """
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key) or time.time_ns()
+    return version
+
+
+def bump_saved_locations_version(user_id):
+    """Invalidate everything cached for a user's saved locations"""
+    try:
+        _cache().set(_version_key(user_id), time.time_ns(), timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not bump saved locations version for user {user_id}: {str(e)}")
+
+
+def get_request_saved_locations_version(request):
+    """The requesting user's saved-locations version, read once per request"""
+    if not hasattr(request, '_saved_locations_version'):
+        request._saved_locations_version = get_saved_locations_version(request.user.id)
+    return request._saved_locations_version
+
+
+def get_saved_place_ids(user_id, version=None):
+    """
+    place_ids of a user's saved locations, cached until they change
+
+    Args:
+        version (int, optional): The user's saved-locations version, if already read
+
+    Returns:
+        list: The place_ids, as stored
+    """
+    if version is None:
+        version = get_saved_locations_version(user_id)
+    key = f"saved-locations:place-ids:{user_id}:{version}"
+    cache = _cache()
+    place_ids = cache.get(key)
+    if place_ids is None:
+        place_ids = list(SavedLocation.objects.filter(user_id=user_id).values_list('place_id', flat=True))
+        cache.set(key, place_ids, timeout=getattr(settings, 'SAVED_LOCATIONS_CACHE_TTL', 24 * 3600))
+    return place_ids
+
+
+def saved_locations_etag(request, *args, **kwargs):
+    """ETag for condition(): changes whenever the user saves, edits or removes a location"""
+    if not request.user.is_authenticated:
+        return None
+    return f"{request.user.id}-{get_request_saved_locations_version(request)}"
+
+
+def saved_locations_last_modified(request, *args, **kwargs):
+    """Last-Modified for condition(): when the user's saved locations last changed"""
+    if not request.user.is_authenticated:
+        return None
+    return datetime.fromtimestamp(get_request_saved_locations_version(request) / 1e9, tz=timezone.utc)
+
+
+def get_route(user, start=None, day_minutes=None, visit_minutes=60, speed_kmh=4.5, version=None):
+    """
+    Visiting order for a user's saved locations, cached until they change
+
+    Args:
+        start (tuple, optional): (lat, lng) to start from
+        day_minutes (float, optional): Split into days of this many minutes
+        version (int, optional): The user's saved-locations version, if already read
+
+    Returns:
+        dict: 'stops' in visiting order (id, place_id, name, lat, lng, day, leg_km),
+        'unrouted' locations without coordinates, 'days' totals, 'total_km',
+        'initial_km', 'complete' and whether it came from the 'cached' route
+    """
+    if version is None:
+        version = get_saved_locations_version(user.id)
+    options = {
+        'start': [round(start[0], 4), round(start[1], 4)] if start else None,
+        'day_minutes': day_minutes,
+        'visit_minutes': visit_minutes,
+        'speed_kmh': speed_kmh,
+    }
+    digest = hashlib.sha1(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    key = f"saved-locations:route:{user.id}:{version}:{digest}"
+    cache = _cache()
+    route = cache.get(key)
+    if route is not None:
+        return dict(route, cached=True)
+
+    located = []
+    unrouted = []
+    for location in SavedLocation.objects.filter(user=user).order_by('saved_at'):
+        if location.latitude is None or location.longitude is None:
+            unrouted.append({'id': location.id, 'place_id': location.place_id, 'name': location.name})
+        else:
+            located.append(location)
+
+    result = plan_route(
+        [float(location.latitude) for location in located],
+        [float(location.longitude) for location in located],
+        start=start,
+        day_minutes=day_minutes,
+        visit_minutes=visit_minutes,
+        speed_kmh=speed_kmh,
+        time_limit=getattr(settings, 'ROUTE_TIME_LIMIT_SECONDS', 2.0),
+    )
+
+    stops = []
+    days = {}
+    for index, leg_km, day in zip(result['order'], result['legs_km'], result['days']):
+        location = located[index]
+        stops.append({
+            'id': location.id,
+            'place_id': location.place_id,
+            'name': location.name,
+            'lat': float(location.latitude),
+            'lng': float(location.longitude),
+            'day': day,
+            'leg_km': leg_km,
+        })
+        totals = days.setdefault(day, {'day': day, 'stops': 0, 'distance_km': 0.0, 'minutes': 0.0})
+        # A day's first leg is the trip from the previous day's last stop, which isn't walked that day
+        travel_km = leg_km if totals['stops'] or day == 1 else 0.0
+        totals['stops'] += 1
+        totals['distance_km'] += travel_km
+        totals['minutes'] += travel_km / speed_kmh * 60 + visit_minutes
+
+    route = {
+        'stops': stops,
+        'unrouted': unrouted,
+        'days': [
+            dict(totals, distance_km=round(totals['distance_km'], 2), minutes=round(totals['minutes']))
+            for totals in days.values()
+        ],
+        'total_km': result['total_km'],
+        'initial_km': result['initial_km'],
+        'complete': result['complete'],
+    }
+    cache.set(key, route, timeout=getattr(settings, 'ROUTE_CACHE_TTL', 24 * 3600))
+    return dict(route, cached=False)
@@ -0,0 +1,73 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Services installed by override_services(), e.g. stand-ins during load tests
+_overrides = {}
+
+
+def use_inference_server():
+    """Check whether model calls should go to the out-of-process inference server"""
+    return bool(getattr(settings, 'INFERENCE_SERVER_SOCKET', ''))
+
+
+def get_vqa_service():
+    """
+    Get the VQA service for this process
+
+    When INFERENCE_SERVER_SOCKET is set this is a thin client for the inference
+    server, so web workers never import torch or hold the model themselves.
+    """
+    if 'vqa' in _overrides:
+        return _overrides['vqa']
+    if use_inference_server():
+        from .inference_client import get_remote_vqa_service
+        return get_remote_vqa_service()
+    from .vqa_service import get_vqa_service as get_local_vqa_service
+    return get_local_vqa_service()
+
+
+def get_gpt2_service():
+    """
+    Get the GPT-2 service for this process
+
+    When INFERENCE_SERVER_SOCKET is set this is a thin client for the inference
+    server, so web workers never import torch or hold the model themselves.
+    """
+    if 'gpt2' in _overrides:
+        return _overrides['gpt2']
+    if use_inference_server():
+        from .inference_client import get_remote_gpt2_service
+        return get_remote_gpt2_service()
+    from .gpt2_service import get_gpt2_service as get_local_gpt2_service
+    return get_local_gpt2_service()
+
+
+@contextmanager
+def override_services(vqa=None, gpt2=None):
+    """
+    Serve every caller in this process from the given services instead of the real ones
+
+    Used to run the views against stand-in models (see core.stand_ins).
+    """
+    previous = dict(_overrides)
+    if vqa is not None:
+        _overrides['vqa'] = vqa
+    if gpt2 is not None:
+        _overrides['gpt2'] = gpt2
+    try:
+        yield
+    finally:
+        _overrides.clear()
+        _overrides.update(previous)
+
+
+def load_local_models():
+    """Load the VQA and GPT-2 models into this process, in parallel, and wait for both"""
+    from .model_lifecycle import preload_models
+
+    logger.info("🔄 Models loading started...")
+    preload_models(wait=True)
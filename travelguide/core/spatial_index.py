@@ -0,0 +1,344 @@
+import json
+import logging
+import math
+
+from django.db import connection, transaction
+
+from .geo import radius_bbox, rank_by_distance
+from .geo_proxy import CATEGORIES, element_categories
+from .models import OSMLandmark
+
+logger = logging.getLogger(__name__)
+
+# SQLite R*Tree over OSMLandmark positions, keyed by OSMLandmark.id
+RTREE_TABLE = 'core_osmlandmark_rtree'
+
+# kNN searches start at this radius and double until they have k landmarks
+KNN_START_RADIUS_KM = 0.5
+
+OSM_TYPE_PREFIXES = {'n': 'node', 'w': 'way', 'r': 'relation'}
+
+
+# Whether each database (by name) has the R*Tree table, so queries skip introspection
+_rtree_databases = {}
+
+
+def rtree_available():
+    """Whether the R*Tree index exists in the default database (created by migration 0009 on SQLite)"""
+    if connection.vendor != 'sqlite':
+        return False
+    name = str(connection.settings_dict['NAME'])
+    if name not in _rtree_databases:
+        _rtree_databases[name] = RTREE_TABLE in connection.introspection.table_names()
+    return _rtree_databases[name]
+
+
+def rebuild_rtree():
+    """Re-index every OSMLandmark, e.g. after a bulk import"""
+    if not rtree_available():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {RTREE_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lng, max_lng) "
+            f"SELECT id, latitude, latitude, longitude, longitude FROM {OSMLandmark._meta.db_table}"
+        )
+
+
+def index_landmark(landmark):
+    if not rtree_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lng, max_lng) VALUES (%s, %s, %s, %s, %s)",
+            [landmark.pk, landmark.latitude, landmark.latitude, landmark.longitude, landmark.longitude]
+        )
+
+
+def unindex_landmark(landmark_id):
+    if not rtree_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {RTREE_TABLE} WHERE id = %s", [landmark_id])
+
+
+def _split_antimeridian(south, west, north, east):
+    """Boxes with longitudes inside [-180, 180]"""
+    if west < -180:
+        return [(south, west + 360, north, 180.0), (south, -180.0, north, east)]
+    if east > 180:
+        return [(south, west, north, 180.0), (south, -180.0, north, east - 360)]
+    return [(south, west, north, east)]
+
+
+def _candidates(lat, lng, radius_km, categories):
+    """(id, latitude, longitude) of every landmark in the circle's bounding box"""
+    rows = []
+    use_rtree = rtree_available()
+    for south, west, north, east in _split_antimeridian(*radius_bbox(lat, lng, radius_km)):
+        if use_rtree:
+            sql = (
+                f"SELECT l.id, l.latitude, l.longitude FROM {RTREE_TABLE} r "
+                f"JOIN {OSMLandmark._meta.db_table} l ON l.id = r.id "
+                f"WHERE r.max_lat >= %s AND r.min_lat <= %s AND r.max_lng >= %s AND r.min_lng <= %s"
+            )
+            params = [south, north, west, east]
+            if categories:
+                sql += f" AND l.category IN ({', '.join(['%s'] * len(categories))})"
+                params += list(categories)
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows.extend(cursor.fetchall())
+        else:
+            queryset = OSMLandmark.objects.filter(
+                latitude__gte=south, latitude__lte=north, longitude__gte=west, longitude__lte=east
+            )
+            if categories:
+                queryset = queryset.filter(category__in=categories)
+            rows.extend(queryset.values_list('id', 'latitude', 'longitude'))
+    return rows
+
+
+def _within(lat, lng, radius_km, categories):
+    """(distance_km, bearing_deg, id) of landmarks within the radius, nearest first"""
+    rows = _candidates(lat, lng, radius_km, categories)
+    indices, distances, bearings = rank_by_distance(
+        lat, lng, [row[1] for row in rows], [row[2] for row in rows], radius_km
+    )
+    return [
+        (float(distance), float(bearing), rows[index][0])
+        for index, distance, bearing in zip(indices, distances, bearings)
+    ]
+
+
+def _load(hits):
+    landmarks = OSMLandmark.objects.in_bulk([landmark_id for _, _, landmark_id in hits])
+    return [
+        (landmarks[landmark_id], distance, bearing)
+        for distance, bearing, landmark_id in hits if landmark_id in landmarks
+    ]
+
+
+def radius_search(lat, lng, radius_km, categories=None, limit=None):
+    """
+    Landmarks within a radius of a point
+
+    Args:
+        categories (list, optional): Keys of CATEGORIES (default: all)
+        limit (int, optional): Return only the nearest this many
+
+    Returns:
+        list: (OSMLandmark, distance_km, bearing_deg) tuples, nearest first
+    """
+    hits = _within(lat, lng, radius_km, categories)
+    return _load(hits[:limit] if limit else hits)
+
+
+def nearest(lat, lng, k, categories=None, max_radius_km=50):
+    """
+    The k landmarks nearest a point
+
+    Searches a growing radius until it holds k landmarks, so dense areas are
+    answered from a small box.
+
+    Args:
+        max_radius_km (float): Give up looking further than this
+
+    Returns:
+        list: Up to k (OSMLandmark, distance_km, bearing_deg) tuples, nearest first
+    """
+    radius_km = min(KNN_START_RADIUS_KM, max_radius_km)
+    while True:
+        hits = _within(lat, lng, radius_km, categories)
+        # Once k lie within the radius, nothing outside it can be nearer
+        if len(hits) >= k or radius_km >= max_radius_km:
+            return _load(hits[:k])
+        radius_km = min(radius_km * 2, max_radius_km)
+
+
+def as_overpass_element(landmark, distance_km=None, bearing_deg=None):
+    """An OSMLandmark in the Overpass element form the explore page reads"""
+    element = {
+        'type': landmark.osm_type,
+        'id': landmark.osm_id,
+        'tags': landmark.tags,
+    }
+    if landmark.osm_type == 'node':
+        element.update(lat=landmark.latitude, lon=landmark.longitude)
+    else:
+        element['center'] = {'lat': landmark.latitude, 'lon': landmark.longitude}
+    if distance_km is not None:
+        element['distance_km'] = round(distance_km, 4)
+    if bearing_deg is not None:
+        element['bearing_deg'] = round(bearing_deg, 1)
+    return element
+
+
+def _centroid(coordinates):
+    """Mean of a GeoJSON geometry's positions as (lat, lng)"""
+    points = []
+
+    def collect(value):
+        if value and isinstance(value[0], (int, float)):
+            points.append(value)
+        else:
+            for item in value:
+                collect(item)
+
+    collect(coordinates)
+    if not points:
+        return None
+    return sum(point[1] for point in points) / len(points), sum(point[0] for point in points) / len(points)
+
+
+def _osm_reference(feature):
+    """(osm_type, osm_id) from the id conventions of osmtogeojson, ogr2ogr and osmium export"""
+    properties = feature.get('properties') or {}
+    for value in (feature.get('id'), properties.get('@id'), properties.get('id')):
+        if not isinstance(value, str):
+            continue
+        # 'node/123' (osmtogeojson) or 'n123' (osmium export --add-unique-id=type_id)
+        if '/' in value:
+            osm_type, _, osm_id = value.partition('/')
+            if osm_id.isdigit():
+                return osm_type, int(osm_id)
+        elif value[:1] in OSM_TYPE_PREFIXES and value[1:].isdigit():
+            return OSM_TYPE_PREFIXES[value[0]], int(value[1:])
+    # ogr2ogr's OSM driver
+    if str(properties.get('osm_way_id') or '').isdigit():
+        return 'way', int(properties['osm_way_id'])
+    if str(properties.get('osm_id') or '').isdigit():
+        return properties.get('osm_type', 'node'), int(properties['osm_id'])
+    if properties.get('@type') and str(properties.get('@id', '')).isdigit():
+        return properties['@type'], int(properties['@id'])
+    return None
+
+
+def iter_geojson(path):
+    """Landmark records from a GeoJSON FeatureCollection"""
+    with open(path, encoding='utf-8') as geojson_file:
+        data = json.load(geojson_file)
+    for feature in data.get('features', []):
+        reference = _osm_reference(feature)
+        geometry = feature.get('geometry') or {}
+        position = _centroid(geometry.get('coordinates') or [])
+        if reference is None or position is None:
+            continue
+        properties = feature.get('properties') or {}
+        tags = properties.get('tags') or {
+            key: value for key, value in properties.items()
+            if not key.startswith('@') and key not in ('id', 'osm_id', 'osm_way_id', 'osm_type')
+        }
+        yield {'osm_type': reference[0], 'osm_id': reference[1], 'lat': position[0], 'lng': position[1], 'tags': tags}
+
+
+def iter_overpass_json(path):
+    """Landmark records from a saved Overpass API response (out center)"""
+    with open(path, encoding='utf-8') as overpass_file:
+        data = json.load(overpass_file)
+    for element in data.get('elements', []):
+        if 'lat' in element:
+            lat, lng = element['lat'], element['lon']
+        elif element.get('center'):
+            lat, lng = element['center']['lat'], element['center']['lon']
+        else:
+            continue
+        yield {'osm_type': element['type'], 'osm_id': element['id'], 'lat': lat, 'lng': lng, 'tags': element.get('tags', {})}
+
+
+def iter_pbf(path):
+    """
+    Landmark records from an OSM PBF extract
+
+    Needs pyosmium (pip install osmium). Ways are placed at the mean of their nodes.
+    """
+    import osmium
+
+    tag_filters = set(CATEGORIES.values())
+    records = []
+
+    def wanted(tags):
+        return 'name' in tags and any(tags.get(key) == value for key, value in tag_filters)
+
+    class Handler(osmium.SimpleHandler):
+        def node(self, node):
+            tags = dict(node.tags)
+            if wanted(tags) and node.location.valid():
+                records.append({
+                    'osm_type': 'node', 'osm_id': node.id,
+                    'lat': node.location.lat, 'lng': node.location.lon, 'tags': tags,
+                })
+
+        def way(self, way):
+            tags = dict(way.tags)
+            if not wanted(tags):
+                return
+            locations = [node.location for node in way.nodes if node.location.valid()]
+            if locations:
+                records.append({
+                    'osm_type': 'way', 'osm_id': way.id,
+                    'lat': sum(location.lat for location in locations) / len(locations),
+                    'lng': sum(location.lon for location in locations) / len(locations),
+                    'tags': tags,
+                })
+
+    Handler().apply_file(path, locations=True)
+    return iter(records)
+
+
+def import_landmarks(records, replace=False, batch_size=1000):
+    """
+    Store landmark records in OSMLandmark and rebuild the spatial index
+
+    Records without a name, or outside the CATEGORIES the explore page shows,
+    are skipped; existing landmarks are updated in place.
+
+    Args:
+        records (iterable): Dicts with osm_type, osm_id, lat, lng and tags
+        replace (bool): Delete all landmarks first
+
+    Returns:
+        dict: Counts of 'imported' and 'skipped' records
+    """
+    imported = 0
+    skipped = 0
+    batch = []
+
+    def flush():
+        OSMLandmark.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['osm_type', 'osm_id'],
+            update_fields=['name', 'category', 'latitude', 'longitude', 'tags', 'imported_at'],
+        )
+        batch.clear()
+
+    with transaction.atomic():
+        if replace:
+            OSMLandmark.objects.all().delete()
+        for record in records:
+            tags = record.get('tags') or {}
+            categories = element_categories({'tags': tags})
+            lat, lng = record.get('lat'), record.get('lng')
+            if (not tags.get('name') or not categories or lat is None or lng is None
+                    or not (math.isfinite(lat) and math.isfinite(lng))):
+                skipped += 1
+                continue
+            batch.append(OSMLandmark(
+                osm_type=record['osm_type'],
+                osm_id=record['osm_id'],
+                name=tags['name'][:255],
+                category=categories[0],
+                latitude=lat,
+                longitude=lng,
+                tags=tags,
+            ))
+            imported += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        rebuild_rtree()
+
+    logger.info(f"✅ Imported {imported} landmarks ({skipped} skipped)")
+    return {'imported': imported, 'skipped': skipped}
@@ -0,0 +1,255 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .batching import MicroBatcher
+from .model_lifecycle import ModelLifecycle
+
+STAND_IN_LANDMARKS = [
+    'Eiffel Tower', 'Taj Mahal', 'Golden Gate Bridge', 'Colosseum', 'Sydney Opera House',
+    'Statue of Liberty', 'Great Wall of China', 'Machu Picchu', 'Big Ben', 'Christ the Redeemer',
+]
+
+
+def _stable_index(value, size):
+    digest = hashlib.sha256(str(value).encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') % size
+
+
+def _image_key(image):
+    """
+    Repeatable key for an image given as a path, its bytes, a file object or a PIL image
+
+    Paths key on their file name; in-memory images on a digest of their content,
+    so the same upload gets the same answer in every run.
+    """
+    if isinstance(image, str):
+        return os.path.basename(image)
+    if hasattr(image, 'read'):
+        image.seek(0)
+        data = image.read()
+        image.seek(0)
+    elif hasattr(image, 'tobytes'):
+        data = f"{image.mode}:{image.width}x{image.height}:".encode('ascii') + image.tobytes()
+    else:
+        data = bytes(image)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _filler_words(seed, count):
+    words = ['historic', 'famous', 'visited', 'iconic', 'ancient', 'architecture', 'city', 'built',
+             'landmark', 'century', 'travellers', 'view', 'culture', 'symbol', 'heritage']
+    offset = _stable_index(seed, len(words))
+    return ' '.join(words[(offset + i) % len(words)] for i in range(count))
+
+
+class StandInLatency:
+    """
+    Deterministic latency model for a stand-in model
+
+    A call (or batch) costs fixed_ms plus per_item_ms for each batched request
+    plus per_token_ms for each generated token. Calls to one model run one at
+    a time, like a real model on one device.
+    """
+
+    def __init__(self, load_ms=0, fixed_ms=0, per_item_ms=0, per_token_ms=0):
+        self.load_ms = load_ms
+        self.fixed_ms = fixed_ms
+        self.per_item_ms = per_item_ms
+        self.per_token_ms = per_token_ms
+        self._device_lock = threading.Lock()
+
+    def run(self, items=1, tokens=0):
+        with self._device_lock:
+            time.sleep((self.fixed_ms + self.per_item_ms * items + self.per_token_ms * tokens) / 1000.0)
+
+
+class StandInVQAService:
+    """
+    Offline stand-in for VQAService with the same public API
+
+    Answers are derived from a hash of the input, so they are repeatable, and
+    requests go through a real MicroBatcher so batching behaves as in production.
+    """
+
+    def __init__(self, latency=None, answer_tokens=24, max_batch_size=4, max_wait_ms=25):
+        self.latency = latency or StandInLatency(load_ms=200, fixed_ms=120, per_item_ms=30, per_token_ms=2)
+        self.answer_tokens = answer_tokens
+        self.lifecycle = ModelLifecycle('vqa-stand-in')
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name='vqa-stand-in',
+        )
+
+    def _load_model(self):
+        time.sleep(self.latency.load_ms / 1000.0)
+
+    def _initialize_model(self):
+        if not self.lifecycle.load(self._load_model):
+            raise RuntimeError(f"Stand-in VQA model failed to load: {self.lifecycle.error}")
+
+    def _generate_batch(self, requests):
+        self.latency.run(items=len(requests), tokens=self.answer_tokens)
+        return [self._answer(*request) for request in requests]
+
+    def _answer(self, kind, key, message):
+        if kind == 'identify':
+            return STAND_IN_LANDMARKS[_stable_index(key, len(STAND_IN_LANDMARKS))]
+        return f"{key} is {_filler_words(message, self.answer_tokens - 2)}."
+
+    def identify_landmark(self, image, embedding_path=None):
+        """
+        Identify the landmark in an image
+
+        Returns:
+            dict: Contains 'success' (bool), 'landmark_name' (str), and 'error' (str if any)
+        """
+        if not self.is_ready():
+            return {'success': False, 'landmark_name': None, 'error': 'VQA model is not ready'}
+        landmark_name = self._batcher.submit(('identify', _image_key(image), None))
+        return {'success': True, 'landmark_name': landmark_name, 'error': None}
+
+    def chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                   embedding_path=None):
+        """
+        Answer a question about a landmark
+
+        Returns:
+            dict: Contains 'success' (bool), 'response' (str), and 'error' (str if any)
+        """
+        if not self.is_ready():
+            return {'success': False, 'response': None, 'error': 'VQA model is not ready'}
+        response = self._batcher.submit(('chat', landmark_name, user_message))
+        return {'success': True, 'response': response, 'error': None}
+
+    def stream_chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                          embedding_path=None):
+        """Answer a question about a landmark, yielding the answer word by word"""
+        if not self.is_ready():
+            raise RuntimeError('VQA model is not ready')
+        self.latency.run(items=1)
+        words = self._answer('chat', landmark_name, user_message).split(' ')
+        for index, word in enumerate(words):
+            time.sleep(self.latency.per_token_ms / 1000.0)
+            yield word if index == 0 else f" {word}"
+
+    def get_batch_metrics(self):
+        """Get per-batch size and latency statistics for the stand-in batcher"""
+        metrics = self._batcher.metrics.snapshot()
+        metrics.update({
+            'max_batch_size': self._batcher.max_batch_size,
+            'max_wait_ms': self._batcher.max_wait * 1000,
+        })
+        return metrics
+
+    def get_streaming_metrics(self):
+        return {}
+
+    def get_conversation_metrics(self):
+        return {}
+
+    def get_unavailable_reason(self):
+        return None if self.is_ready() else 'VQA model is not ready'
+
+    def is_ready(self):
+        return self.lifecycle.is_ready
+
+    def is_loading(self):
+        return self.lifecycle.is_loading
+
+    def get_status(self):
+        return self.lifecycle.state
+
+    def get_lifecycle(self):
+        return self.lifecycle.snapshot()
+
+    def wait_until_ready(self, timeout=None):
+        self.lifecycle.start(self._load_model)
+        self.lifecycle.wait(timeout)
+        return self.is_ready()
+
+
+class StandInGPT2Service:
+    """Offline stand-in for GPT2Service with the same public API and deterministic output"""
+
+    def __init__(self, latency=None, description_tokens=40, max_batch_size=8, max_wait_ms=25):
+        self.latency = latency or StandInLatency(load_ms=100, fixed_ms=60, per_item_ms=10, per_token_ms=1)
+        self.description_tokens = description_tokens
+        self.lifecycle = ModelLifecycle('gpt2-stand-in')
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name='gpt2-stand-in',
+        )
+
+    def _load_model(self):
+        time.sleep(self.latency.load_ms / 1000.0)
+
+    def _initialize_model(self):
+        if not self.lifecycle.load(self._load_model):
+            raise RuntimeError(f"Stand-in GPT-2 model failed to load: {self.lifecycle.error}")
+
+    def _generate_batch(self, landmark_names):
+        unique = list(OrderedDict.fromkeys(landmark_names))
+        self.latency.run(items=len(unique), tokens=self.description_tokens)
+        return [
+            {
+                'success': True,
+                'description': f"{name} is {_filler_words(name, self.description_tokens - 2)}.",
+                'error': None,
+            }
+            for name in landmark_names
+        ]
+
+    def generate_landmark_description(self, landmark_name, max_length=150, num_return_sequences=1):
+        """
+        Generate a description of a landmark
+
+        Returns:
+            dict: Contains 'success' (bool), 'description' (str), and 'error' (str if any)
+        """
+        return self.generate_landmark_descriptions([landmark_name], max_length)[landmark_name]
+
+    def generate_landmark_descriptions(self, landmark_names, max_length=150):
+        """
+        Generate descriptions for many landmarks in shared batches
+
+        Returns:
+            dict: Landmark name to a result dict with 'success', 'description' and 'error'
+        """
+        names = list(OrderedDict.fromkeys(landmark_names))
+        if not self.is_ready():
+            return {name: {'success': False, 'description': None, 'error': 'GPT-2 model is not ready'}
+                    for name in names}
+        return dict(zip(names, self._batcher.submit_many(names)))
+
+    def get_batch_metrics(self):
+        """Get per-batch size and latency statistics for the stand-in batcher"""
+        metrics = self._batcher.metrics.snapshot()
+        metrics.update({
+            'max_batch_size': self._batcher.max_batch_size,
+            'max_wait_ms': self._batcher.max_wait * 1000,
+        })
+        return metrics
+
+    def is_ready(self):
+        return self.lifecycle.is_ready
+
+    def is_loading(self):
+        return self.lifecycle.is_loading
+
+    def get_status(self):
+        return self.lifecycle.state
+
+    def get_lifecycle(self):
+        return self.lifecycle.snapshot()
+
+    def wait_until_ready(self, timeout=None):
+        self.lifecycle.start(self._load_model)
+        self.lifecycle.wait(timeout)
+        return self.is_ready()
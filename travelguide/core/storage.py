@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import posixpath
+import re
+import threading
+import time
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# <upload dir>/ab/cd/abcd...<64 hex><ext>
+BLOB_NAME_RE = re.compile(r'^(?:.+/)?([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:\.[A-Za-z0-9]+)?$')
+
+# Reference count updates retried when the database is busy ("database is locked" on SQLite)
+BLOB_UPDATE_ATTEMPTS = 5
+
+
+def media_blob_storage():
+    """Storage for uploaded images (STORAGES['media_blobs'])"""
+    return storages['media_blobs']
+
+
+def is_blob_name(name):
+    """Whether a storage name is a content-addressed blob"""
+    return bool(name) and BLOB_NAME_RE.match(name) is not None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names each file by the SHA-256 of its bytes
+
+    A file saved as landmark_images/IMG_1.jpg is stored once as
+    landmark_images/ab/cd/abcd<...>.jpg; saving the same bytes again writes
+    nothing and returns that name. Names never change meaning, so they work as
+    cache keys and can be served with far-future cache headers. Which blobs are
+    still in use is tracked by MediaBlob reference counts (see retain_blob).
+
+    Saving takes a reference to the blob for whoever stored it before checking
+    whether the file exists, so a blob being saved again is either kept by
+    collect_blob or written anew (see _delete_blob_file).
+    """
+
+    def content_name(self, name, content):
+        """
+        Storage name for content uploaded under name
+
+        Args:
+            name (str): Name the upload would otherwise get, e.g. landmark_images/IMG_1.jpg
+            content (File): The upload; read in chunks and rewound
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hex_digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        if is_blob_name(name):
+            # Already a blob name (a stored blob saved again); don't shard it twice
+            directory = posixpath.dirname(posixpath.dirname(directory))
+        return posixpath.join(directory, hex_digest[:2], hex_digest[2:4], f"{hex_digest}{extension}")
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save, and equal names mean equal bytes
+        return name
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        full_path = self.path(name)
+        _retrying(_retain, name)
+        try:
+            if not os.path.exists(full_path):
+                self._write(full_path, content)
+        except Exception:
+            release_blob(name)
+            raise
+        return name
+
+    def _write(self, full_path, content):
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, mode=self.directory_permissions_mode or 0o777, exist_ok=True)
+        # Written aside and moved into place, so a blob is never seen half-written;
+        # two writers of the same blob both move identical bytes there
+        temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as blob:
+                for chunk in content.chunks():
+                    blob.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def _retrying(operation, *args):
+    """
+    Run a reference count update, retrying while the database is locked
+
+    Only retried outside a transaction: inside one the error has already
+    broken it, so it's raised for the caller's transaction to roll back.
+    """
+    for attempt in range(BLOB_UPDATE_ATTEMPTS):
+        try:
+            return operation(*args)
+        except OperationalError:
+            if connection.in_atomic_block or attempt == BLOB_UPDATE_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+def _retain(name):
+    from .models import MediaBlob
+
+    # One conditional UPDATE, so concurrent retains and releases never overwrite each other
+    if MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1, updated_at=timezone.now()):
+        return
+    try:
+        _, created = MediaBlob.objects.get_or_create(name=name, defaults={'refcount': 1})
+    except IntegrityError:
+        # Created by a concurrent save between our get and create
+        created = False
+    if not created:
+        _retain(name)
+
+
+def _release(name):
+    """Drop a reference; returns whether that was the last one and the row was deleted"""
+    from .models import MediaBlob
+
+    MediaBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1, updated_at=timezone.now()
+    )
+    return _collect(name)
+
+
+def _collect(name):
+    """Delete the blob's row if it has no references, and its file once that is committed"""
+    from .models import MediaBlob
+
+    deleted, _ = MediaBlob.objects.filter(name=name, refcount=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: _delete_blob_file(name))
+    return bool(deleted)
+
+
+def _delete_blob_file(name):
+    """
+    Delete an unreferenced blob's file and derivatives, unless it was saved again
+
+    The file is moved aside before the final check, so a save that retained the
+    blob in the meantime either saw it and gets it moved back, or found it
+    missing and wrote it again.
+    """
+    from .image_derivatives import delete_derivatives
+    from .models import MediaBlob
+
+    storage = media_blob_storage()
+    if MediaBlob.objects.filter(name=name).exists():
+        return
+    full_path = storage.path(name)
+    doomed_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.deleting"
+    try:
+        try:
+            os.replace(full_path, doomed_path)
+        except FileNotFoundError:
+            return
+        if MediaBlob.objects.filter(name=name).exists():
+            if not os.path.exists(full_path):
+                os.replace(doomed_path, full_path)
+            return
+        delete_derivatives(name)
+    except OSError as e:
+        logger.warning(f"Could not delete media blob {name}: {str(e)}")
+    finally:
+        if os.path.exists(doomed_path):
+            os.remove(doomed_path)
+
+
+def retain_blob(name):
+    """Count a new reference (e.g. a LandmarkImage row) to a stored blob"""
+    if not is_blob_name(name):
+        return
+    _retrying(_retain, name)
+
+
+def release_blob(name):
+    """Drop a reference to a blob, deleting it once nothing refers to it"""
+    if not is_blob_name(name):
+        return
+    _retrying(_release, name)
+
+
+def collect_blob(name):
+    """
+    Delete a blob and its derivatives if nothing refers to it
+
+    The file goes once the row's deletion is committed.
+
+    Returns:
+        bool: Whether it was deleted
+    """
+    # Conditional on the count, so a concurrent save that just retained it wins
+    return _retrying(_collect, name)
+
+
+def iter_blob_names(directory):
+    """Names of the blobs stored under an upload directory, e.g. 'landmark_images'"""
+    storage = media_blob_storage()
+    if not storage.exists(directory):
+        return
+    for first in storage.listdir(directory)[0]:
+        for second in storage.listdir(posixpath.join(directory, first))[0]:
+            shard = posixpath.join(directory, first, second)
+            for filename in storage.listdir(shard)[1]:
+                name = posixpath.join(shard, filename)
+                if is_blob_name(name):
+                    yield name
@@ -0,0 +1,16 @@
+import json
+
+
+def sse_event(event, data):
+    """
+    Format one Server-Sent Events message
+
+    Args:
+        event (str): Event name ('token', 'done', 'error', ...)
+        data: JSON-serializable payload
+
+    Returns:
+        str: The encoded event, terminated by a blank line
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
@@ -0,0 +1,42 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+
+from ..image_derivatives import MIME_TYPES, derivative_url, get_derivatives
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, width, **attrs):
+    """
+    <picture> for an image field shown at width CSS pixels
+
+    Browsers pick the smallest AVIF/WebP derivative that covers the display
+    width at their pixel density; the original is only served while the
+    derivatives are being generated, or to browsers that read neither format.
+
+    Usage: {% picture user.profile.profile_picture 32 alt="Profile" class="rounded-circle" %}
+    """
+    if not image:
+        return ''
+    img = format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+    manifest = get_derivatives(image)
+    if not manifest:
+        return img
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}px">',
+        (
+            (
+                MIME_TYPES[fmt],
+                ', '.join(
+                    f"{derivative_url(image.name, derivative_width, fmt)} {derivative_width}w"
+                    for derivative_width in manifest['widths']
+                ),
+                width,
+            )
+            for fmt in manifest['formats']
+        ),
+    )
+    return format_html('<picture>{}{}</picture>', sources, img)
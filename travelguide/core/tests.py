@@ -0,0 +1,674 @@
+import importlib.util
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from multiprocessing.connection import Listener
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core.batching import MicroBatcher
+from core.conversations import Conversation, ConversationStore
+from core.embedding_store import load_vision_embedding
+from core.geo_proxy import GeoProxy, SingleFlight
+from core.geo_stub import StandInGeoUpstream
+from core.landmark_cache import LandmarkResultCache, MemoryLRUBackend, perceptual_hash
+from core.jobs import LandmarkJobQueue, run_landmark_job
+from core.model_status import ModelStatusBoard
+from core.inference_client import InferenceClient, InferenceServerError, RemoteVQAService, worker_address
+from core.inference_server import _accept_loop
+from core.models import LandmarkImage, MediaBlob, OSMLandmark, SavedLocation
+from core.saved_locations import bump_saved_locations_version, get_route, get_saved_locations_version
+from core.spatial_index import nearest, radius_search, rtree_available
+from core.stand_ins import StandInGPT2Service, StandInLatency, StandInVQAService
+from core.storage import collect_blob, media_blob_storage, release_blob
+
+
+def gradient_image(offset=0, size=64):
+    """Striped gradient; brightening it keeps the dHash but changes the pixels"""
+    image = Image.new('L', (size, size))
+    image.putdata([(x * 37 + y * 11) % 200 + offset for y in range(size) for x in range(size)])
+    return image.convert('RGB')
+
+
+class LandmarkResultCacheTests(SimpleTestCase):
+    def make_cache(self, **kwargs):
+        return LandmarkResultCache(MemoryLRUBackend(ttl=None, max_entries=100), **kwargs)
+
+    def test_same_dhash_different_image_misses_by_default(self):
+        first, second = gradient_image(), gradient_image(offset=10)
+        self.assertEqual(perceptual_hash(first), perceptual_hash(second))
+
+        cache = self.make_cache()
+        cache.store(first, 'Eiffel Tower', 'A wrought-iron tower')
+
+        self.assertIsNone(cache.lookup(second))
+        self.assertEqual(cache.lookup(first)['landmark_name'], 'Eiffel Tower')
+
+    def test_perceptual_match_is_opt_in(self):
+        first, second = gradient_image(), gradient_image(offset=10)
+
+        cache = self.make_cache(match_perceptual=True, max_distance=4)
+        cache.store(first, 'Eiffel Tower', 'A wrought-iron tower')
+
+        self.assertEqual(cache.lookup(second)['landmark_name'], 'Eiffel Tower')
+        self.assertEqual(cache.get_stats()['perceptual_hits'], 1)
+
+    def test_perceptual_match_respects_distance(self):
+        cache = self.make_cache(match_perceptual=True, max_distance=2)
+        phash = int(perceptual_hash(gradient_image()), 16)
+        near = f"{phash ^ 0b11:016x}"
+        far = f"{phash ^ 0b111:016x}"
+        cache.store(None, 'Eiffel Tower', keys=['landmark-result:sha256:a', f"landmark-result:phash:{phash:016x}"])
+
+        self.assertIsNotNone(cache.lookup(None, keys=['landmark-result:sha256:b', f"landmark-result:phash:{near}"]))
+        self.assertIsNone(cache.lookup(None, keys=['landmark-result:sha256:c', f"landmark-result:phash:{far}"]))
+
+
+class SavedLocationsETagTests(TestCase):
+    def setUp(self):
+        caches[settings.SAVED_LOCATIONS_CACHE_ALIAS].clear()
+        self.user = User.objects.create_user('traveller', password='secret')
+        self.client.force_login(self.user)
+        self.url = reverse('core:get_saved_locations')
+
+    def save(self, place_id, latitude=None, longitude=None):
+        return SavedLocation.objects.create(
+            user=self.user, place_id=place_id, name=place_id, address='Paris',
+            latitude=latitude, longitude=longitude
+        )
+
+    def test_etag_follows_saves_and_removals(self):
+        self.save('louvre')
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(2):  # session and user only
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.save('eiffel')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(response.json()['saved_place_ids'], ['louvre', 'eiffel'])
+
+        etag = response['ETag']
+        SavedLocation.objects.get(place_id='eiffel').delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['saved_place_ids'], ['louvre'])
+
+    def test_version_is_read_once_per_request(self):
+        self.save('louvre')
+        with mock.patch('core.saved_locations.get_saved_locations_version',
+                        wraps=get_saved_locations_version) as version:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        version.assert_called_once_with(self.user.id)
+
+    def test_bulk_create_needs_a_bump(self):
+        self.save('louvre', 48.8606, 2.3376)
+        self.assertFalse(get_route(self.user)['cached'])
+        self.assertTrue(get_route(self.user)['cached'])
+
+        SavedLocation.objects.bulk_create([
+            SavedLocation(user=self.user, place_id='eiffel', name='eiffel', address='Paris',
+                          latitude=48.8584, longitude=2.2945)
+        ])
+        self.assertTrue(get_route(self.user)['cached'])
+        bump_saved_locations_version(self.user.id)
+        route = get_route(self.user)
+        self.assertFalse(route['cached'])
+        self.assertEqual(len(route['stops']), 2)
+
+
+class RecoverStaleJobsTests(TestCase):
+    def test_only_old_queued_jobs_are_requeued(self):
+        user = User.objects.create_user('traveller', password='secret')
+        LandmarkImage.objects.create(user=user, image='landmark_images/fresh.jpg')
+        old = LandmarkImage.objects.create(user=user, image='landmark_images/old.jpg')
+        LandmarkImage.objects.filter(id=old.id).update(
+            identified_at=timezone.now() - timedelta(seconds=settings.LANDMARK_JOB_STALE_SECONDS + 60)
+        )
+
+        queue = LandmarkJobQueue(workers=1)
+        with mock.patch.object(queue, '_executor') as executor:
+            queue.recover_stale_jobs()
+
+        executor.submit.assert_called_once_with(run_landmark_job, old.id)
+
+
+class MediaBlobReferenceTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = media_blob_storage()
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def test_saving_retains_the_blob_it_stores(self):
+        name = self.storage.save('landmark_images/a.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(self.storage.save('landmark_images/b.jpg', ContentFile(b'same bytes')), name)
+        self.assertEqual(self.refcount(name), 2)
+
+        release_blob(name)
+        self.assertTrue(self.storage.exists(name))
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_blob(name)
+        # The file outlives the row until the deletion is committed
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+        self.assertTrue(self.storage.exists(name))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.storage.exists(name))
+
+    def test_blob_saved_again_before_commit_keeps_its_file(self):
+        name = self.storage.save('landmark_images/a.jpg', ContentFile(b'same bytes'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_blob(name)
+        self.storage.save('landmark_images/b.jpg', ContentFile(b'same bytes'))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_gc_leaves_recently_changed_counts_alone(self):
+        user = User.objects.create_user('traveller', password='secret')
+        old = self.storage.save('landmark_images/old.jpg', ContentFile(b'old'))
+        LandmarkImage.objects.create(user=user, image=old)
+        MediaBlob.objects.filter(name=old).update(
+            refcount=5, updated_at=timezone.now() - timedelta(hours=2)
+        )
+        # Saved but its row not created yet, like an upload in progress
+        pending = self.storage.save('landmark_images/pending.jpg', ContentFile(b'pending'))
+
+        call_command('gc_media', stdout=io.StringIO())
+        self.assertEqual(self.refcount(old), 1)
+        self.assertEqual(self.refcount(pending), 1)
+        self.assertTrue(self.storage.exists(pending))
+
+    def test_find_landmark_stores_the_upload_before_answering(self):
+        user = User.objects.create_user('traveller', password='secret')
+        self.client.force_login(user)
+        upload = io.BytesIO()
+        gradient_image().save(upload, format='JPEG')
+        upload.name = 'photo.jpg'
+        upload.seek(0)
+        with mock.patch('core.views.get_landmark_job_queue') as queue, \
+                mock.patch('core.views.get_derivative_generator'):
+            response = self.client.post(reverse('core:find_landmark'), {'image': upload},
+                                        HTTP_ACCEPT='application/json')
+        landmark_image = LandmarkImage.objects.get(id=response.json()['job_id'])
+        self.assertTrue(self.storage.exists(landmark_image.image.name))
+        self.assertEqual(self.refcount(landmark_image.image.name), 1)
+        queue.return_value.enqueue.assert_called_once()
+
+    def test_blob_saved_again_is_not_collected(self):
+        name = self.storage.save('landmark_images/a.jpg', ContentFile(b'same bytes'))
+        # Last reference dropped without collecting, as if a release were still in flight
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+
+        self.storage.save('landmark_images/b.jpg', ContentFile(b'same bytes'))
+        self.assertFalse(collect_blob(name))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_upload_is_stored_before_its_row(self):
+        user = User.objects.create_user('traveller', password='secret')
+        landmark_image = LandmarkImage.objects.create(user=user, image=ContentFile(b'photo', name='a.jpg'))
+        name = landmark_image.image.name
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            landmark_image.delete()
+        self.assertFalse(self.storage.exists(name))
+
+    def test_profile_picture_upload_counts_one_reference(self):
+        profile = User.objects.create_user('traveller', password='secret').profile
+        profile.profile_picture = ContentFile(b'avatar', name='me.png')
+        profile.save()
+        name = profile.profile_picture.name
+        self.assertEqual(self.refcount(name), 1)
+
+        profile.profile_picture = ContentFile(b'avatar', name='me-again.png')
+        profile.save()
+        self.assertEqual(self.refcount(name), 1)
+
+        profile.profile_picture = None
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertFalse(self.storage.exists(name))
+
+
+LOADING = {'vqa': {'status': 'loading', 'is_ready': False, 'is_loading': True},
+           'gpt2': {'status': 'loading', 'is_ready': False, 'is_loading': True}}
+READY = {'vqa': {'status': 'ready', 'is_ready': True, 'is_loading': False},
+         'gpt2': {'status': 'ready', 'is_ready': True, 'is_loading': False}}
+
+
+@override_settings(MODEL_STATUS_HOLD_SECONDS=5)
+@override_settings(MODEL_STATUS_HOLD_SECONDS=10)
+class ModelStatusLongPollTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('traveller', password='secret'))
+        self.board = ModelStatusBoard(refresh_interval=60)
+        for target, value in (
+            ('core.model_status.read_model_statuses', lambda: LOADING),
+            ('core.views.get_model_status_board', lambda: self.board),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.url = reverse('core:model_status')
+
+    def test_answers_at_once_without_a_version(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['version'], f"{self.board.board_id}:1")
+        self.assertTrue(data['vqa']['is_loading'])
+
+    def test_held_request_returns_when_status_changes(self):
+        version = self.client.get(self.url).json()['version']
+        timer = threading.Timer(0.2, self.board.publish, args=(READY,))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        started = time.monotonic()
+        data = self.client.get(self.url, {'version': version}).json()
+        self.assertLess(time.monotonic() - started, 4)
+        self.assertEqual(data['version'], f"{self.board.board_id}:2")
+        self.assertTrue(data['vqa']['is_ready'])
+
+    def test_version_from_another_process_is_answered_at_once(self):
+        self.client.get(self.url)
+        with mock.patch.object(self.board, 'wait_for_change') as wait:
+            data = self.client.get(self.url, {'version': 'otherboard:1'}).json()
+        wait.assert_not_called()
+        self.assertEqual(data['version'], f"{self.board.board_id}:1")
+
+    @override_settings(MODEL_STATUS_HOLD_SECONDS=0)
+    def test_no_hold_when_disabled(self):
+        version = self.client.get(self.url).json()['version']
+        with mock.patch.object(self.board, 'wait_for_change') as wait:
+            self.client.get(self.url, {'version': version})
+        wait.assert_not_called()
+
+
+class StandInVQAServiceTests(SimpleTestCase):
+    def test_identify_is_repeatable_for_in_memory_images(self):
+        service = StandInVQAService(latency=StandInLatency())
+        service._initialize_model()
+        self.addCleanup(service._batcher.shutdown)
+
+        names = {service.identify_landmark(gradient_image())['landmark_name'] for _ in range(3)}
+        self.assertEqual(len(names), 1)
+
+
+def parse_events(response):
+    """(event, data) pairs of a Server-Sent Events response"""
+    events = []
+    for chunk in response.streaming_content:
+        for message in chunk.decode('utf-8').split('\n\n'):
+            lines = dict(line.split(': ', 1) for line in message.splitlines() if not line.startswith(':'))
+            if 'event' in lines:
+                events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@override_settings(GEO_WIKIPEDIA_BATCH_SIZE=2, GEO_WIKIPEDIA_CONCURRENCY=2)
+class WikipediaStreamTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('traveller', password='secret'))
+        caches['default'].clear()
+        self.upstream = StandInGeoUpstream()
+        proxy = GeoProxy(self.upstream, caches['default'])
+        patcher = mock.patch('core.views.get_geo_proxy', lambda: proxy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('core:geo_wikipedia_stream')
+        self.titles = ['en:Louvre', 'en:Eiffel Tower', 'en:Notre-Dame de Paris', 'en:Panthéon', 'en:Sacré-Cœur']
+
+    def test_streams_a_summary_per_title_from_a_sync_generator(self):
+        response = self.client.get(self.url, {'title': self.titles})
+        self.assertFalse(response.is_async)
+        events = parse_events(response)
+
+        self.assertEqual(events[-1][0], 'done')
+        self.assertCountEqual([data['title'] for event, data in events[:-1]], self.titles)
+        # Five uncached titles in batches of two
+        self.assertEqual(self.upstream.calls['wikipedia'], 3)
+
+    def test_cached_summaries_skip_the_upstream(self):
+        parse_events(self.client.get(self.url, {'title': self.titles}))
+        calls = dict(self.upstream.calls)
+
+        events = parse_events(self.client.get(self.url, {'title': self.titles}))
+        self.assertEqual(len(events), len(self.titles) + 1)
+        self.assertEqual(self.upstream.calls, calls)
+
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('traveller', password='secret'))
+        self.closed = threading.Event()
+        closed = self.closed
+
+        class Service:
+            def is_ready(self):
+                return True
+
+            def stream_chat_with_landmark_context(self, *args, **kwargs):
+                try:
+                    for word in ['The', ' tower', ' is', ' tall']:
+                        yield word
+                finally:
+                    closed.set()
+
+        patcher = mock.patch('core.services.get_vqa_service', lambda: Service())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self):
+        return self.client.post(
+            reverse('core:vqa_chat_stream'),
+            data=json.dumps({'message': 'How tall?', 'landmark_name': 'Eiffel Tower'}),
+            content_type='application/json'
+        )
+
+    def test_streams_tokens_then_done(self):
+        events = parse_events(self.post())
+        self.assertEqual(''.join(data['text'] for event, data in events if event == 'token'), 'The tower is tall')
+        self.assertEqual(events[-1][0], 'done')
+
+    def test_disconnect_closes_the_token_stream(self):
+        response = self.post()
+        next(iter(response.streaming_content))
+        self.assertFalse(self.closed.is_set())
+
+        # What the WSGI server does when the client goes away
+        response.close()
+        self.assertTrue(self.closed.is_set())
+
+
+TORCH_AVAILABLE = importlib.util.find_spec('torch') is not None
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def make_batcher(self, batch_fn, **kwargs):
+        batcher = MicroBatcher(batch_fn, name='test', **kwargs)
+        self.addCleanup(batcher.shutdown)
+        return batcher
+
+    def test_concurrent_requests_share_a_batch(self):
+        sizes = []
+
+        def double(items):
+            sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        batcher = self.make_batcher(double, max_batch_size=4, max_wait_ms=500)
+        results = {}
+        threads = [
+            threading.Thread(target=lambda n=n: results.__setitem__(n, batcher.submit(n))) for n in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, {0: 0, 1: 2, 2: 4, 3: 6})
+        self.assertEqual(sizes, [4])
+        self.assertEqual(batcher.metrics.snapshot()['batch_size_histogram'], {4: 1})
+
+    def test_failed_item_only_fails_its_caller(self):
+        batcher = self.make_batcher(
+            lambda items: [ValueError(item) if item == 'bad' else item.upper() for item in items],
+            max_wait_ms=50
+        )
+        good, bad = batcher.submit_many(['good', 'bad'])
+        self.assertEqual(good, 'GOOD')
+        self.assertIsInstance(bad, ValueError)
+        with self.assertRaises(ValueError):
+            batcher.submit('bad')
+
+
+class InferenceRoundTripTests(SimpleTestCase):
+    """The inference client against the server's connection handling, serving stand-in models"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.address = os.path.join(directory, 'inference.sock')
+        self.vqa = StandInVQAService(latency=StandInLatency())
+        gpt2 = StandInGPT2Service(latency=StandInLatency())
+        for service in (self.vqa, gpt2):
+            service._initialize_model()
+            self.addCleanup(service._batcher.shutdown)
+        services = {'vqa': self.vqa, 'gpt2': gpt2}
+        for index, address in enumerate([self.address, worker_address(self.address, 0),
+                                         worker_address(self.address, 1)]):
+            listener = Listener(address, family='AF_UNIX', authkey=b'test')
+            self.addCleanup(listener.close)
+            threading.Thread(target=_accept_loop, args=(listener, services, index), daemon=True).start()
+        self.client = InferenceClient(self.address, authkey=b'test', timeout=10)
+
+    def test_remote_calls_match_local_answers(self):
+        remote = RemoteVQAService(client=self.client)
+        self.assertEqual(remote.get_status(), 'ready')
+        self.assertEqual(remote.identify_landmark(gradient_image()), self.vqa.identify_landmark(gradient_image()))
+
+        local = self.vqa.chat_with_landmark_context('How tall is it?', 'Eiffel Tower')['response']
+        chat = remote.chat_with_landmark_context('How tall is it?', 'Eiffel Tower', conversation_id='1:2')
+        self.assertEqual(chat['response'], local)
+        streamed = remote.stream_chat_with_landmark_context('How tall is it?', 'Eiffel Tower', conversation_id='1:2')
+        self.assertEqual(''.join(streamed), local)
+
+    def test_conversations_are_pinned_to_a_worker(self):
+        self.assertEqual(self.client._route(None), self.address)
+        routes = {self.client._route('1:2') for _ in range(5)}
+        self.assertEqual(len(routes), 1)
+        self.assertIn(routes.pop(), {worker_address(self.address, 0), worker_address(self.address, 1)})
+
+    def test_unknown_method_is_rejected(self):
+        with self.assertRaises(InferenceServerError):
+            self.client.call('vqa', '_load_model')
+
+
+class ConversationStoreTests(SimpleTestCase):
+    def test_least_recently_used_is_evicted(self):
+        store = ConversationStore(max_conversations=2)
+        for key in ('a', 'b'):
+            store.record_turn(key, Conversation('Eiffel Tower'), {'role': 'user', 'content': 'Hi'}, 'Hello')
+        store.get('a')
+        store.record_turn('c', Conversation('Big Ben'), {'role': 'user', 'content': 'Hi'}, 'Hello')
+
+        self.assertIsNotNone(store.get('a'))
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get_stats()['evictions'], 1)
+
+    def test_idle_conversations_expire(self):
+        store = ConversationStore(idle_timeout=60)
+        with mock.patch('core.conversations.time.monotonic', return_value=1000.0):
+            store.record_turn('a', Conversation('Eiffel Tower'), {'role': 'user', 'content': 'Hi'}, 'Hello')
+        with mock.patch('core.conversations.time.monotonic', return_value=1030.0):
+            self.assertIsNotNone(store.get('a'))
+        with mock.patch('core.conversations.time.monotonic', return_value=1100.0):
+            self.assertIsNone(store.get('a'))
+        self.assertEqual(store.get_stats()['expirations'], 1)
+
+    def test_only_recent_turns_are_kept(self):
+        store = ConversationStore(max_turns=2)
+        conversation = Conversation('Eiffel Tower')
+        for turn in range(3):
+            store.record_turn('a', conversation, {'role': 'user', 'content': f"Q{turn}"}, f"A{turn}")
+        self.assertEqual([msg['content'] for msg in store.get('a').msgs], ['Q1', 'A1', 'Q2', 'A2'])
+        self.assertEqual(conversation.turns, 3)
+
+
+class VisionEmbeddingStoreTests(SimpleTestCase):
+    def test_missing_embedding_is_a_miss(self):
+        self.assertIsNone(load_vision_embedding(None, 'fp'))
+        self.assertIsNone(load_vision_embedding('/nonexistent/1.safetensors', 'fp'))
+
+    @skipUnless(TORCH_AVAILABLE, 'torch is not installed')
+    def test_embedding_is_reused_only_by_the_same_model_setup(self):
+        import torch
+        from core.embedding_store import save_vision_embedding
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, '1.safetensors')
+        hidden_states = torch.arange(12, dtype=torch.float32).reshape(3, 4)
+        save_vision_embedding(path, hidden_states, '<image>', 'model-a')
+
+        placeholder, loaded = load_vision_embedding(path, 'model-a')
+        self.assertEqual(placeholder, '<image>')
+        self.assertTrue(torch.equal(loaded, hidden_states))
+        self.assertIsNone(load_vision_embedding(path, 'model-b'))
+
+
+@skipUnless(TORCH_AVAILABLE, 'torch is not installed')
+class QuantizationTests(SimpleTestCase):
+    def test_conv1d_becomes_an_equivalent_linear(self):
+        import torch
+        from transformers.pytorch_utils import Conv1D
+        from core.quantization import conv1d_to_linear
+
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(Conv1D(8, 4))
+        inputs = torch.randn(2, 4)
+        expected = model(inputs)
+        conv1d_to_linear(model)
+        self.assertIsInstance(model[0], torch.nn.Linear)
+        self.assertTrue(torch.allclose(model(inputs), expected, atol=1e-6))
+
+    def test_int8_model_is_smaller_and_close(self):
+        import torch
+        from core.quantization import model_size_bytes, quantize_dynamic_int8
+
+        torch.manual_seed(0)
+        model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.ReLU(), torch.nn.Linear(64, 8))
+        inputs = torch.randn(4, 64)
+        expected = model(inputs)
+        size = model_size_bytes(model)
+        quantize_dynamic_int8(model)
+        self.assertLess(model_size_bytes(model), size / 2)
+        self.assertTrue(torch.allclose(model(inputs), expected, atol=0.1))
+
+
+class GeoProxyTileTests(SimpleTestCase):
+    def make_proxy(self, **kwargs):
+        cache = caches['default']
+        cache.clear()
+        self.upstream = StandInGeoUpstream(**kwargs)
+        return GeoProxy(self.upstream, cache)
+
+    def test_tiles_are_fetched_once(self):
+        proxy = self.make_proxy()
+        first = proxy.nearby(48.8566, 2.3522, 1.5)
+        calls = self.upstream.calls['overpass']
+        self.assertEqual(calls, len(first['tiles']))
+
+        # Anywhere in the same tiles is answered from the cache
+        second = proxy.nearby(48.8566, 2.3522, 1.5)
+        self.assertEqual(self.upstream.calls['overpass'], calls)
+        self.assertEqual(second['elements'], first['elements'])
+        distances = [element['distance_km'] for element in first['elements']]
+        self.assertEqual(distances, sorted(distances))
+        self.assertTrue(all(distance <= 1.5 for distance in distances))
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        proxy = self.make_proxy(latency_ms=200)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(proxy.nearby(48.8566, 2.3522, 0.2)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.upstream.calls['overpass'], len(results[0]['tiles']))
+
+    def test_single_flight_shares_errors(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        errors = []
+
+        def fail():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            raise RuntimeError('upstream down')
+
+        def run():
+            try:
+                single_flight.do('key', fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=run)
+        follower.start()
+        while not single_flight.coalesced:
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 2)
+
+
+class SpatialIndexTests(TestCase):
+    def setUp(self):
+        for osm_id, (name, lat, lng, category) in enumerate([
+            ('Louvre', 48.8606, 2.3376, 'museum'),
+            ('Notre-Dame', 48.8530, 2.3499, 'monument'),
+            ('Eiffel Tower', 48.8584, 2.2945, 'attraction'),
+            ('Sacre-Coeur', 48.8867, 2.3431, 'monument'),
+        ]):
+            OSMLandmark.objects.create(
+                osm_type='node', osm_id=osm_id, name=name, category=category, latitude=lat, longitude=lng
+            )
+
+    def names(self, results):
+        return [landmark.name for landmark, _, _ in results]
+
+    def test_radius_search_is_nearest_first(self):
+        results = radius_search(48.8570, 2.3400, 2.0)
+        self.assertEqual(self.names(results), ['Louvre', 'Notre-Dame'])
+        self.assertLess(results[0][1], results[1][1])
+        self.assertEqual(self.names(radius_search(48.8570, 2.3400, 5.0, categories=['monument'])),
+                         ['Notre-Dame', 'Sacre-Coeur'])
+
+    def test_nearest_widens_until_it_has_k(self):
+        self.assertEqual(self.names(nearest(48.8584, 2.2950, 2)), ['Eiffel Tower', 'Louvre'])
+
+    def test_rtree_and_table_scan_agree(self):
+        if not rtree_available():
+            self.skipTest('SQLite R*Tree index not available')
+        indexed = self.names(radius_search(48.8570, 2.3400, 10.0))
+        with mock.patch('core.spatial_index.rtree_available', return_value=False):
+            self.assertEqual(self.names(radius_search(48.8570, 2.3400, 10.0)), indexed)
+        self.assertEqual(len(indexed), 4)
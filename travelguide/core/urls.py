@@ -10,11 +10,21 @@ urlpatterns = [
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
     path('explore/', views.explore_nearby_view, name='explore_nearby'),
+    path('geo/nearby/', views.geo_nearby_view, name='geo_nearby'),
+    path('geo/landmarks/', views.geo_landmarks_view, name='geo_landmarks'),
+    path('geo/reverse/', views.geo_reverse_view, name='geo_reverse'),
+    path('geo/wikipedia/', views.geo_wikipedia_view, name='geo_wikipedia'),
+    path('geo/wikipedia/stream/', views.geo_wikipedia_stream_view, name='geo_wikipedia_stream'),
     path('find-landmark/', views.find_landmark_view, name='find_landmark'),
+    path('landmark-job/<int:job_id>/', views.landmark_job_status_view, name='landmark_job_status'),
     path('vqa-status/', views.vqa_status_view, name='vqa_status'),
     path('gpt2-status/', views.gpt2_status_view, name='gpt2_status'),
+    path('model-status/', views.model_status_view, name='model_status'),
     path('vqa-chat/', views.vqa_chat_view, name='vqa_chat'),
+    path('vqa-chat/stream/', views.vqa_chat_stream_view, name='vqa_chat_stream'),
+    path('inference-metrics/', views.inference_metrics_view, name='inference_metrics'),
     path('plan/', views.plan_view, name='plan'),
+    path('plan/route/', views.plan_route_view, name='plan_route'),
     path('save-location/', views.save_location_view, name='save_location'),
     path('remove-location/<int:location_id>/', views.remove_saved_location_view, name='remove_saved_location'),
     path('remove-saved-location-ajax/<str:place_id>/', views.remove_saved_location_ajax_view, name='remove_saved_location_ajax'),
@@ -1,19 +1,36 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.urls import reverse_lazy
-from django.http import JsonResponse
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.http import JsonResponse, StreamingHttpResponse
 from django.conf import settings
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, UserProfileForm, LandmarkImageForm
 from .models import LandmarkImage, SavedLocation
+from .landmark_cache import get_landmark_cache
+from .jobs import get_job_status, get_landmark_job_queue
+from .image_derivatives import get_derivative_generator
+from .image_preprocessing import load_image
+from .streaming import sse_event
+from .conversations import conversation_key
+from .model_lifecycle import get_model_statuses
+from .model_status import get_model_status_board
+from .geo import bearing_deg_array, centroid, compass_point, haversine_km_array
+from .geo_proxy import UpstreamError, get_geo_proxy
+from .saved_locations import (
+    get_request_saved_locations_version, get_saved_place_ids, saved_locations_etag, saved_locations_last_modified,
+)
 import os
 import logging
-import tempfile
+import time
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import uuid
 import json
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +91,11 @@ def profile_view(request):
     if request.method == 'POST':
         form = UserProfileForm(request.POST, request.FILES, instance=request.user.profile)
         if form.is_valid():
-            form.save()
+            profile = form.save()
+            if 'profile_picture' in form.changed_data and profile.profile_picture:
+                # Pages show the picture as small resized copies made in the background
+                picture = profile.profile_picture
+                get_derivative_generator().schedule(picture.storage, picture.name, 'avatar')
             messages.success(request, 'Profile updated successfully!')
             return redirect('core:profile')
     else:
@@ -87,134 +108,269 @@ def explore_nearby_view(request):
     """Explore nearby landmarks view"""
     return render(request, 'core/explore_nearby.html')
 
+def _coordinates(request):
+    """Read lat/lng query parameters; None if they are missing or out of range"""
+    try:
+        lat = float(request.GET.get('lat', ''))
+        lng = float(request.GET.get('lng', ''))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+@login_required(login_url='core:login')
+def geo_nearby_view(request):
+    """Nearby landmarks from the tile-cached Overpass proxy"""
+    coordinates = _coordinates(request)
+    if coordinates is None:
+        return JsonResponse({'success': False, 'error': 'Valid lat and lng are required'}, status=400)
+    try:
+        radius_m = float(request.GET.get('radius', 2000))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid radius'}, status=400)
+    radius_m = min(max(radius_m, 1), settings.GEO_MAX_RADIUS_M)
+    categories = [category for category in request.GET.get('categories', '').split(',') if category] or None
+
+    if settings.GEO_NEARBY_SOURCE == 'local':
+        # Answer from the imported OSM extract instead of Overpass
+        from .spatial_index import as_overpass_element, radius_search
+        landmarks = radius_search(coordinates[0], coordinates[1], radius_m / 1000, categories)
+        return JsonResponse({
+            'success': True,
+            'elements': [as_overpass_element(*result) for result in landmarks]
+        })
+
+    try:
+        result = get_geo_proxy().nearby(coordinates[0], coordinates[1], radius_m / 1000, categories)
+    except UpstreamError as e:
+        logger.error(f"❌ Nearby landmark lookup failed: {str(e)}")
+        return JsonResponse({'success': False, 'error': 'Landmark search is unavailable right now'}, status=502)
+
+    return JsonResponse({'success': True, 'elements': result['elements']})
+
+@login_required(login_url='core:login')
+def geo_landmarks_view(request):
+    """
+    Radius or nearest-neighbour search over the local landmark index
+    
+    With 'k', returns the k nearest landmarks (within 'radius' metres if given);
+    otherwise every landmark within 'radius' (default 2000). Results are sorted
+    by distance and shaped like Overpass elements.
+    """
+    coordinates = _coordinates(request)
+    if coordinates is None:
+        return JsonResponse({'success': False, 'error': 'Valid lat and lng are required'}, status=400)
+    try:
+        radius_m = float(request.GET['radius']) if request.GET.get('radius') else None
+        k = int(request.GET['k']) if request.GET.get('k') else None
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid radius or k'}, status=400)
+    categories = [category for category in request.GET.get('categories', '').split(',') if category] or None
+    
+    from .spatial_index import as_overpass_element, nearest, radius_search
+    
+    started = time.perf_counter()
+    if k is not None:
+        k = min(max(k, 1), settings.GEO_LOCAL_MAX_RESULTS)
+        max_radius_m = min(radius_m, settings.GEO_LOCAL_MAX_RADIUS_M) if radius_m else settings.GEO_LOCAL_MAX_RADIUS_M
+        landmarks = nearest(coordinates[0], coordinates[1], k, categories, max_radius_km=max(max_radius_m, 1) / 1000)
+    else:
+        radius_m = min(max(radius_m or 2000, 1), settings.GEO_LOCAL_MAX_RADIUS_M)
+        landmarks = radius_search(
+            coordinates[0], coordinates[1], radius_m / 1000, categories, limit=settings.GEO_LOCAL_MAX_RESULTS
+        )
+    
+    return JsonResponse({
+        'success': True,
+        'elements': [as_overpass_element(*result) for result in landmarks],
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    })
+
+@login_required(login_url='core:login')
+def geo_reverse_view(request):
+    """Place name for a point from the cached Nominatim proxy"""
+    coordinates = _coordinates(request)
+    if coordinates is None:
+        return JsonResponse({'success': False, 'error': 'Valid lat and lng are required'}, status=400)
+
+    try:
+        place = get_geo_proxy().reverse_geocode(*coordinates)
+    except UpstreamError as e:
+        logger.error(f"❌ Reverse geocoding failed: {str(e)}")
+        return JsonResponse({'success': False, 'error': 'Location lookup is unavailable right now'}, status=502)
+
+    return JsonResponse({
+        'success': True,
+        'display_name': place.get('display_name'),
+        'address': place.get('address', {})
+    })
+
+@login_required(login_url='core:login')
+def geo_wikipedia_view(request):
+    """Wikipedia summary for a page title from the cached proxy"""
+    title = request.GET.get('title', '').strip()
+    if not title:
+        return JsonResponse({'success': False, 'error': 'A title is required'}, status=400)
+
+    try:
+        summary = get_geo_proxy().wikipedia_summary(title)
+    except UpstreamError as e:
+        logger.error(f"❌ Wikipedia lookup failed: {str(e)}")
+        return JsonResponse({'success': False, 'error': 'Wikipedia is unavailable right now'}, status=502)
+
+    if summary is None:
+        return JsonResponse({'success': False, 'error': 'Page not found'}, status=404)
+    return JsonResponse(dict(summary, success=True))
+
+@login_required(login_url='core:login')
+def geo_wikipedia_stream_view(request):
+    """
+    Wikipedia summaries for a list of landmarks, streamed as Server-Sent Events
+    
+    Takes repeated 'title' parameters and emits a 'summary' event per title as
+    soon as it is known (cached ones first, the rest fetched concurrently in
+    batches), then 'done'. The response is a plain generator, so WSGI servers
+    send each event as it is yielded.
+    """
+    titles = list(dict.fromkeys(title.strip() for title in request.GET.getlist('title') if title.strip()))
+    if not titles:
+        return JsonResponse({'success': False, 'error': 'At least one title is required'}, status=400)
+    titles = titles[:settings.GEO_WIKIPEDIA_STREAM_MAX_TITLES]
+    
+    proxy = get_geo_proxy()
+    
+    def events():
+        found = 0
+        failed = 0
+        for title, summary, error in proxy.stream_wikipedia_summaries(
+            titles,
+            batch_size=settings.GEO_WIKIPEDIA_BATCH_SIZE,
+            concurrency=settings.GEO_WIKIPEDIA_CONCURRENCY
+        ):
+            if error:
+                failed += 1
+            elif summary:
+                found += 1
+            yield sse_event('summary', {
+                'title': title,
+                'extract': summary.get('extract') if summary else None,
+                'thumbnail': summary.get('thumbnail') if summary else None,
+                'error': error
+            })
+        yield sse_event('done', {'success': True, 'found': found, 'failed': failed})
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @login_required(login_url='core:login')
 def find_landmark_view(request):
     """Find landmark by image upload view"""
-    uploaded_image = None
+    landmark_job = None
     landmark_result = None
     
     if request.method == 'POST':
         form = LandmarkImageForm(request.POST, request.FILES)
         if form.is_valid():
             uploaded_image = form.cleaned_data['image']
+            job_queue = get_landmark_job_queue()
+            
+            # The upload is decoded once, already reduced to the model's input size
+            # (JPEG draft decoding skips the discarded detail); the cache keys and
+            # the model input both come from this image
+            image = load_image(uploaded_image.read())
+            landmark_cache = get_landmark_cache()
+            
+            # Re-uploads of a known photo are answered from the result cache
+            # without running either model
+            try:
+                cache_keys = landmark_cache.keys_for(image)
+                cached = landmark_cache.lookup(image, keys=cache_keys)
+            except Exception as e:
+                logger.warning(f"Could not check landmark cache: {str(e)}")
+                cache_keys = None
+                cached = None
             
-            # Create LandmarkImage instance and save
-            landmark_image = LandmarkImage.objects.create(
+            # Create LandmarkImage instance; saving stores the upload first, so no
+            # row ever points at a file that isn't there
+            landmark_job = LandmarkImage.objects.create(
                 user=request.user,
                 image=uploaded_image
             )
+            # Pages show the image as resized copies made in the background
+            picture = landmark_job.image
+            get_derivative_generator().schedule(picture.storage, picture.name, 'landmark')
             
-            # Try to identify the landmark using VQA model
-            try:
-                from .vqa_service import get_vqa_service
-                vqa_service = get_vqa_service()
-                
-                # Check if model is loading
-                if vqa_service.is_loading():
-                    landmark_result = {
-                        'error': 'VQA model is still loading. Please try again in a moment.',
-                        'success': False
-                    }
-                    messages.warning(request, 'AI model is still loading. Please try again in a moment.')
-                elif vqa_service.is_ready():
-                    # Create a temporary file for VQA processing
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-                        # Write the uploaded file content to the temporary file
-                        for chunk in uploaded_image.chunks():
-                            temp_file.write(chunk)
-                        temp_file.flush()
-                        image_path = temp_file.name
-                    
-                    # Clean up the temporary file after processing
-                    try:
-                        result = vqa_service.identify_landmark(image_path)
-                        os.unlink(image_path)  # Delete temporary file
-                    except Exception as e:
-                        # Clean up on error too
-                        if os.path.exists(image_path):
-                            os.unlink(image_path)
-                        raise e
-                    
-                    if result['success']:
-                        # Update the landmark image with the identified name
-                        landmark_image.landmark_name = result['landmark_name']
-                        landmark_image.save()
-                        
-                        # Try to generate description using GPT-2
-                        description = None
-                        try:
-                            from .gpt2_service import get_gpt2_service
-                            gpt2_service = get_gpt2_service()
-                            
-                            if gpt2_service.is_ready():
-                                description_result = gpt2_service.generate_landmark_description(
-                                    result['landmark_name']
-                                )
-                                if description_result['success']:
-                                    description = description_result['description']
-                                else:
-                                    logger.warning(f"GPT-2 description generation failed: {description_result['error']}")
-                            else:
-                                logger.info("GPT-2 model not ready, skipping description generation")
-                        except Exception as e:
-                            logger.warning(f"Error generating description with GPT-2: {str(e)}")
-                        
-                        landmark_result = {
-                            'name': result['landmark_name'],
-                            'description': description,
-                            'success': True
-                        }
-                    else:
-                        landmark_result = {
-                            'error': result['error'],
-                            'success': False
-                        }
-                        messages.warning(request, f'Could not identify landmark: {result["error"]}')
-                else:
-                    # Model is not ready - try to initialize it
-                    try:
-                        vqa_service._initialize_model()
-                        landmark_result = {
-                            'error': 'VQA model is initializing. Please try again in a moment.',
-                            'success': False
-                        }
-                        messages.warning(request, 'AI model is initializing. Please try again in a moment.')
-                    except Exception as e:
-                        landmark_result = {
-                            'error': f'VQA model failed to initialize: {str(e)}',
-                            'success': False
-                        }
-                        messages.error(request, 'AI model failed to initialize.')
-                    
-            except ImportError:
-                landmark_result = {
-                    'error': 'VQA model dependencies not available',
-                    'success': False
-                }
-                messages.warning(request, 'AI model dependencies are not installed.')
-            except Exception as e:
-                logger.error(f"Error in landmark identification: {str(e)}")
-                landmark_result = {
-                    'error': 'An error occurred during landmark identification',
-                    'success': False
-                }
-                messages.error(request, 'An error occurred while identifying the landmark.')
+            if cached:
+                landmark_job.landmark_name = cached['landmark_name']
+                landmark_job.description = cached['description']
+                landmark_job.status = LandmarkImage.STATUS_COMPLETED
+                landmark_job.completed_at = timezone.now()
+                landmark_job.save()
+            else:
+                # Identification runs in the background; the page polls for the result
+                job_queue.enqueue(landmark_job, image=image, cache_keys=cache_keys)
+            
+            if request.headers.get('Accept') == 'application/json':
+                return JsonResponse({
+                    'success': True,
+                    'job_id': landmark_job.id,
+                    'status': landmark_job.status,
+                    'status_url': reverse('core:landmark_job_status', args=[landmark_job.id])
+                })
+            return redirect(f"{reverse('core:find_landmark')}?job={landmark_job.id}")
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
         form = LandmarkImageForm()
+        job_id = request.GET.get('job')
+        if job_id and job_id.isdigit():
+            landmark_job = LandmarkImage.objects.filter(id=job_id, user=request.user).first()
+    
+    if landmark_job is not None and not landmark_job.is_pending:
+        if landmark_job.status == LandmarkImage.STATUS_COMPLETED:
+            landmark_result = {
+                'name': landmark_job.landmark_name,
+                'description': landmark_job.description,
+                'success': True
+            }
+        else:
+            landmark_result = {
+                'error': landmark_job.error,
+                'success': False
+            }
     
     return render(request, 'core/find_landmark.html', {
         'form': form,
-        'uploaded_image': landmark_image.image if 'landmark_image' in locals() else None,
-        'landmark_result': landmark_result
+        'uploaded_image': landmark_job.image if landmark_job else None,
+        'landmark_job': landmark_job,
+        'landmark_result': landmark_result,
+        # Longest a model-status/ request should take before the page gives up on it,
+        # and how long to wait between requests when they aren't held
+        'model_status_wait_ms': int((settings.MODEL_STATUS_HOLD_SECONDS + 5) * 1000),
+        'model_status_poll_ms': 0 if settings.MODEL_STATUS_HOLD_SECONDS > 0 else 2000
     })
 
+@login_required(login_url='core:login')
+def landmark_job_status_view(request, job_id):
+    """Report progress of a landmark identification job"""
+    landmark_job = LandmarkImage.objects.filter(id=job_id, user=request.user).first()
+    if landmark_job is None:
+        return JsonResponse({
+            'success': False,
+            'error': 'Job not found'
+        }, status=404)
+    
+    return JsonResponse(get_job_status(landmark_job))
+
 @login_required(login_url='core:login')
 def vqa_status_view(request):
     """Check VQA model status"""
     try:
-        from .vqa_service import get_vqa_service
+        from .services import get_vqa_service
         vqa_service = get_vqa_service()
         
         status = vqa_service.get_status()
@@ -222,7 +378,8 @@ def vqa_status_view(request):
         return JsonResponse({
             'status': status,
             'is_ready': vqa_service.is_ready(),
-            'is_loading': vqa_service.is_loading()
+            'is_loading': vqa_service.is_loading(),
+            'lifecycle': vqa_service.get_lifecycle()
         })
     except Exception as e:
         return JsonResponse({
@@ -236,7 +393,7 @@ def vqa_status_view(request):
 def gpt2_status_view(request):
     """Check GPT-2 model status"""
     try:
-        from .gpt2_service import get_gpt2_service
+        from .services import get_gpt2_service
         gpt2_service = get_gpt2_service()
         
         status = gpt2_service.get_status()
@@ -244,7 +401,8 @@ def gpt2_status_view(request):
         return JsonResponse({
             'status': status,
             'is_ready': gpt2_service.is_ready(),
-            'is_loading': gpt2_service.is_loading()
+            'is_loading': gpt2_service.is_loading(),
+            'lifecycle': gpt2_service.get_lifecycle()
         })
     except Exception as e:
         return JsonResponse({
@@ -254,6 +412,91 @@ def gpt2_status_view(request):
             'is_loading': False
         })
 
+@login_required(login_url='core:login')
+def model_status_view(request):
+    """
+    Combined VQA and GPT-2 status, answered by long polling when enabled
+    
+    The response carries a version tagged with this process's status board.
+    A request sending back the current version is held until the status
+    changes, for at most MODEL_STATUS_HOLD_SECONDS; anything else (no
+    version, an older one, or one from another web process) is answered at
+    once. With the hold at 0 every request is answered at once and the page
+    polls. Waiting is done on the in-memory status board, so a held request
+    costs no database or model calls.
+    """
+    board = get_model_status_board()
+    version, statuses = board.current()
+    hold = settings.MODEL_STATUS_HOLD_SECONDS
+    if hold > 0 and request.GET.get('version') == board.version_tag(version):
+        version, statuses = board.wait_for_change(version, hold)
+    
+    response = JsonResponse({'version': board.version_tag(version), **statuses})
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@user_passes_test(lambda user: user.is_staff, login_url='core:login')
+def inference_metrics_view(request):
+    """Report inference batching statistics for tuning (staff only)"""
+    try:
+        from .services import get_gpt2_service, get_vqa_service
+        vqa_service = get_vqa_service()
+        gpt2_service = get_gpt2_service()
+        
+        return JsonResponse({
+            'vqa': {
+                'status': vqa_service.get_status(),
+                'batching': vqa_service.get_batch_metrics(),
+                'streaming': vqa_service.get_streaming_metrics(),
+                'conversations': vqa_service.get_conversation_metrics()
+            },
+            'gpt2': {
+                'status': gpt2_service.get_status(),
+                'batching': gpt2_service.get_batch_metrics()
+            },
+            'models': get_model_statuses(),
+            'model_status_board': get_model_status_board().get_stats(),
+            'landmark_cache': get_landmark_cache().get_stats(),
+            'image_derivatives': get_derivative_generator().get_stats(),
+            'geo_cache': get_geo_proxy().get_stats()
+        })
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'error': str(e)
+        })
+
+def _image_path_from_url(image_url):
+    """Convert an uploaded image URL from the page to a file path"""
+    if not image_url:
+        return None
+    # Remove leading slash and convert to file path
+    if image_url.startswith('/media/'):
+        return os.path.join(settings.MEDIA_ROOT, image_url[7:])  # Remove '/media/' prefix
+    return image_url
+
+def _resolve_chat_image(user, data):
+    """
+    Work out which image a chat message is about
+    
+    Returns:
+        dict: image_path, conversation_id and embedding_path to pass to the VQA
+        service. Messages that name one of the user's landmark images continue
+        that image's conversation and reuse its stored vision embedding.
+    """
+    landmark_image_id = data.get('landmark_image_id')
+    if landmark_image_id:
+        landmark_image = LandmarkImage.objects.filter(id=landmark_image_id, user=user).first()
+        if landmark_image is not None and landmark_image.image:
+            return {
+                'image_path': landmark_image.image.path,
+                'conversation_id': conversation_key(user.id, landmark_image.id),
+                'embedding_path': (
+                    landmark_image.vision_embedding.path if landmark_image.vision_embedding else None
+                ),
+            }
+    return {'image_path': _image_path_from_url(data.get('image_path', '').strip())}
+
 @login_required(login_url='core:login')
 def vqa_chat_view(request):
     """Chat with VQA model about a landmark"""
@@ -263,7 +506,6 @@ def vqa_chat_view(request):
             data = json.loads(request.body)
             user_message = data.get('message', '').strip()
             landmark_name = data.get('landmark_name', '').strip()
-            image_url = data.get('image_path', '').strip()
             
             if not user_message or not landmark_name:
                 return JsonResponse({
@@ -271,7 +513,7 @@ def vqa_chat_view(request):
                     'error': 'Message and landmark name are required'
                 })
             
-            from .vqa_service import get_vqa_service
+            from .services import get_vqa_service
             vqa_service = get_vqa_service()
             
             if not vqa_service.is_ready():
@@ -280,17 +522,10 @@ def vqa_chat_view(request):
                     'error': 'VQA model is not ready. Please try again in a moment.'
                 })
             
-            # Convert image URL to file path if provided
-            image_path = None
-            if image_url:
-                # Remove leading slash and convert to file path
-                if image_url.startswith('/media/'):
-                    image_path = os.path.join(settings.MEDIA_ROOT, image_url[7:])  # Remove '/media/' prefix
-                else:
-                    image_path = image_url
-            
-            # Get the chat response with optional image path
-            result = vqa_service.chat_with_landmark_context(user_message, landmark_name, image_path)
+            # Get the chat response, continuing the conversation about this image
+            result = vqa_service.chat_with_landmark_context(
+                user_message, landmark_name, **_resolve_chat_image(request.user, data)
+            )
             
             return JsonResponse(result)
             
@@ -311,11 +546,174 @@ def vqa_chat_view(request):
         'error': 'Only POST requests are allowed'
     })
 
+def vqa_chat_stream_view(request):
+    """
+    Chat with VQA model about a landmark, streaming the answer as Server-Sent Events
+    
+    Emits 'token' events as text is generated, then a final 'done' event (or
+    'error'). The response is a plain generator, so WSGI servers (runserver,
+    gunicorn) send each event as soon as it is yielded.
+    """
+    # Answer with JSON rather than a login redirect, the page reads this with fetch()
+    if not request.user.is_authenticated:
+        return JsonResponse({
+            'success': False,
+            'error': 'Authentication required'
+        }, status=401)
+    
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Only POST requests are allowed'
+        }, status=405)
+    
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    
+    user_message = data.get('message', '').strip()
+    landmark_name = data.get('landmark_name', '').strip()
+    
+    if not user_message or not landmark_name:
+        return JsonResponse({
+            'success': False,
+            'error': 'Message and landmark name are required'
+        }, status=400)
+    
+    from .services import get_vqa_service
+    vqa_service = get_vqa_service()
+    
+    if not vqa_service.is_ready():
+        return JsonResponse({
+            'success': False,
+            'error': 'VQA model is not ready. Please try again in a moment.'
+        }, status=503)
+    
+    chat_image = _resolve_chat_image(request.user, data)
+    
+    def events():
+        started = time.perf_counter()
+        time_to_first_token_ms = None
+        tokens = vqa_service.stream_chat_with_landmark_context(
+            user_message, landmark_name, **chat_image
+        )
+        try:
+            for text in tokens:
+                if time_to_first_token_ms is None:
+                    time_to_first_token_ms = round((time.perf_counter() - started) * 1000)
+                yield sse_event('token', {'text': text})
+            yield sse_event('done', {
+                'success': True,
+                'time_to_first_token_ms': time_to_first_token_ms
+            })
+        except Exception as e:
+            logger.error(f"Error in streaming VQA chat: {str(e)}")
+            yield sse_event('error', {
+                'success': False,
+                'error': 'An error occurred while processing your message'
+            })
+        finally:
+            # The server closes this generator when the client disconnects; closing
+            # the token stream stops generation instead of finishing the answer
+            tokens.close()
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _plan_geometry(saved_locations, origin=None):
+    """
+    Distances, bearings and map bounds for saved locations in one array pass
+    
+    Sets distance_km, bearing_deg and compass on each location with coordinates,
+    measured from origin (lat, lng) or else from the middle of the plan.
+    
+    Returns:
+        dict: 'origin', 'center' and 'bounds' ([[south, west], [north, east]]),
+        all None if no location has coordinates
+    """
+    located = [location for location in saved_locations if location.latitude is not None and location.longitude is not None]
+    if not located:
+        return {'origin': None, 'center': None, 'bounds': None}
+    
+    lats = np.array([float(location.latitude) for location in located])
+    lngs = np.array([float(location.longitude) for location in located])
+    center = centroid(lats, lngs)
+    origin = origin or center
+    distances = haversine_km_array(origin[0], origin[1], lats, lngs)
+    bearings = bearing_deg_array(origin[0], origin[1], lats, lngs)
+    for location, distance, bearing in zip(located, distances, bearings):
+        location.distance_km = round(float(distance), 1)
+        location.bearing_deg = round(float(bearing))
+        location.compass = compass_point(bearing)
+    
+    return {
+        'origin': origin,
+        'center': center,
+        'bounds': [[float(lats.min()), float(lngs.min())], [float(lats.max()), float(lngs.max())]]
+    }
+
 @login_required(login_url='core:login')
 def plan_view(request):
     """Display user's saved locations for travel planning"""
-    saved_locations = SavedLocation.objects.filter(user=request.user).order_by('-saved_at')
-    return render(request, 'core/plan.html', {'saved_locations': saved_locations})
+    saved_locations = list(SavedLocation.objects.filter(user=request.user).order_by('-saved_at'))
+    # ?lat=&lng= measures from the user's position instead of the middle of the plan
+    origin = _coordinates(request)
+    geometry = _plan_geometry(saved_locations, origin)
+    
+    sort = request.GET.get('sort', 'recent')
+    if sort == 'distance':
+        # Stable, so locations without coordinates stay last in saved order
+        saved_locations.sort(key=lambda location: getattr(location, 'distance_km', float('inf')))
+    
+    return render(request, 'core/plan.html', {
+        'saved_locations': saved_locations,
+        'sort': sort,
+        'from_user_location': origin is not None,
+        'map_center': geometry['center'],
+        'map_bounds': geometry['bounds']
+    })
+
+@login_required(login_url='core:login')
+def plan_route_view(request):
+    """
+    Suggested visiting order for the user's saved locations
+    
+    Optional parameters: start_lat/start_lng to start from, day_hours to split
+    the trip into days, visit_minutes per stop and speed_kmh for travel. The
+    result is cached until a location is saved or removed.
+    """
+    start = None
+    try:
+        if request.GET.get('start_lat') and request.GET.get('start_lng'):
+            start = (float(request.GET['start_lat']), float(request.GET['start_lng']))
+            if not (-90 <= start[0] <= 90 and -180 <= start[1] <= 180):
+                raise ValueError
+        day_hours = float(request.GET['day_hours']) if request.GET.get('day_hours') else None
+        visit_minutes = float(request.GET.get('visit_minutes', 60))
+        speed_kmh = float(request.GET.get('speed_kmh', 4.5))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid route parameters'}, status=400)
+    if speed_kmh <= 0 or visit_minutes < 0 or (day_hours is not None and day_hours <= 0):
+        return JsonResponse({'success': False, 'error': 'Invalid route parameters'}, status=400)
+    
+    from .saved_locations import get_route
+    
+    started = time.perf_counter()
+    route = get_route(
+        request.user,
+        start=start,
+        day_minutes=day_hours * 60 if day_hours else None,
+        visit_minutes=visit_minutes,
+        speed_kmh=speed_kmh
+    )
+    return JsonResponse(dict(route, success=True, took_ms=round((time.perf_counter() - started) * 1000, 1)))
 
 @login_required(login_url='core:login')
 def save_location_view(request):
@@ -424,12 +822,21 @@ def remove_saved_location_ajax_view(request, place_id):
     })
 
 @login_required(login_url='core:login')
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=saved_locations_etag, last_modified_func=saved_locations_last_modified)
 def get_saved_locations_view(request):
-    """Get user's saved location IDs for checking saved state"""
+    """
+    Get user's saved location IDs for checking saved state
+    
+    Revalidating clients get a 304 while nothing was saved or removed, and the
+    IDs themselves come from the cache, so this polled endpoint avoids the database.
+    The version behind the ETag is read once and reused for the cache key.
+    """
     if request.method == 'GET':
         try:
-            saved_locations = SavedLocation.objects.filter(user=request.user)
-            saved_place_ids = list(saved_locations.values_list('place_id', flat=True))
+            saved_place_ids = get_saved_place_ids(
+                request.user.id, version=get_request_saved_locations_version(request)
+            )
             
             return JsonResponse({
                 'success': True,
@@ -1,29 +1,102 @@
 import os
+import threading
+import time
 import torch
 from PIL import Image
-from transformers import AutoModel, AutoTokenizer
+from transformers import AutoModel, AutoTokenizer, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+from django.conf import settings
 import logging
-from typing import Optional
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .batching import MicroBatcher, percentile
+from .conversations import Conversation, get_conversation_store
+from .embedding_store import load_vision_embedding, save_vision_embedding
+from .image_preprocessing import get_resolution_policy, load_image
+from .model_lifecycle import ModelLifecycle
+from .model_snapshots import load_snapshot
+from .quantization import CPU_MODE_INT8, cpu_dtype, get_cpu_mode, quantize_dynamic_int8, resolve_cpu_mode
 
 # Set environment variable before any imports
 os.environ['PYTORCH_ENABLE_MPS_FALLBACK'] = '1'
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = 'openbmb/MiniCPM-V-2'
+
+# Generation settings used by model.chat(sampling=True, temperature=0.7)
+SAMPLING_CONFIG = {
+    'top_p': 0.8,
+    'top_k': 100,
+    'temperature': 0.7,
+    'do_sample': True,
+    'repetition_penalty': 1.05,
+}
+MAX_INPUT_LENGTH = 2048
+MAX_NEW_TOKENS = 1024
+
+
+@dataclass
+class VQARequest:
+    """A single image + conversation waiting to be batched"""
+    image: Optional[Image.Image]
+    msgs: list
+    # Reused from an earlier turn of the conversation to skip the vision encoder
+    image_placeholder: Optional[str] = None
+    vision_hidden_states: Any = None
+
+
+@dataclass
+class VQAResponse:
+    """Generated text plus the image encoding it was conditioned on"""
+    text: str
+    image_placeholder: str
+    vision_hidden_states: Any
+
+
+class StopWhenSet(StoppingCriteria):
+    """Stops generation once an event is set, e.g. when a streamed answer's reader has gone"""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.event.is_set()
+
+
 class VQAService:
     """Service class for Visual Question Answering using MiniCPM-V-2 model"""
     
-    def __init__(self):
+    def __init__(self, cpu_mode=None, device=None, resolution_policy=None):
         self.model: Optional[AutoModel] = None
         self.tokenizer: Optional[AutoTokenizer] = None
         self.device: Optional[str] = None
         self.dtype: Optional[torch.dtype] = None
-        self._is_loading = False
-        self._load_error = None
+        # fp32, bf16 or int8 when running on CPU (default: VQA_CPU_MODE / INFERENCE_CPU_MODE)
+        self.cpu_mode: Optional[str] = cpu_mode
+        self._requested_device = device
+        # Caps the image size and slice count, and so the vision tokens, per request
+        self.resolution_policy = resolution_policy or get_resolution_policy()
+        self.lifecycle = ModelLifecycle('vqa')
+        # All model calls go through one batching thread so concurrent
+        # requests share a forward pass instead of contending for the model
+        self._batcher = MicroBatcher(
+            self._generate_batch,
+            max_batch_size=getattr(settings, 'VQA_BATCH_MAX_SIZE', 4),
+            max_wait_ms=getattr(settings, 'VQA_BATCH_MAX_WAIT_MS', 25),
+            name='vqa',
+        )
+        # Streaming chats run outside the batcher and take turns with it
+        self._model_lock = threading.Lock()
+        self._time_to_first_token_ms = deque(maxlen=1000)
+        self._conversations = get_conversation_store()
         # Don't auto-initialize - let the background thread do it
     
     def _get_device(self):
         """Determine the best available device"""
+        if self._requested_device:
+            return self._requested_device
         if torch.cuda.is_available():
             return 'cuda'
         elif torch.backends.mps.is_available():
@@ -42,70 +115,102 @@ class VQAService:
         elif device == 'mps':
             return torch.float16
         else:
-            return torch.float32
+            return cpu_dtype(self.cpu_mode)
     
-    def _initialize_model(self):
-        """Initialize the VQA model and tokenizer"""
-        if self._is_loading:
-            logger.info("Model is already loading...")
-            return
-            
-        self._is_loading = True
-        self._load_error = None
+    def _initialize_model(self, use_snapshot=True):
+        """
+        Initialize the VQA model and tokenizer
         
+        Loads at most once at a time; concurrent callers wait for the load in progress.
+        
+        Args:
+            use_snapshot (bool): Memory-map a local snapshot (see snapshot_models) if
+                one exists for this dtype, instead of loading from the hub
+        """
+        if not self.lifecycle.load(lambda: self._load_model(use_snapshot)):
+            raise RuntimeError(f"VQA model failed to load: {self.lifecycle.error}")
+    
+    def _load_model(self, use_snapshot=True):
+        """Load, convert and quantize the model; raises on failure (see _initialize_model)"""
+        self.cpu_mode = resolve_cpu_mode(self.cpu_mode) if self.cpu_mode else get_cpu_mode('vqa')
+        self.device = self._get_device()
+        self.dtype = self._get_dtype(self.device)
+        
+        logger.info(f"Initializing VQA model on device: {self.device} with dtype: {self.dtype}")
+        
+        snapshot = None
+        if use_snapshot:
+            snapshot = load_snapshot(MODEL_NAME, self.dtype, AutoModel, AutoTokenizer, device=self.device)
+        if snapshot is not None:
+            self.model, self.tokenizer = snapshot
+        else:
+            self._load_pretrained()
+        
+        # Set model to evaluation mode
+        self.model.eval()
+        
+        self._apply_resolution_policy()
+        
+        if self.device == 'cpu' and self.cpu_mode == CPU_MODE_INT8:
+            # Only the language model is quantized; the vision encoder is
+            # small next to it and more sensitive to int8 activations
+            quantize_dynamic_int8(self.model.llm)
+            logger.info("Applied dynamic int8 quantization to the VQA language model")
+        
+        logger.info(f"VQA model initialized successfully on {self.device} (cpu mode: {self.cpu_mode})")
+    
+    def _load_pretrained(self):
+        """Load the model and tokenizer from the hub and convert them for the device"""
+        # Load model
+        self.model = AutoModel.from_pretrained(
+            MODEL_NAME, 
+            trust_remote_code=True, 
+            torch_dtype=self.dtype
+        )
+        
+        # Try to move to selected device, fallback to CPU if it fails
         try:
-            self.device = self._get_device()
-            self.dtype = self._get_dtype(self.device)
-            
-            logger.info(f"Initializing VQA model on device: {self.device} with dtype: {self.dtype}")
-            
-            # Load model
-            self.model = AutoModel.from_pretrained(
-                'openbmb/MiniCPM-V-2', 
-                trust_remote_code=True, 
-                torch_dtype=self.dtype
-            )
-            
-            # Try to move to selected device, fallback to CPU if it fails
-            try:
-                self.model = self.model.to(device=self.device, dtype=self.dtype)
-                logger.info(f"Model successfully moved to {self.device}")
-            except Exception as device_error:
-                logger.warning(f"Failed to move model to {self.device}: {device_error}")
-                logger.info("Falling back to CPU")
-                self.device = 'cpu'
-                self.dtype = torch.float32
-                self.model = self.model.to(device=self.device, dtype=self.dtype)
-            
-            # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                'openbmb/MiniCPM-V-2', 
-                trust_remote_code=True
-            )
-            
-            # Set model to evaluation mode
-            self.model.eval()
-            
-            logger.info(f"VQA model initialized successfully on {self.device}")
-            
-        except Exception as e:
-            self._load_error = str(e)
-            logger.error(f"Failed to initialize VQA model: {str(e)}")
-            raise
-        finally:
-            self._is_loading = False
+            self.model = self.model.to(device=self.device, dtype=self.dtype)
+            logger.info(f"Model successfully moved to {self.device}")
+        except Exception as device_error:
+            logger.warning(f"Failed to move model to {self.device}: {device_error}")
+            logger.info("Falling back to CPU")
+            self.device = 'cpu'
+            self.dtype = cpu_dtype(self.cpu_mode)
+            self.model = self.model.to(device=self.device, dtype=self.dtype)
+        
+        # Load tokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            MODEL_NAME, 
+            trust_remote_code=True
+        )
     
-    def identify_landmark(self, image_path):
+    def set_resolution_policy(self, policy):
+        """Switch the resolution policy used for images from now on"""
+        self.resolution_policy = policy
+        if self.model is not None:
+            self._apply_resolution_policy()
+    
+    def _apply_resolution_policy(self):
+        # model.chat slices by the config's max_slice_nums
+        self.model.config.max_slice_nums = self.resolution_policy.max_slice_nums
+        logger.info(f"VQA resolution policy: {self.resolution_policy.describe()}")
+    
+    def identify_landmark(self, image, embedding_path=None):
         """
         Identify landmark in the given image
         
         Args:
-            image_path (str): Path to the image file
+            image: Path to the image file, its bytes, a file-like object or a
+                decoded PIL image, so uploads can be passed without touching disk
+            embedding_path (str, optional): Where the image's vision embedding is kept.
+                An existing embedding is used instead of the image; otherwise the
+                one computed here is saved for later chats and re-identification.
             
         Returns:
             dict: Contains 'success' (bool), 'landmark_name' (str), and 'error' (str if any)
         """
-        if self._is_loading:
+        if self.lifecycle.is_loading:
             return {
                 'success': False,
                 'landmark_name': None,
@@ -113,11 +218,11 @@ class VQAService:
             }
         
         if not self.is_ready():
-            if self._load_error:
+            if self.lifecycle.error:
                 return {
                     'success': False,
                     'landmark_name': None,
-                    'error': f'VQA model failed to load: {self._load_error}'
+                    'error': f'VQA model failed to load: {self.lifecycle.error}'
                 }
             return {
                 'success': False,
@@ -126,23 +231,20 @@ class VQAService:
             }
         
         try:
-            # Load and convert image
-            image = Image.open(image_path).convert('RGB')
-            
             # Prepare question
             question = 'What is the name of the landmark in the image?'
             msgs = [{'role': 'user', 'content': question}]
             
-            # Get model prediction
-            with torch.no_grad():
-                res, context, _ = self.model.chat(
-                    image=image,
-                    msgs=msgs,
-                    context=None,
-                    tokenizer=self.tokenizer,
-                    sampling=True,
-                    temperature=0.7
-                )
+            request = self._request_from_embedding(embedding_path, msgs)
+            if request is None:
+                # Decode and convert image, reduced to what the resolution policy allows
+                request = VQARequest(image=load_image(image, self.resolution_policy), msgs=msgs)
+            
+            # Get model prediction (batched with any concurrent requests)
+            response = self._batcher.submit(request)
+            res = response.text
+            if embedding_path and request.vision_hidden_states is None:
+                self._save_embedding(embedding_path, response)
             
             logger.info(f"Landmark identification result: {res}")
             
@@ -160,7 +262,8 @@ class VQAService:
                 'error': str(e)
             }
     
-    def chat_with_landmark_context(self, user_message, landmark_name, image_path=None):
+    def chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                   embedding_path=None):
         """
         Chat with the VQA model using landmark context
         
@@ -168,11 +271,15 @@ class VQAService:
             user_message (str): User's message
             landmark_name (str): Name of the landmark for context
             image_path (str, optional): Path to the landmark image
+            conversation_id (str, optional): Continue this conversation, reusing its
+                history and image encoding (see conversations.conversation_key)
+            embedding_path (str, optional): Stored vision embedding of the image, used
+                instead of re-encoding it when starting a conversation
             
         Returns:
             dict: Contains 'success' (bool), 'response' (str), and 'error' (str if any)
         """
-        if self._is_loading:
+        if self.lifecycle.is_loading:
             return {
                 'success': False,
                 'response': None,
@@ -180,11 +287,11 @@ class VQAService:
             }
         
         if not self.is_ready():
-            if self._load_error:
+            if self.lifecycle.error:
                 return {
                     'success': False,
                     'response': None,
-                    'error': f'VQA model failed to load: {self._load_error}'
+                    'error': f'VQA model failed to load: {self.lifecycle.error}'
                 }
             return {
                 'success': False,
@@ -193,47 +300,14 @@ class VQAService:
             }
         
         try:
-            # Prepare the message with landmark context
-            contextual_message = f"About {landmark_name}: {user_message}"
-            
-            # Prepare messages for the model
-            msgs = [{'role': 'user', 'content': contextual_message}]
-            
-            # Load image if provided
-            image = None
-            if image_path and os.path.exists(image_path):
-                try:
-                    image = Image.open(image_path).convert('RGB')
-                except Exception as img_error:
-                    logger.warning(f"Failed to load image {image_path}: {img_error}")
-                    image = None
+            request, conversation = self._prepare_chat_request(
+                user_message, landmark_name, image_path, conversation_id, embedding_path
+            )
             
-            # Get model response
-            with torch.no_grad():
-                # For MiniCPM-V-2, we need to provide an image parameter even for text-only chat
-                # We'll create a dummy/empty image or use the original image if available
-                if image is not None:
-                    # Chat with the provided image
-                    res, context, _ = self.model.chat(
-                        image=image,
-                        msgs=msgs,
-                        context=None,
-                        tokenizer=self.tokenizer,
-                        sampling=True,
-                        temperature=0.7
-                    )
-                else:
-                    # For text-only chat, we'll create a simple 1x1 pixel image as a placeholder
-                    # This satisfies the model's requirement for an image parameter
-                    dummy_image = Image.new('RGB', (1, 1), color='white')
-                    res, context, _ = self.model.chat(
-                        image=dummy_image,
-                        msgs=msgs,
-                        context=None,
-                        tokenizer=self.tokenizer,
-                        sampling=True,
-                        temperature=0.7
-                    )
+            # Get model response (batched with any concurrent requests)
+            response = self._batcher.submit(request)
+            res = response.text
+            self._remember_turn(conversation_id, conversation, landmark_name, request, response)
             
             logger.info(f"Chat response for {landmark_name}: {res}")
             
@@ -251,24 +325,342 @@ class VQAService:
                 'error': str(e)
             }
     
+    def stream_chat_with_landmark_context(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                                          embedding_path=None):
+        """
+        Chat with the VQA model using landmark context, yielding the answer as it is generated
+        
+        Args:
+            user_message (str): User's message
+            landmark_name (str): Name of the landmark for context
+            image_path (str, optional): Path to the landmark image
+            conversation_id (str, optional): Continue this conversation, reusing its
+                history and image encoding
+            embedding_path (str, optional): Stored vision embedding of the image
+            
+        Yields:
+            str: Pieces of the response text, in order
+        """
+        if not self.is_ready():
+            raise RuntimeError(self.get_unavailable_reason())
+        
+        request, conversation = self._prepare_chat_request(
+            user_message, landmark_name, image_path, conversation_id, embedding_path
+        )
+        prompt, images, image_placeholder = self._build_model_input(request)
+        streamer = TextIteratorStreamer(
+            self.tokenizer,
+            skip_prompt=True,
+            skip_special_tokens=True,
+            timeout=getattr(settings, 'VQA_STREAM_TOKEN_TIMEOUT', 120)
+        )
+        errors = []
+        vision_hidden_states = []
+        # Set when this generator is closed early (the client disconnected), so
+        # the model stops and releases _model_lock instead of finishing the answer
+        cancelled = threading.Event()
+        
+        def generate():
+            try:
+                with self._model_lock, torch.inference_mode():
+                    _, states = self.model.generate(
+                        data_list=[prompt],
+                        img_list=[images],
+                        tokenizer=self.tokenizer,
+                        max_inp_length=MAX_INPUT_LENGTH,
+                        vision_hidden_states=(
+                            [request.vision_hidden_states] if request.vision_hidden_states is not None else None
+                        ),
+                        return_vision_hidden_states=True,
+                        max_new_tokens=MAX_NEW_TOKENS,
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList([StopWhenSet(cancelled)]),
+                        **SAMPLING_CONFIG
+                    )
+                vision_hidden_states.extend(states)
+            except Exception as e:
+                errors.append(e)
+                # Unblock the consumer, which would otherwise wait for tokens
+                streamer.end()
+        
+        started = time.perf_counter()
+        threading.Thread(target=generate, daemon=True, name='vqa-stream').start()
+        
+        first_token = True
+        pieces = []
+        try:
+            for text in streamer:
+                if not text:
+                    continue
+                pieces.append(text)
+                if first_token:
+                    first_token = False
+                    ttft_ms = (time.perf_counter() - started) * 1000
+                    self._time_to_first_token_ms.append(ttft_ms)
+                    logger.info(f"First chat token for {landmark_name} after {ttft_ms:.0f} ms")
+                yield text
+        finally:
+            cancelled.set()
+        
+        if errors:
+            raise errors[0]
+        
+        if vision_hidden_states:
+            response = VQAResponse(''.join(pieces), image_placeholder, vision_hidden_states[0])
+            self._remember_turn(conversation_id, conversation, landmark_name, request, response)
+    
+    def _prepare_chat_request(self, user_message, landmark_name, image_path=None, conversation_id=None,
+                              embedding_path=None):
+        """
+        Build the model request for a chat message about a landmark
+        
+        Returns:
+            tuple: (VQARequest, Conversation being continued or None)
+        """
+        # Prepare the message with landmark context
+        contextual_message = f"About {landmark_name}: {user_message}"
+        user_msg = {'role': 'user', 'content': contextual_message}
+        
+        # Follow-up questions reuse the conversation's history and image encoding
+        if conversation_id:
+            conversation = self._conversations.get(conversation_id)
+            if conversation is not None and conversation.landmark_name == landmark_name:
+                return VQARequest(
+                    image=None,
+                    msgs=conversation.msgs + [user_msg],
+                    image_placeholder=conversation.image_placeholder,
+                    vision_hidden_states=conversation.vision_hidden_states,
+                ), conversation
+        
+        # Prepare messages for the model
+        msgs = [user_msg]
+        
+        # New conversations start from the embedding saved at identification time
+        request = self._request_from_embedding(embedding_path, msgs)
+        if request is not None:
+            return request, None
+        
+        # Load image if provided
+        image = None
+        if image_path and os.path.exists(image_path):
+            try:
+                image = load_image(image_path, self.resolution_policy)
+            except Exception as img_error:
+                logger.warning(f"Failed to load image {image_path}: {img_error}")
+                image = None
+        
+        # For MiniCPM-V-2, we need to provide an image parameter even for text-only chat
+        # For text-only chat, we'll create a simple 1x1 pixel image as a placeholder
+        # This satisfies the model's requirement for an image parameter
+        if image is None:
+            image = Image.new('RGB', (1, 1), color='white')
+        
+        return VQARequest(image=image, msgs=msgs), None
+    
+    def _remember_turn(self, conversation_id, conversation, landmark_name, request, response):
+        """Store a finished exchange so the next message in the conversation can reuse it"""
+        if not conversation_id:
+            return
+        if conversation is None:
+            conversation = Conversation(
+                landmark_name=landmark_name,
+                image_placeholder=response.image_placeholder,
+                vision_hidden_states=response.vision_hidden_states,
+            )
+        self._conversations.record_turn(conversation_id, conversation, request.msgs[-1], response.text.strip())
+    
+    def _embedding_fingerprint(self):
+        """Identify the model setup, so embeddings from another setup are not reused"""
+        config = self.model.config
+        return (
+            f"{MODEL_NAME}|{self.dtype}|slice_mode={getattr(config, 'slice_mode', False)}"
+            f"|max_slice_nums={getattr(config, 'max_slice_nums', None)}"
+            f"|max_edge={self.resolution_policy.max_edge}"
+        )
+    
+    def _request_from_embedding(self, embedding_path, msgs):
+        """Build a request that skips the vision encoder, if a usable embedding is stored"""
+        if not embedding_path:
+            return None
+        loaded = load_vision_embedding(embedding_path, self._embedding_fingerprint(), device=self.device)
+        if loaded is None:
+            return None
+        image_placeholder, vision_hidden_states = loaded
+        return VQARequest(
+            image=None,
+            msgs=msgs,
+            image_placeholder=image_placeholder,
+            vision_hidden_states=vision_hidden_states.to(dtype=self.dtype),
+        )
+    
+    def _save_embedding(self, embedding_path, response):
+        try:
+            save_vision_embedding(
+                embedding_path,
+                response.vision_hidden_states,
+                response.image_placeholder,
+                self._embedding_fingerprint(),
+            )
+        except Exception as e:
+            logger.warning(f"Could not save vision embedding to {embedding_path}: {str(e)}")
+    
+    def _image_placeholder(self, image):
+        """Split an image the way model.chat does and build its prompt placeholder"""
+        config = self.model.config
+        if getattr(config, 'slice_mode', False):
+            return self.model.get_slice_image_placeholder(image, self.tokenizer)
+        placeholder = (
+            self.tokenizer.im_start
+            + self.tokenizer.unk_token * config.query_num
+            + self.tokenizer.im_end
+        )
+        return [image], placeholder
+    
+    def _build_model_input(self, request):
+        """
+        Build the prompt and image list for one request the same way model.chat does
+        
+        Returns:
+            tuple: (prompt, images to encode, image placeholder text)
+        """
+        if request.vision_hidden_states is not None:
+            # The image is already encoded; only its placeholder goes in the prompt
+            images, placeholder = [], request.image_placeholder
+        else:
+            images, placeholder = self._image_placeholder(request.image)
+        prompt = ''
+        for i, msg in enumerate(request.msgs):
+            content = msg['content']
+            if i == 0:
+                content = placeholder + '\n' + content
+            prompt += '<用户>' if msg['role'] == 'user' else '<AI>'
+            prompt += content
+        prompt += '<AI>'
+        return prompt, images, placeholder
+    
+    def _generate_batch(self, requests):
+        """
+        Run a micro-batch of requests through the model in padded generate calls
+        
+        Args:
+            requests (list): VQARequest objects collected by the batcher
+            
+        Returns:
+            list: VQAResponse (or the Exception raised) for each request, in order
+        """
+        # generate() takes either images or precomputed vision states for the
+        # whole batch, so follow-up turns run separately from new images
+        results = [None] * len(requests)
+        for reuses_vision in (False, True):
+            indexes = [
+                i for i, request in enumerate(requests)
+                if (request.vision_hidden_states is not None) == reuses_vision
+            ]
+            if not indexes:
+                continue
+            try:
+                group_results = self._generate_group([requests[i] for i in indexes])
+            except Exception as e:
+                group_results = [e] * len(indexes)
+            for i, result in zip(indexes, group_results):
+                results[i] = result
+        return results
+    
+    def _generate_group(self, requests):
+        """Run requests that all encode images, or all reuse vision states, in one generate call"""
+        try:
+            inputs = [self._build_model_input(r) for r in requests]
+            vision_hidden_states = None
+            if requests[0].vision_hidden_states is not None:
+                vision_hidden_states = [r.vision_hidden_states for r in requests]
+            with self._model_lock, torch.inference_mode():
+                responses, vision_hidden_states = self.model.generate(
+                    data_list=[prompt for prompt, _, _ in inputs],
+                    img_list=[images for _, images, _ in inputs],
+                    tokenizer=self.tokenizer,
+                    max_inp_length=MAX_INPUT_LENGTH,
+                    vision_hidden_states=vision_hidden_states,
+                    return_vision_hidden_states=True,
+                    max_new_tokens=MAX_NEW_TOKENS,
+                    **SAMPLING_CONFIG
+                )
+            return [
+                VQAResponse(text, placeholder, states)
+                for (_, _, placeholder), text, states in zip(inputs, responses, vision_hidden_states)
+            ]
+        except Exception as e:
+            if len(requests) == 1:
+                raise
+            # Fall back to one call per request so a single bad input
+            # doesn't fail everyone else in the batch
+            logger.warning(f"Batched VQA generation failed ({str(e)}), retrying {len(requests)} requests individually")
+            results = []
+            for request in requests:
+                try:
+                    results.extend(self._generate_group([request]))
+                except Exception as item_error:
+                    results.append(item_error)
+            return results
+    
+    def get_batch_metrics(self):
+        """Get per-batch size and latency statistics for the VQA batcher"""
+        metrics = self._batcher.metrics.snapshot()
+        metrics.update({
+            'max_batch_size': self._batcher.max_batch_size,
+            'max_wait_ms': self._batcher.max_wait * 1000,
+        })
+        return metrics
+    
+    def get_streaming_metrics(self):
+        """Get time-to-first-token statistics for streamed chats"""
+        samples = list(self._time_to_first_token_ms)
+        return {
+            'streams': len(samples),
+            'time_to_first_token_ms': {
+                'p50': percentile(samples, 50),
+                'p95': percentile(samples, 95),
+                'p99': percentile(samples, 99),
+            }
+        }
+    
+    def get_conversation_metrics(self):
+        """Get size and hit-rate statistics for cached chat conversations"""
+        return self._conversations.get_stats()
+    
+    def get_unavailable_reason(self):
+        """Explain why the service can't take requests right now"""
+        if self.lifecycle.is_loading:
+            return 'VQA model is still loading. Please try again in a moment.'
+        if self.lifecycle.error:
+            return f'VQA model failed to load: {self.lifecycle.error}'
+        return 'VQA model is not ready'
+    
     def is_ready(self):
         """Check if the VQA service is ready to use"""
-        return self.model is not None and self.tokenizer is not None
+        return self.lifecycle.is_ready and self.model is not None
     
     def is_loading(self):
         """Check if the VQA service is currently loading"""
-        return self._is_loading
+        return self.lifecycle.is_loading
     
     def get_status(self):
         """Get the current status of the VQA service"""
-        if self._is_loading:
-            return 'loading'
-        elif self.is_ready():
-            return 'ready'
-        elif self._load_error:
-            return 'error'
-        else:
-            return 'not_initialized'
+        return self.lifecycle.state
+    
+    def get_lifecycle(self):
+        """Get the load state of the VQA model with its timestamps and load duration"""
+        return self.lifecycle.snapshot()
+    
+    def wait_until_ready(self, timeout=None):
+        """
+        Wait for the model to finish loading, starting the load if nobody has yet
+        
+        Returns:
+            bool: Whether the model is ready
+        """
+        self.lifecycle.start(self._load_model)
+        self.lifecycle.wait(timeout)
+        return self.is_ready()
 
 # Global instance
 vqa_service = None
@@ -60,7 +60,8 @@ let savedLocationIds = [];
 // Load saved locations to check which ones are already saved
 async function loadSavedLocations() {
     try {
-        const response = await fetch('/get-saved-locations/');
+        // Revalidate with the server's ETag; unchanged saves come back as a cached 304
+        const response = await fetch('/get-saved-locations/', { cache: 'no-cache' });
         const result = await response.json();
         
         if (result.success) {
@@ -163,7 +164,7 @@ function getCurrentLocation() {
 // Get location name from coordinates
 async function getLocationName(lat, lng) {
     try {
-        const response = await fetch(`https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lng}&zoom=10`);
+        const response = await fetch(`/geo/reverse/?lat=${lat}&lng=${lng}`);
         const data = await response.json();
         
         if (data.display_name) {
@@ -178,7 +179,7 @@ async function getLocationName(lat, lng) {
     }
 }
 
-// Fetch nearby landmarks using OpenStreetMap Overpass API
+// Fetch nearby landmarks through the server's tile-cached Overpass proxy
 async function fetchNearbyLandmarks(lat, lng) {
     try {
         showLoadingState();
@@ -186,40 +187,15 @@ async function fetchNearbyLandmarks(lat, lng) {
         // Define search radius (in meters)
         const radius = 2000; // 2km
         
-        // Overpass query for tourist attractions, monuments, museums, etc.
-        const query = `
-            [out:json][timeout:25];
-            (
-                node["tourism"="attraction"](around:${radius},${lat},${lng});
-                node["historic"="monument"](around:${radius},${lat},${lng});
-                node["tourism"="museum"](around:${radius},${lat},${lng});
-                node["leisure"="park"](around:${radius},${lat},${lng});
-                node["amenity"="restaurant"](around:${radius},${lat},${lng});
-                node["shop"="mall"](around:${radius},${lat},${lng});
-                way["tourism"="attraction"](around:${radius},${lat},${lng});
-                way["historic"="monument"](around:${radius},${lat},${lng});
-                way["tourism"="museum"](around:${radius},${lat},${lng});
-                way["leisure"="park"](around:${radius},${lat},${lng});
-                way["amenity"="restaurant"](around:${radius},${lat},${lng});
-                way["shop"="mall"](around:${radius},${lat},${lng});
-            );
-            out center;
-        `;
-        
-        const response = await fetch('https://overpass-api.de/api/interpreter', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `data=${encodeURIComponent(query)}`
-        });
+        // Tourist attractions, monuments, museums, parks, restaurants and malls
+        const response = await fetch(`/geo/nearby/?lat=${lat}&lng=${lng}&radius=${radius}`);
         
         if (!response.ok) {
             throw new Error('Failed to fetch landmarks');
         }
         
         const data = await response.json();
-        await processLandmarks(data.elements, lat, lng);
+        processLandmarks(data.elements);
         
     } catch (error) {
         console.error('Error fetching landmarks:', error);
@@ -228,7 +204,7 @@ async function fetchNearbyLandmarks(lat, lng) {
 }
 
 // Process landmarks data
-async function processLandmarks(elements, userLat, userLng) {
+function processLandmarks(elements) {
     // Clear existing markers
     clearLandmarkMarkers();
     
@@ -250,26 +226,16 @@ async function processLandmarks(elements, userLat, userLng) {
                 continue; // Skip if we can't get coordinates
             }
             
-            // Calculate distance
-            const distance = calculateDistance(userLat, userLng, lat, lng);
+            // Distance and bearing come from the server, which also sorts by distance
+            const distance = element.distance_km;
             
             // Only include landmarks within 2km
             if (distance <= 2) {
-                let description = getLandmarkDescription(element.tags);
+                const description = getLandmarkDescription(element.tags);
                 const wikipedia = getWikipediaLink(element.tags);
                 
-                // If we have Wikipedia info, try to fetch description and image
+                // Wikipedia descriptions and images are filled in later by enrichLandmarks
                 let imageUrl = null;
-                if (element.tags.wikipedia) {
-                    const wikiTitle = element.tags.wikipedia.replace(/^en:/, '');
-                    const wikiData = await fetchWikipediaData(wikiTitle);
-                    if (wikiData.description && !element.tags.description) {
-                        description = wikiData.description;
-                    }
-                    if (wikiData.imageUrl) {
-                        imageUrl = wikiData.imageUrl;
-                    }
-                }
                 
                 // Check for image URL in OpenStreetMap tags
                 if (!imageUrl && element.tags.image) {
@@ -293,8 +259,11 @@ async function processLandmarks(elements, userLat, userLng) {
                     lat: lat,
                     lng: lng,
                     distance: distance,
+                    direction: compassPoint(element.bearing_deg),
                     description: description,
                     wikipedia: wikipedia,
+                    wikiTitle: element.tags.wikipedia ? element.tags.wikipedia.replace(/^en:/, '') : null,
+                    hasOwnDescription: Boolean(element.tags.description),
                     imageUrl: imageUrl
                 };
                 
@@ -303,9 +272,6 @@ async function processLandmarks(elements, userLat, userLng) {
         }
     }
     
-    // Sort by distance
-    landmarks.sort((a, b) => a.distance - b.distance);
-    
     // Store all landmarks for filtering
     allLandmarks = landmarks;
     filteredLandmarks = landmarks;
@@ -313,6 +279,9 @@ async function processLandmarks(elements, userLat, userLng) {
     // Display landmarks
     displayLandmarks(landmarks);
     addLandmarkMarkers(landmarks);
+    
+    // Then fill in Wikipedia descriptions and images as they arrive
+    enrichLandmarks(landmarks);
 }
 
 // Get landmark type from tags
@@ -360,43 +329,60 @@ function getWikipediaLink(tags) {
     return null;
 }
 
-// Fetch Wikipedia description and image using Wikipedia API
-async function fetchWikipediaData(wikiTitle) {
-    try {
-        const response = await fetch(`https://en.wikipedia.org/api/rest_v1/page/summary/${encodeURIComponent(wikiTitle)}`);
-        const data = await response.json();
-        
-        let description = null;
-        let imageUrl = null;
-        
-        if (data.extract) {
-            // Limit description to 150 characters and add ellipsis if longer
-            description = data.extract.length > 150 
-                ? data.extract.substring(0, 150) + '...' 
-                : data.extract;
-        }
-        
-        if (data.thumbnail && data.thumbnail.source) {
-            imageUrl = data.thumbnail.source;
-        }
-        
-        return { description, imageUrl };
-    } catch (error) {
-        console.error('Error fetching Wikipedia data:', error);
-        return { description: null, imageUrl: null };
+// Stream Wikipedia descriptions and images for the listed landmarks from the server,
+// which looks them up concurrently in batches, and update each landmark as it arrives
+let enrichmentSource = null;
+
+function enrichLandmarks(landmarks) {
+    if (enrichmentSource) {
+        enrichmentSource.close();
+        enrichmentSource = null;
+    }
+    
+    const titles = [...new Set(landmarks.filter(l => l.wikiTitle).map(l => l.wikiTitle))];
+    if (titles.length === 0) {
+        return;
     }
+    
+    const query = titles.map(title => `title=${encodeURIComponent(title)}`).join('&');
+    const source = new EventSource(`/geo/wikipedia/stream/?${query}`);
+    enrichmentSource = source;
+    
+    source.addEventListener('summary', function(event) {
+        const data = JSON.parse(event.data);
+        landmarks.filter(l => l.wikiTitle === data.title).forEach(landmark => {
+            if (data.extract && !landmark.hasOwnDescription) {
+                // Limit description to 150 characters and add ellipsis if longer
+                landmark.description = data.extract.length > 150 
+                    ? data.extract.substring(0, 150) + '...' 
+                    : data.extract;
+            }
+            if (data.thumbnail && data.thumbnail.source) {
+                landmark.imageUrl = data.thumbnail.source;
+            }
+            updateLandmarkItem(landmark);
+        });
+    });
+    
+    const finish = function() {
+        source.close();
+        if (enrichmentSource === source) {
+            enrichmentSource = null;
+        }
+    };
+    source.addEventListener('done', finish);
+    // Don't let EventSource reconnect and start over; the basic list is already shown
+    source.addEventListener('error', function(event) {
+        console.error('Error streaming Wikipedia data:', event);
+        finish();
+    });
 }
 
-// Calculate distance between two points
-function calculateDistance(lat1, lon1, lat2, lon2) {
-    const R = 6371; // Earth's radius in kilometers
-    const dLat = (lat2 - lat1) * Math.PI / 180;
-    const dLon = (lon2 - lon1) * Math.PI / 180;
-    const a = Math.sin(dLat/2) * Math.sin(dLat/2) +
-              Math.cos(lat1 * Math.PI / 180) * Math.cos(lat2 * Math.PI / 180) *
-              Math.sin(dLon/2) * Math.sin(dLon/2);
-    const c = 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1-a));
-    return R * c;
+// Eight-point compass direction for a bearing in degrees
+function compassPoint(bearing) {
+    if (bearing === undefined || bearing === null) return '';
+    const points = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW'];
+    return points[Math.round((bearing % 360) / 45) % 8];
 }
 
 // Display landmarks in the panel
@@ -425,59 +411,81 @@ function displayLandmarks(landmarks) {
         return;
     }
     
-    landmarksList.innerHTML = landmarks.map(landmark => {
-        const typeConfig = landmarkTypes[landmark.type] || landmarkTypes['Landmark'];
-        const wikiLink = landmark.wikipedia ? `
-            <div class="landmark-wiki">
-                <a href="${landmark.wikipedia}" target="_blank" class="wiki-link">
-                    <i class="bi bi-wikipedia"></i> Read on Wikipedia
-                </a>
-            </div>
-        ` : '';
-        
-        const backgroundStyle = landmark.imageUrl ? 
-            `background-image: linear-gradient(rgba(0, 0, 0, 0.6), rgba(0, 0, 0, 0.8)), url('${landmark.imageUrl}'); background-size: cover; background-position: center;` : '';
-        
-        // Check if this location is already saved
-        const isSaved = savedLocationIds.includes(landmark.id.toString());
-        const buttonClass = isSaved ? 'btn-save-location saved' : 'btn-save-location';
-        const buttonIcon = isSaved ? 'bi-bookmark-check' : 'bi-bookmark-plus';
-        const buttonColor = isSaved ? '#10b981' : '#6366f1';
-        const buttonTitle = isSaved ? 'Remove from travel plan' : 'Save to travel plan';
-        
-        return `
-            <div class="landmark-item ${landmark.imageUrl ? 'landmark-with-image' : ''}" data-landmark-id="${landmark.id}" style="${backgroundStyle}">
-                <div class="landmark-header">
-                    <div class="landmark-icon" style="background-color: ${typeConfig.bgColor}; color: ${typeConfig.color};">
-                        <i class="${typeConfig.icon}"></i>
-                    </div>
-                    <div class="landmark-info">
-                        <div class="landmark-name">${landmark.name}</div>
-                        <div class="landmark-type" style="color: ${typeConfig.color};">${landmark.type}</div>
-                    </div>
-                    <button class="${buttonClass}" onclick="saveLocation(event, ${JSON.stringify(landmark).replace(/"/g, '&quot;')})" title="${buttonTitle}" style="background-color: ${buttonColor}; color: white;">
-                        <i class="bi ${buttonIcon}"></i>
-                    </button>
-                </div>
-                <div class="landmark-distance">${landmark.distance.toFixed(1)} km away</div>
-                <div class="landmark-description">${landmark.description}</div>
-                ${wikiLink}
-            </div>
-        `;
-    }).join('');
+    landmarksList.innerHTML = landmarks.map(renderLandmarkItem).join('');
     
     // Add click listeners to landmark items
-    document.querySelectorAll('.landmark-item').forEach(item => {
-        item.addEventListener('click', function() {
-            const landmarkId = this.dataset.landmarkId;
-            const landmark = landmarks.find(l => l.id == landmarkId);
-            if (landmark) {
-                selectLandmark(landmark);
-            }
-        });
-    });
+    document.querySelectorAll('.landmark-item').forEach(addLandmarkItemListener);
+}
+
+// Render one landmark card for the panel
+function renderLandmarkItem(landmark) {
+    const typeConfig = landmarkTypes[landmark.type] || landmarkTypes['Landmark'];
+    const wikiLink = landmark.wikipedia ? `
+        <div class="landmark-wiki">
+            <a href="${landmark.wikipedia}" target="_blank" class="wiki-link">
+                <i class="bi bi-wikipedia"></i> Read on Wikipedia
+            </a>
+        </div>
+    ` : '';
+    
+    const backgroundStyle = landmark.imageUrl ? 
+        `background-image: linear-gradient(rgba(0, 0, 0, 0.6), rgba(0, 0, 0, 0.8)), url('${landmark.imageUrl}'); background-size: cover; background-position: center;` : '';
     
+    // Check if this location is already saved
+    const isSaved = savedLocationIds.includes(landmark.id.toString());
+    const buttonClass = isSaved ? 'btn-save-location saved' : 'btn-save-location';
+    const buttonIcon = isSaved ? 'bi-bookmark-check' : 'bi-bookmark-plus';
+    const buttonColor = isSaved ? '#10b981' : '#6366f1';
+    const buttonTitle = isSaved ? 'Remove from travel plan' : 'Save to travel plan';
+    
+    return `
+        <div class="landmark-item ${landmark.imageUrl ? 'landmark-with-image' : ''}" data-landmark-id="${landmark.id}" style="${backgroundStyle}">
+            <div class="landmark-header">
+                <div class="landmark-icon" style="background-color: ${typeConfig.bgColor}; color: ${typeConfig.color};">
+                    <i class="${typeConfig.icon}"></i>
+                </div>
+                <div class="landmark-info">
+                    <div class="landmark-name">${landmark.name}</div>
+                    <div class="landmark-type" style="color: ${typeConfig.color};">${landmark.type}</div>
+                </div>
+                <button class="${buttonClass}" onclick="saveLocation(event, ${JSON.stringify(landmark).replace(/"/g, '&quot;')})" title="${buttonTitle}" style="background-color: ${buttonColor}; color: white;">
+                    <i class="bi ${buttonIcon}"></i>
+                </button>
+            </div>
+            <div class="landmark-distance">${landmark.distance.toFixed(1)} km away${landmark.direction ? ` to the ${landmark.direction}` : ''}</div>
+            <div class="landmark-description">${landmark.description}</div>
+            ${wikiLink}
+        </div>
+    `;
+}
+
+// Select the landmark when its card is clicked
+function addLandmarkItemListener(item) {
+    item.addEventListener('click', function() {
+        const landmarkId = this.dataset.landmarkId;
+        const landmark = allLandmarks.find(l => l.id == landmarkId);
+        if (landmark) {
+            selectLandmark(landmark);
+        }
+    });
+}
 
+// Re-render a landmark's card in place after its details change
+function updateLandmarkItem(landmark) {
+    const item = document.querySelector(`.landmark-item[data-landmark-id="${landmark.id}"]`);
+    if (!item) {
+        return; // Filtered out of the list
+    }
+    
+    const wasSelected = item.classList.contains('selected');
+    const template = document.createElement('template');
+    template.innerHTML = renderLandmarkItem(landmark).trim();
+    const newItem = template.content.firstElementChild;
+    if (wasSelected) {
+        newItem.classList.add('selected');
+    }
+    addLandmarkItemListener(newItem);
+    item.replaceWith(newItem);
 }
 
 // Add markers to map
@@ -87,6 +87,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The default in-memory cache is per process; point CACHE_BACKEND/CACHE_LOCATION
+# at Redis or Memcached when running several web workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'wanderlust'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,6 +144,158 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploaded landmark images and profile pictures are stored once per unique content,
+# named by SHA-256 (landmark_images/ab/cd/<hash>.jpg), and deleted with the last row
+# that refers to them. python manage.py gc_media repairs the reference counts.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'media_blobs': {
+        'BACKEND': 'core.storage.ContentAddressedStorage',
+    },
+}
+
+# AI model inference
+# Precision used when the models run on CPU: fp32, bf16 (needs AVX512-BF16/AMX,
+# falls back to fp32) or int8 (dynamic quantization of Linear layers).
+# VQA_CPU_MODE / GPT2_CPU_MODE override it per model. Compare the trade-off with
+# python manage.py compare_inference_modes.
+INFERENCE_CPU_MODE = os.getenv('INFERENCE_CPU_MODE', 'fp32')
+VQA_CPU_MODE = os.getenv('VQA_CPU_MODE', '')
+GPT2_CPU_MODE = os.getenv('GPT2_CPU_MODE', '')
+
+# When to load the models at startup: 'auto' preloads in application servers
+# (gunicorn, uvicorn, runserver), 'always' also in shells and management
+# commands, 'never' loads them on first use only.
+MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'auto')
+# Pages follow model loading through model-status/. States kept elsewhere (the
+# inference server) are re-read at most every MODEL_STATUS_REFRESH_INTERVAL seconds
+# per web process.
+MODEL_STATUS_REFRESH_INTERVAL = float(os.getenv('MODEL_STATUS_REFRESH_INTERVAL', '2'))
+# Long polling: hold each model-status/ request until the status changes, for at most
+# this many seconds. A held request occupies its worker for the whole hold, so only
+# enable it with threaded or async workers (gunicorn --worker-class gthread --threads N,
+# or an ASGI server); with sync workers a few open pages would block every other
+# request. At 0 (the default) requests are answered at once and pages poll instead.
+MODEL_STATUS_HOLD_SECONDS = float(os.getenv('MODEL_STATUS_HOLD_SECONDS', '0'))
+
+# Local safetensors snapshots of the converted models (python manage.py snapshot_models).
+# When a snapshot for the model's dtype exists it is memory-mapped instead of
+# loading from the hub, so startup takes seconds and processes share the pages.
+MODEL_SNAPSHOT_DIR = os.getenv('MODEL_SNAPSHOT_DIR') or str(BASE_DIR / 'model_snapshots')
+USE_MODEL_SNAPSHOTS = os.getenv('USE_MODEL_SNAPSHOTS', 'True').lower() == 'true'
+
+# Concurrent VQA requests are grouped into micro-batches. A batch runs as soon as
+# it holds VQA_BATCH_MAX_SIZE requests or VQA_BATCH_MAX_WAIT_MS has passed since
+# the oldest request arrived. Raise the size for throughput, lower the wait for latency.
+VQA_BATCH_MAX_SIZE = int(os.getenv('VQA_BATCH_MAX_SIZE', '4'))
+VQA_BATCH_MAX_WAIT_MS = int(os.getenv('VQA_BATCH_MAX_WAIT_MS', '25'))
+# GPT-2 descriptions are batched the same way; bulk backfills fill whole batches
+GPT2_BATCH_MAX_SIZE = int(os.getenv('GPT2_BATCH_MAX_SIZE', '8'))
+GPT2_BATCH_MAX_WAIT_MS = int(os.getenv('GPT2_BATCH_MAX_WAIT_MS', '25'))
+# Photos are reduced before the vision encoder sees them: the policy caps their
+# longest edge (JPEGs are decoded in draft mode at that scale) and the number of
+# 448px slices, each 64 vision tokens. Policies are full, balanced, fast and single;
+# VQA_MAX_IMAGE_EDGE / VQA_MAX_SLICE_NUMS override the chosen one's limits. Compare
+# them with python manage.py evaluate_resolution_policies.
+VQA_RESOLUTION_POLICY = os.getenv('VQA_RESOLUTION_POLICY', 'balanced')
+VQA_MAX_IMAGE_EDGE = int(os.getenv('VQA_MAX_IMAGE_EDGE', '0')) or None
+VQA_MAX_SLICE_NUMS = int(os.getenv('VQA_MAX_SLICE_NUMS', '0')) or None
+# Streamed chat (vqa-chat/stream/) gives up if no new token arrives within this many seconds
+VQA_STREAM_TOKEN_TIMEOUT = int(os.getenv('VQA_STREAM_TOKEN_TIMEOUT', '120'))
+# Chat conversations keep their history and image encoding in memory so follow-up
+# questions skip the vision encoder. Least recently used ones beyond
+# VQA_CONVERSATION_MAX, or idle for VQA_CONVERSATION_IDLE_SECONDS, are dropped.
+VQA_CONVERSATION_MAX = int(os.getenv('VQA_CONVERSATION_MAX', '128'))
+VQA_CONVERSATION_IDLE_SECONDS = int(os.getenv('VQA_CONVERSATION_IDLE_SECONDS', '1800'))
+VQA_CONVERSATION_MAX_TURNS = int(os.getenv('VQA_CONVERSATION_MAX_TURNS', '6'))
+
+# Out-of-process inference server (python manage.py run_inference_server).
+# When INFERENCE_SERVER_SOCKET is set, web workers don't load any models and
+# forward VQA/GPT-2 calls to the server over this Unix socket instead.
+INFERENCE_SERVER_SOCKET = os.getenv('INFERENCE_SERVER_SOCKET', '')
+INFERENCE_SERVER_WORKERS = int(os.getenv('INFERENCE_SERVER_WORKERS', '1'))
+INFERENCE_SERVER_TIMEOUT = int(os.getenv('INFERENCE_SERVER_TIMEOUT', '300'))
+# Defaults to SECRET_KEY when empty
+INFERENCE_SERVER_AUTHKEY = os.getenv('INFERENCE_SERVER_AUTHKEY', '')
+
+# Landmark identification result cache, keyed by image content.
+# Backend is 'memory' (per-process LRU), 'file' (LANDMARK_CACHE_DIR), 'django'
+# (the LANDMARK_CACHE_ALIAS entry in CACHES) or a dotted path to a backend class.
+LANDMARK_CACHE_BACKEND = os.getenv('LANDMARK_CACHE_BACKEND', 'memory')
+LANDMARK_CACHE_TTL = int(os.getenv('LANDMARK_CACHE_TTL', str(7 * 24 * 3600)))
+LANDMARK_CACHE_MAX_ENTRIES = int(os.getenv('LANDMARK_CACHE_MAX_ENTRIES', '1000'))
+LANDMARK_CACHE_DIR = os.getenv('LANDMARK_CACHE_DIR', str(BASE_DIR / 'cache' / 'landmarks'))
+LANDMARK_CACHE_ALIAS = os.getenv('LANDMARK_CACHE_ALIAS', 'default')
+# Results are only reused for the exact same pixels. Opt in to also match
+# re-encoded/resized copies whose perceptual hash (dHash) differs from a cached
+# photo's by at most LANDMARK_CACHE_PERCEPTUAL_MAX_DISTANCE of its 64 bits;
+# unrelated photos can share a dHash, so this may return another image's result.
+LANDMARK_CACHE_MATCH_PERCEPTUAL = os.getenv('LANDMARK_CACHE_MATCH_PERCEPTUAL', 'False').lower() == 'true'
+LANDMARK_CACHE_PERCEPTUAL_MAX_DISTANCE = int(os.getenv('LANDMARK_CACHE_PERCEPTUAL_MAX_DISTANCE', '4'))
+
+# Background landmark identification jobs
+LANDMARK_JOB_WORKERS = int(os.getenv('LANDMARK_JOB_WORKERS', '2'))
+# How long a job waits for a cold VQA model before failing
+LANDMARK_JOB_MODEL_WAIT_SECONDS = int(os.getenv('LANDMARK_JOB_MODEL_WAIT_SECONDS', '600'))
+# Jobs stuck mid-run, or still queued, for this long (e.g. after a restart) are requeued
+LANDMARK_JOB_STALE_SECONDS = int(os.getenv('LANDMARK_JOB_STALE_SECONDS', '900'))
+
+# Explore-page map lookups go through a server-side proxy (geo/nearby/,
+# geo/reverse/, geo/wikipedia/) that caches them in the GEO_CACHE_ALIAS cache.
+# Overpass results are cached per geohash tile of GEO_TILE_PRECISION (5 is about
+# 5 x 5 km) and landmark category, reverse geocodes per GEO_REVERSE_PRECISION tile.
+# GEO_UPSTREAM is 'http', 'stand-in' (offline fake data) or a dotted class path.
+GEO_UPSTREAM = os.getenv('GEO_UPSTREAM', 'http')
+OVERPASS_URL = os.getenv('OVERPASS_URL', 'https://overpass-api.de/api/interpreter')
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org')
+WIKIPEDIA_API_URL = os.getenv('WIKIPEDIA_API_URL', 'https://en.wikipedia.org/api/rest_v1')
+WIKIPEDIA_ACTION_API_URL = os.getenv('WIKIPEDIA_ACTION_API_URL', 'https://en.wikipedia.org/w/api.php')
+GEO_USER_AGENT = os.getenv('GEO_USER_AGENT', 'WanderlustTravelGuide/1.0')
+GEO_UPSTREAM_TIMEOUT = int(os.getenv('GEO_UPSTREAM_TIMEOUT', '30'))
+GEO_CACHE_ALIAS = os.getenv('GEO_CACHE_ALIAS', 'default')
+GEO_TILE_PRECISION = int(os.getenv('GEO_TILE_PRECISION', '5'))
+GEO_REVERSE_PRECISION = int(os.getenv('GEO_REVERSE_PRECISION', '6'))
+GEO_OVERPASS_TTL = int(os.getenv('GEO_OVERPASS_TTL', str(24 * 3600)))
+GEO_REVERSE_TTL = int(os.getenv('GEO_REVERSE_TTL', str(7 * 24 * 3600)))
+GEO_WIKIPEDIA_TTL = int(os.getenv('GEO_WIKIPEDIA_TTL', str(7 * 24 * 3600)))
+GEO_MAX_RADIUS_M = int(os.getenv('GEO_MAX_RADIUS_M', '5000'))
+# Offline nearby search over OSM extracts loaded with python manage.py import_landmarks
+# (geo/landmarks/). Set GEO_NEARBY_SOURCE to 'local' to answer the explore page from
+# that index instead of Overpass.
+GEO_NEARBY_SOURCE = os.getenv('GEO_NEARBY_SOURCE', 'overpass')
+GEO_LOCAL_MAX_RADIUS_M = int(os.getenv('GEO_LOCAL_MAX_RADIUS_M', '50000'))
+GEO_LOCAL_MAX_RESULTS = int(os.getenv('GEO_LOCAL_MAX_RESULTS', '500'))
+# The explore page enriches its landmark list through geo/wikipedia/stream/, which
+# asks Wikipedia for GEO_WIKIPEDIA_BATCH_SIZE titles per query (the API's limit is 20)
+# with up to GEO_WIKIPEDIA_CONCURRENCY queries in flight
+GEO_WIKIPEDIA_BATCH_SIZE = int(os.getenv('GEO_WIKIPEDIA_BATCH_SIZE', '20'))
+GEO_WIKIPEDIA_CONCURRENCY = int(os.getenv('GEO_WIKIPEDIA_CONCURRENCY', '4'))
+GEO_WIKIPEDIA_STREAM_MAX_TITLES = int(os.getenv('GEO_WIKIPEDIA_STREAM_MAX_TITLES', '200'))
+
+# Saved place ids (get-saved-locations/) and trip orders for the plan page (plan/route/)
+# are cached per user under a version kept in the SAVED_LOCATIONS_CACHE_ALIAS cache and
+# bumped whenever a location is saved, edited or removed. With more than one web worker
+# that cache must be shared (CACHE_BACKEND, e.g. Redis or Memcached); a per-process
+# LocMemCache only sees its own worker's bumps and would answer 304 with stale ids.
+# The route solver stops improving after ROUTE_TIME_LIMIT_SECONDS.
+SAVED_LOCATIONS_CACHE_ALIAS = os.getenv('SAVED_LOCATIONS_CACHE_ALIAS', 'default')
+SAVED_LOCATIONS_CACHE_TTL = int(os.getenv('SAVED_LOCATIONS_CACHE_TTL', str(24 * 3600)))
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', str(24 * 3600)))
+ROUTE_TIME_LIMIT_SECONDS = float(os.getenv('ROUTE_TIME_LIMIT_SECONDS', '2'))
+
+# Pages show landmark images and profile pictures as resized copies (image_tags'
+# {% picture %}), generated after upload in IMAGE_DERIVATIVE_PROCESSES worker
+# processes and stored next to the originals. AVIF needs Pillow 11.3+ or
+# pillow-avif-plugin and is skipped otherwise.
+IMAGE_DERIVATIVE_FORMATS = os.getenv('IMAGE_DERIVATIVE_FORMATS', 'avif,webp')
+IMAGE_DERIVATIVE_PROCESSES = int(os.getenv('IMAGE_DERIVATIVE_PROCESSES', '2'))
+IMAGE_DERIVATIVE_CACHE_ALIAS = os.getenv('IMAGE_DERIVATIVE_CACHE_ALIAS', 'default')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
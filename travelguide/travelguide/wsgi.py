@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travelguide.settings')
 
 application = get_wsgi_application()
+
+# Start loading the AI models in the background as the server boots
+from core.model_lifecycle import preload_on_startup  # noqa: E402
+
+preload_on_startup(serving=True)